@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+HTTP benchmark for the todo API.
+
+Seeds DATABASE_URL with throwaway users and todos, drives concurrent scenarios
+against the app and prints throughput plus p50/p95/p99 latency per scenario as
+JSON, so runs from two releases can be diffed. By default the `src.main` ASGI app
+runs in-process through httpx; pass --base-url to hit a server started separately
+(e.g. `uvicorn src.main:app --workers 4`) against the same database.
+
+    python -m benchmarks.http_bench --users 20 --todos-per-user 500 --concurrency 32 --requests 2000
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import httpx
+from sqlalchemy import delete, insert, select
+
+from src.auth.service import get_password_hash
+from src.database.core import SessionLocal, engine
+from src.entities.refresh_token import RefreshToken
+from src.entities.todo import Priority, Todo
+from src.entities.user import User
+
+
+SCENARIOS = ('login', 'refresh', 'list', 'create', 'complete', 'delete')
+PASSWORD = 'benchmark-password'
+
+
+@dataclass
+class BenchUser:
+    id: object
+    email: str
+    token: str = ''
+    todo_ids: list = field(default_factory=list)
+    # Each one works once; a refresh puts its successor back
+    refresh_tokens: list = field(default_factory=list)
+
+
+@dataclass
+class ScenarioResult:
+    latencies: list = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def summary(self) -> dict:
+        ordered = sorted(self.latencies)
+
+        def percentile(p: float) -> float | None:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 3)
+
+        return {
+            'requests': len(ordered) + self.errors,
+            'errors': self.errors,
+            'throughput_rps': round(len(ordered) / self.elapsed, 1) if self.elapsed else 0.0,
+            'p50_ms': percentile(50),
+            'p95_ms': percentile(95),
+            'p99_ms': percentile(99),
+        }
+
+
+def seed(run_id: str, users: int, todos_per_user: int) -> list[BenchUser]:
+    from src.main import run_migrations
+
+    # The schema the app runs against, constraints and indexes included
+    run_migrations()
+    password_hash = get_password_hash(PASSWORD)
+    bench_users = [BenchUser(id=uuid4(), email=f'bench-{run_id}-{i}@example.com') for i in range(users)]
+    now = datetime.now(timezone.utc)
+    with SessionLocal() as db:
+        db.execute(insert(User), [
+            {'id': u.id, 'email': u.email, 'first_name': 'Bench', 'last_name': str(i), 'password_hash': password_hash}
+            for i, u in enumerate(bench_users)
+        ])
+        for u in bench_users:
+            rows = [
+                {'id': uuid4(), 'user_id': u.id, 'description': f'seeded todo {n}', 'priority': Priority(n % 5), 'created_at': now}
+                for n in range(todos_per_user)
+            ]
+            if rows:
+                db.execute(insert(Todo), rows)
+            u.todo_ids = [row['id'] for row in rows]
+        db.commit()
+    return bench_users
+
+
+def cleanup(run_id: str) -> None:
+    with SessionLocal() as db:
+        user_ids = select(User.id).where(User.email.like(f'bench-{run_id}-%'))
+        db.execute(delete(Todo).where(Todo.user_id.in_(user_ids)))
+        db.execute(delete(RefreshToken).where(RefreshToken.user_id.in_(user_ids)))
+        db.execute(delete(User).where(User.email.like(f'bench-{run_id}-%')))
+        db.commit()
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, users: list[BenchUser], requests: int, concurrency: int) -> ScenarioResult:
+    result = ScenarioResult()
+    counter = itertools.count()
+    picker = itertools.cycle(users)
+
+    def build(user: BenchUser):
+        headers = {'Authorization': f'Bearer {user.token}'}
+        if name == 'login':
+            return 'POST', '/auth/login', {'json': {'email': user.email, 'password': PASSWORD}}
+        if name == 'refresh':
+            if not user.refresh_tokens:
+                return None
+            return 'POST', '/auth/refresh', {'json': {'refresh_token': user.refresh_tokens.pop()}}
+        if name == 'list':
+            return 'GET', '/todos/', {'headers': headers}
+        if name == 'create':
+            return 'POST', '/todos/', {'headers': headers, 'json': {'description': 'benchmark todo', 'priority': 3}}
+        if not user.todo_ids:
+            return None
+        todo_id = user.todo_ids.pop()
+        if name == 'complete':
+            user.todo_ids.insert(0, todo_id)  # completing is idempotent, keep the id for deletes
+            return 'PUT', f'/todos/{todo_id}/complete', {'headers': headers}
+        return 'DELETE', f'/todos/{todo_id}', {'headers': headers}
+
+    async def worker():
+        while next(counter) < requests:
+            user = next(picker)
+            request = build(user)
+            if request is None:
+                result.errors += 1
+                continue
+            method, url, kwargs = request
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                result.latencies.append(time.perf_counter() - started)
+                if name == 'refresh':
+                    user.refresh_tokens.append(response.json()['refresh_token'])
+            else:
+                result.errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+async def run(args) -> dict:
+    run_id = uuid4().hex[:8]
+    users = seed(run_id, args.users, args.todos_per_user)
+    try:
+        if args.base_url:
+            transport = None
+            base_url = args.base_url
+        else:
+            from src.main import app
+            from src.auth.throttle import user_throttle
+            app.state.limiter.enabled = False  # the benchmark deliberately exceeds the login limits
+            user_throttle.enabled = False      # and the per-user request budget
+            transport = httpx.ASGITransport(app=app)
+            base_url = 'http://bench'
+
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=60) as client:
+            # Enough sessions per user that concurrent refreshes never wait for a rotated token
+            sessions = math.ceil(args.concurrency / len(users)) if 'refresh' in args.scenarios else 1
+            for user in users:
+                for _ in range(sessions):
+                    response = await client.post('/auth/login', json={'email': user.email, 'password': PASSWORD})
+                    response.raise_for_status()
+                    user.token = response.json()['access_token']
+                    user.refresh_tokens.append(response.json()['refresh_token'])
+
+            results = {}
+            for name in args.scenarios:
+                outcome = await run_scenario(client, name, users, args.requests, args.concurrency)
+                results[name] = outcome.summary()
+                print(f"{name:<9} {results[name]}", file=sys.stderr)
+    finally:
+        cleanup(run_id)
+
+    return {
+        'config': {
+            'users': args.users,
+            'todos_per_user': args.todos_per_user,
+            'concurrency': args.concurrency,
+            'requests_per_scenario': args.requests,
+            'target': args.base_url or 'in-process',
+            'database': engine.url.render_as_string(hide_password=True),
+        },
+        'scenarios': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--todos-per-user', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500, help='requests per scenario')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--base-url', help='benchmark a running server instead of the in-process app')
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+
+if __name__ == "__main__":
+    main()
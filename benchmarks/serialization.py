@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the fast todo serialization path (TODO_FAST_JSON).
+
+Seeds one throwaway user with --rows todos in DATABASE_URL, then reads them back
+through the app twice: once the regular way (ORM objects validated into
+`TodoResponse` and encoded by FastAPI) and once through the column-tuple path. It
+walks every `GET /todos` page and the NDJSON export and checks that both modes
+produce byte-for-byte identical bodies before reporting the timings.
+
+    python -m benchmarks.serialization --rows 10000 --repeat 5
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import httpx
+from sqlalchemy import delete, insert
+
+from src.auth.service import create_access_token
+from src.database.core import SessionLocal
+from src.entities.todo import Priority, Todo
+from src.entities.user import User
+from src.todos import service
+
+
+# Quotes, escapes, non-ASCII and control characters exercise the string encoders
+DESCRIPTIONS = ('plain todo', 'say "hi" \\ back', 'café ✓ naïve', 'tab\there\nnewline', 'emoji 🎉   \x1f')
+
+
+def seed(rows: int) -> User:
+    from src.main import run_migrations
+
+    # The schema the app runs against, constraints and indexes included
+    run_migrations()
+    user = User(id=uuid4(), email=f'serialization-{uuid4().hex[:8]}@example.com', first_name='Bench', last_name='Serialization', password_hash='-')
+    base = datetime(2025, 1, 1, 12, 0, 0)
+    with SessionLocal() as db:
+        db.add(user)
+        db.flush()
+        db.execute(insert(Todo), [
+            {
+                'id': uuid4(),
+                'user_id': user.id,
+                'description': f'{DESCRIPTIONS[n % len(DESCRIPTIONS)]} #{n}',
+                'due_date': None if n % 3 == 0 else base + timedelta(days=n % 30, microseconds=(n % 2) * 1234),
+                'priority': Priority(n % 5),
+                'is_completed': n % 4 == 0,
+                'completed_at': base + timedelta(hours=n) if n % 4 == 0 else None,
+                'created_at': base + timedelta(seconds=n, microseconds=(n % 7) * 1000),
+            }
+            for n in range(rows)
+        ])
+        db.commit()
+    return user
+
+
+def cleanup(user: User) -> None:
+    with SessionLocal() as db:
+        db.execute(delete(Todo).where(Todo.user_id == user.id))
+        db.execute(delete(User).where(User.id == user.id))
+        db.commit()
+
+
+async def read_pages(client: httpx.AsyncClient, headers: dict) -> list[bytes]:
+    pages = []
+    cursor = None
+    while True:
+        params = {'limit': 200, **({'cursor': cursor} if cursor else {})}
+        response = await client.get('/todos/', params=params, headers=headers)
+        response.raise_for_status()
+        pages.append(response.content)
+        cursor = json.loads(response.content)['next_cursor']
+        if cursor is None:
+            return pages
+
+
+async def read_export(client: httpx.AsyncClient, headers: dict) -> bytes:
+    response = await client.get('/todos/export', params={'format': 'ndjson'}, headers=headers)
+    response.raise_for_status()
+    return response.content
+
+
+async def run(args) -> dict:
+    from src.main import app
+    from src.auth.throttle import user_throttle
+    user_throttle.enabled = False
+    logging.disable(logging.INFO)  # both modes log the same lines, keep them out of the timings
+
+    user = seed(args.rows)
+    headers = {'Authorization': f'Bearer {create_access_token(user.email, user.id, timedelta(minutes=30))}'}
+    timings: dict[tuple[str, str], list[float]] = {}
+    bodies: dict[tuple[str, str], object] = {}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+            for _ in range(args.repeat):
+                for target, read in (('list', read_pages), ('export', read_export)):
+                    for mode in ('regular', 'fast'):
+                        service.TODO_FAST_JSON = mode == 'fast'
+                        started = time.perf_counter()
+                        bodies[target, mode] = await read(client, headers)
+                        timings.setdefault((target, mode), []).append(time.perf_counter() - started)
+    finally:
+        cleanup(user)
+
+    report = {
+        'rows': args.rows,
+        'encoder': 'orjson' if service.orjson is not None else 'json',
+        'identical': all(bodies[target, 'regular'] == bodies[target, 'fast'] for target in ('list', 'export')),
+    }
+    for target in ('list', 'export'):
+        regular, fast = min(timings[target, 'regular']), min(timings[target, 'fast'])
+        report[target] = {
+            'identical': bodies[target, 'regular'] == bodies[target, 'fast'],
+            'regular_seconds': round(regular, 4),
+            'fast_seconds': round(fast, 4),
+            'speedup': round(regular / fast, 2),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=5, help='best of N runs is reported')
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    if not report['identical']:
+        sys.exit('fast path output differs from the regular response')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Cold start benchmark for the todo API.
+
+Seeds one throwaway user in DATABASE_URL, then starts --runs fresh interpreters.
+Each one times importing `src.main`, `create_app()`, the lifespan startup, the
+first and second authenticated `GET /todos` and the first and second
+`/openapi.json`, and records which optional heavy modules the import pulled in.
+Prints the median and best of every phase as JSON, so runs from two releases
+can be diffed.
+
+    python -m benchmarks.startup --runs 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Should only be imported once a request needs them, not by `import src.main`
+LAZY_MODULES = ('passlib', 'bcrypt', 'jwt', 'alembic')
+
+
+async def _child(token: str) -> dict:
+    timings = {}
+    started = time.perf_counter()
+    import src.main
+    timings['import'] = time.perf_counter() - started
+    loaded = {name: name in sys.modules for name in LAZY_MODULES}
+
+    import httpx
+    from src.auth.throttle import user_throttle
+    user_throttle.enabled = False
+
+    mark = time.perf_counter()
+    app = src.main.create_app()
+    timings['create_app'] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        timings['lifespan_startup'] = time.perf_counter() - mark
+        headers = {'Authorization': f'Bearer {token}'}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+            for phase, path in (('first_request', '/todos/'), ('second_request', '/todos/'),
+                                ('first_openapi', '/openapi.json'), ('second_openapi', '/openapi.json')):
+                mark = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                timings[phase] = time.perf_counter() - mark
+                response.raise_for_status()
+    timings['ready'] = timings['import'] + timings['create_app'] + timings['lifespan_startup'] + timings['first_request']
+    return {'timings': timings, 'loaded_on_import': loaded}
+
+
+def seed(todos: int):
+    from datetime import timedelta
+    from uuid import uuid4
+    from sqlalchemy import insert
+    from src.auth.service import create_access_token
+    from src.database.core import SessionLocal
+    from src.entities.todo import Todo
+    from src.entities.user import User
+    from src.main import run_migrations
+
+    # The schema the app runs against, constraints and indexes included
+    run_migrations()
+    user = User(id=uuid4(), email=f'startup-{uuid4().hex[:8]}@example.com', first_name='Bench', last_name='Startup', password_hash='-')
+    with SessionLocal() as db:
+        db.add(user)
+        db.flush()
+        if todos:
+            db.execute(insert(Todo), [{'id': uuid4(), 'user_id': user.id, 'description': f'startup #{n}'} for n in range(todos)])
+        db.commit()
+    return user, create_access_token(user.email, user.id, timedelta(minutes=30))
+
+
+def cleanup(user) -> None:
+    from sqlalchemy import delete
+    from src.database.core import SessionLocal
+    from src.entities.todo import Todo
+    from src.entities.user import User
+
+    with SessionLocal() as db:
+        db.execute(delete(Todo).where(Todo.user_id == user.id))
+        db.execute(delete(User).where(User.id == user.id))
+        db.commit()
+
+
+def run(args) -> dict:
+    user, token = seed(args.todos)
+    samples = []
+    try:
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.startup', '--child', token],
+                capture_output=True, text=True, env=os.environ.copy(), check=True,
+            )
+            sample = json.loads(result.stdout.strip().splitlines()[-1])
+            sample['timings']['process'] = time.perf_counter() - started
+            samples.append(sample)
+    finally:
+        cleanup(user)
+
+    phases = {}
+    for phase in samples[0]['timings']:
+        values = [sample['timings'][phase] for sample in samples]
+        phases[phase] = {'median_ms': round(statistics.median(values) * 1000, 1), 'best_ms': round(min(values) * 1000, 1)}
+    return {
+        'runs': args.runs,
+        'phases': phases,
+        'loaded_on_import': {name: any(sample['loaded_on_import'][name] for sample in samples) for name in LAZY_MODULES},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=10, help='fresh processes to start')
+    parser.add_argument('--todos', type=int, default=50, help='todos seeded for the first-request page')
+    parser.add_argument('--child', metavar='TOKEN', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(_child(args.child))))
+        return
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the todo write paths.
+
+Runs every mutation in todos.service next to the load/commit/refresh version it
+replaced and reports mean latency plus database round trips per call. The baselines
+keep the same books as the service (version bump, counters, tombstones), one
+statement at a time, so both sides do the same work. Point DATABASE_URL at a
+scratch database: the script migrates it, creates a throwaway user and removes it
+again afterwards. With --check it exits non-zero when a current path takes more
+round trips than its baseline, or is slower by more than --tolerance.
+
+    python -m benchmarks.write_paths --iterations 500 --check
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from sqlalchemy import delete, event
+
+from src.database.core import SessionLocal, engine
+from src.entities.todo import Todo
+from src.entities.todo_counter import TodoCounter
+from src.entities.todo_tombstone import TodoTombstone
+from src.entities.user import User
+from src.main import run_migrations
+from src.todos import counters, schemas, service
+
+
+class RoundTripCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_statement)
+        event.listen(engine, 'commit', self._on_statement)
+
+    def _on_statement(self, *args, **kwargs):
+        self.count += 1
+
+
+""" The previous implementations, kept here as the baseline """
+
+def legacy_create(user, db, todo):
+    change_seq = service._next_change_seq(db, user.id)
+    new_todo = Todo(**todo.model_dump(), user_id=user.id, change_seq=change_seq, updated_at=datetime.now(timezone.utc))
+    db.add(new_todo)
+    counters.apply_delta(db, user.id, counters.counter_delta([], [(False, new_todo.priority)]))
+    db.commit()
+    db.refresh(new_todo)
+    return new_todo
+
+
+def _legacy_get(user, db, todo_id):
+    return db.query(Todo).filter(Todo.id == todo_id, Todo.user_id == user.id).first()
+
+
+def legacy_update(user, db, todo_id, todo_update):
+    change_seq = service._next_change_seq(db, user.id)
+    todo = _legacy_get(user, db, todo_id)
+    before = (todo.is_completed, todo.priority)
+    for key, value in todo_update.model_dump(exclude_unset=True).items():
+        setattr(todo, key, value)
+    todo.version += 1
+    todo.change_seq = change_seq
+    todo.updated_at = datetime.now(timezone.utc)
+    counters.apply_delta(db, user.id, counters.counter_delta([before], [(todo.is_completed, todo.priority)]))
+    db.commit()
+    db.refresh(todo)
+    return todo
+
+
+def legacy_complete(user, db, todo_id):
+    change_seq = service._next_change_seq(db, user.id)
+    todo = _legacy_get(user, db, todo_id)
+    before = (todo.is_completed, todo.priority)
+    todo.is_completed = True
+    todo.completed_at = todo.updated_at = datetime.now(timezone.utc)
+    todo.version += 1
+    todo.change_seq = change_seq
+    counters.apply_delta(db, user.id, counters.counter_delta([before], [(True, todo.priority)]))
+    db.commit()
+    db.refresh(todo)
+    return todo
+
+
+def legacy_delete(user, db, todo_id):
+    change_seq = service._next_change_seq(db, user.id)
+    todo = _legacy_get(user, db, todo_id)
+    db.delete(todo)
+    db.add(TodoTombstone(todo_id=todo.id, user_id=user.id, change_seq=change_seq))
+    counters.apply_delta(db, user.id, counters.counter_delta([(todo.is_completed, todo.priority)], []))
+    db.commit()
+
+
+def run(iterations, counter, fn) -> tuple[float, float]:
+    """Mean milliseconds and round trips per call."""
+    counter.count = 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    elapsed = time.perf_counter() - started
+    return elapsed / iterations * 1000, counter.count / iterations
+
+
+def regressions(results: dict, tolerance: float) -> list[str]:
+    """The routes whose current path does worse than the baseline."""
+    found = []
+    for name, variants in results.items():
+        (legacy_ms, legacy_trips), (current_ms, current_trips) = variants['legacy'], variants['returning']
+        if current_trips > legacy_trips:
+            found.append(f'{name}: {current_trips:.1f} round trips, baseline {legacy_trips:.1f}')
+        if current_ms > legacy_ms * (1 + tolerance):
+            found.append(f'{name}: {current_ms:.3f} ms, baseline {legacy_ms:.3f} ms')
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3, help='rounds alternating the two variants; the best of each is reported')
+    parser.add_argument('--check', action='store_true', help='exit non-zero if a current path is worse than its baseline')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='slowdown --check accepts, as a fraction of the baseline')
+    args = parser.parse_args()
+    n = args.iterations
+
+    # The schema the app runs against, constraints and indexes included
+    run_migrations()
+    user = User(id=uuid4(), email=f'bench-{uuid4()}@example.com', first_name='Bench', last_name='User', password_hash='x')
+    with SessionLocal() as db:
+        db.add(user)
+        db.commit()
+
+    counter = RoundTripCounter()
+    payload = schemas.TodoCreate(description='benchmark todo')
+    change = schemas.TodoCreate(description='changed')
+
+    results: dict[str, dict[str, tuple[float, float]]] = {}
+    print(f'database: {engine.dialect.name}')
+    print(f"{'route':<22} {'mean':>12} {'trips':>8}")
+    try:
+        with SessionLocal() as db:
+            for name, old, new in (
+                ('create', legacy_create, service.create_todo),
+                ('update', legacy_update, service.update_todo),
+                ('complete', legacy_complete, service.complete_todo),
+                ('delete', legacy_delete, service.delete_todo),
+            ):
+                variants = results[name] = {}
+                for _ in range(args.repeat):
+                    for variant, fn in (('legacy', old), ('returning', new)):
+                        if name == 'create':
+                            measured = run(n, counter, lambda i: fn(user, db, payload))
+                        else:
+                            ids = [service.create_todo(user, db, payload).id for _ in range(n)]
+                            db.expunge_all()
+                            if name == 'update':
+                                measured = run(n, counter, lambda i: fn(user, db, ids[i], change))
+                            else:
+                                measured = run(n, counter, lambda i: fn(user, db, ids[i]))
+                        variants[variant] = min(variants.get(variant, measured), measured)
+                for variant, (mean_ms, trips) in variants.items():
+                    print(f"{name + f' ({variant})':<22} {mean_ms:>9.3f} ms {trips:>8.1f}")
+    finally:
+        with SessionLocal() as db:
+            for model in (Todo, TodoTombstone, TodoCounter):
+                db.execute(delete(model).where(model.user_id == user.id))
+            db.execute(delete(User).where(User.id == user.id))
+            db.commit()
+
+    if args.check:
+        found = regressions(results, args.tolerance)
+        if found:
+            sys.exit('slower than the baseline:\n  ' + '\n  '.join(found))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+"""
+Test settings. They are read when `src` is first imported, and the scripts in this
+directory import it while pytest collects them, so they are set here rather than in
+tests/conftest.py. The tests run against a throwaway SQLite file unless
+TEST_DATABASE_URL points at a scratch database (its tables are dropped and migrated).
+"""
+import os
+import tempfile
+
+os.environ['DATABASE_URL'] = os.getenv('TEST_DATABASE_URL') or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='todo-tests-'), 'test.db')}"
+os.environ.setdefault('PASSWORD_HASH_ROUNDS', '4')          # the bcrypt minimum, hashing is not under test
+os.environ.setdefault('TODO_ARCHIVE_INTERVAL_SECONDS', '0')  # tests run the jobs themselves
+os.environ.setdefault('TODO_TOMBSTONE_PRUNE_INTERVAL_SECONDS', '0')
@@ -0,0 +1,101 @@
+"""Todo list indexes, ETag versions, delta sync, counters and full-text search
+
+Revision ID: 0002_todo_indexes_sync_counters_search
+Revises: 0001_baseline
+Create Date: 2026-10-18 00:00:01
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002_todo_indexes_sync_counters_search'
+down_revision: Union[str, Sequence[str], None] = '0001_baseline'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Matches SEARCH_CONFIG in src/entities/todo.py at the time of this revision
+SEARCH_CONFIG = 'english'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'sqlite':
+        # This revision id is longer than the varchar(32) alembic creates its version
+        # table with; alembic stamps it after upgrade() in the same transaction
+        op.alter_column('alembic_version', 'version_num', type_=sa.String(64), existing_type=sa.String(32), existing_nullable=False)
+    op.add_column('users', sa.Column('todos_version', sa.BigInteger(), server_default='0', nullable=False))
+    op.add_column('todos', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('todos', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.add_column('todos', sa.Column('change_seq', sa.BigInteger(), server_default='0', nullable=False))
+
+    op.create_index('ix_todos_user_id_created_at_id', 'todos', ['user_id', 'created_at', 'id'])
+    op.create_index('ix_todos_user_id_is_completed_created_at_id', 'todos', ['user_id', 'is_completed', 'created_at', 'id'])
+    op.create_index('ix_todos_user_id_due_date_id', 'todos', ['user_id', 'due_date', 'id'])
+    op.create_index('ix_todos_user_id_change_seq_id', 'todos', ['user_id', 'change_seq', 'id'])
+    op.create_index(
+        'ix_todos_open_user_id_due_date', 'todos', ['user_id', 'due_date'],
+        postgresql_where=sa.text('NOT is_completed'), sqlite_where=sa.text('NOT is_completed'),
+    )
+
+    # Rows are backfilled lazily by the first write or /todos/stats read of each user,
+    # or all at once with `python -m src.todos.counters`
+    op.create_table(
+        'todo_counters',
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('open_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('completed_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('open_normal', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('open_low', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('open_medium', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('open_high', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('open_top', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+    op.create_table(
+        'todo_tombstones',
+        sa.Column('todo_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('change_seq', sa.BigInteger(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('todo_id'),
+    )
+    op.create_index('ix_todo_tombstones_user_id_change_seq_todo_id', 'todo_tombstones', ['user_id', 'change_seq', 'todo_id'])
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute('CREATE EXTENSION IF NOT EXISTS btree_gin')
+        op.execute(f"ALTER TABLE todos ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (to_tsvector('{SEARCH_CONFIG}', description)) STORED")
+        op.execute('CREATE INDEX ix_todos_user_id_search_vector ON todos USING gin (user_id, search_vector)')
+        op.execute('CREATE INDEX ix_todos_user_id_description_trgm ON todos USING gin (user_id, description gin_trgm_ops)')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP INDEX ix_todos_user_id_description_trgm')
+        op.execute('DROP INDEX ix_todos_user_id_search_vector')
+        op.execute('ALTER TABLE todos DROP COLUMN search_vector')
+
+    op.drop_index('ix_todo_tombstones_user_id_change_seq_todo_id', table_name='todo_tombstones')
+    op.drop_table('todo_tombstones')
+    op.drop_table('todo_counters')
+
+    op.drop_index('ix_todos_open_user_id_due_date', table_name='todos')
+    op.drop_index('ix_todos_user_id_change_seq_id', table_name='todos')
+    op.drop_index('ix_todos_user_id_due_date_id', table_name='todos')
+    op.drop_index('ix_todos_user_id_is_completed_created_at_id', table_name='todos')
+    op.drop_index('ix_todos_user_id_created_at_id', table_name='todos')
+
+    with op.batch_alter_table('todos') as batch_op:
+        batch_op.drop_column('change_seq')
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('version')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('todos_version')
@@ -0,0 +1,52 @@
+"""Case-insensitive unique user email
+
+Revision ID: 0004_case_insensitive_user_email
+Revises: 0003_refresh_tokens
+Create Date: 2026-10-18 00:00:03
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004_case_insensitive_user_email'
+down_revision: Union[str, Sequence[str], None] = '0003_refresh_tokens'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The baseline's unique constraint on users.email is unnamed. PostgreSQL names it
+# users_email_key; on SQLite it is found through this convention when the table is recreated
+SQLITE_NAMING_CONVENTION = {'uq': 'uq_%(table_name)s_%(column_0_name)s'}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    duplicates = bind.execute(sa.text(
+        'SELECT count(*) FROM (SELECT lower(email) FROM users GROUP BY lower(email) HAVING count(*) > 1) AS d'
+    )).scalar()
+    if duplicates:
+        raise RuntimeError(
+            f'{duplicates} emails are registered more than once with different case; '
+            'merge or rename those users before upgrading'
+        )
+
+    if bind.dialect.name == 'sqlite':
+        with op.batch_alter_table('users', recreate='always', naming_convention=SQLITE_NAMING_CONVENTION) as batch_op:
+            batch_op.drop_constraint('uq_users_email', type_='unique')
+    else:
+        op.drop_constraint('users_email_key', 'users', type_='unique')
+    op.create_index('ix_users_email_lower', 'users', [sa.text('lower(email)')], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_email_lower', table_name='users')
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('users', naming_convention=SQLITE_NAMING_CONVENTION) as batch_op:
+            batch_op.create_unique_constraint('uq_users_email', ['email'])
+    else:
+        op.create_unique_constraint('users_email_key', 'users', ['email'])
@@ -0,0 +1,65 @@
+"""Archive table for completed todos
+
+Revision ID: 0005_todos_archive
+Revises: 0004_case_insensitive_user_email
+Create Date: 2026-10-18 00:00:04
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005_todos_archive'
+down_revision: Union[str, Sequence[str], None] = '0004_case_insensitive_user_email'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The type already exists: `todos.priority` created it in 0001_baseline
+priority = postgresql.ENUM('Normal', 'Low', 'Medium', 'High', 'Top', name='priority', create_type=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'todos_archive',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('description', sa.String(), nullable=False),
+        sa.Column('due_date', sa.DateTime(), nullable=True),
+        sa.Column('is_completed', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('priority', priority, nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('change_seq', sa.BigInteger(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_todos_archive_user_id_created_at_id', 'todos_archive', ['user_id', 'created_at', 'id'])
+    op.create_index('ix_todos_archive_user_id_due_date_id', 'todos_archive', ['user_id', 'due_date', 'id'])
+    op.create_index(
+        'ix_todos_completed_completed_at', 'todos', ['completed_at'],
+        postgresql_where=sa.text('is_completed'), sqlite_where=sa.text('is_completed'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Archived todos go back to `todos` first, so downgrading loses nothing.
+    # Their counters are recomputed by `python -m src.todos.counters`
+    op.execute(
+        'INSERT INTO todos (id, user_id, description, due_date, is_completed, created_at, completed_at, '
+        'priority, version, updated_at, change_seq) '
+        'SELECT id, user_id, description, due_date, is_completed, created_at, completed_at, '
+        'priority, version, updated_at, change_seq FROM todos_archive'
+    )
+    op.drop_index('ix_todos_completed_completed_at', table_name='todos')
+    op.drop_index('ix_todos_archive_user_id_due_date_id', table_name='todos_archive')
+    op.drop_index('ix_todos_archive_user_id_created_at_id', table_name='todos_archive')
+    op.drop_table('todos_archive')
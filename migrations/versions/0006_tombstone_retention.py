@@ -0,0 +1,30 @@
+"""Tombstone retention: per-user pruned change sequence
+
+Revision ID: 0006_tombstone_retention
+Revises: 0005_todos_archive
+Create Date: 2026-10-18 00:00:05
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006_tombstone_retention'
+down_revision: Union[str, Sequence[str], None] = '0005_todos_archive'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('pruned_change_seq', sa.BigInteger(), server_default='0', nullable=False))
+    op.create_index('ix_todo_tombstones_deleted_at', 'todo_tombstones', ['deleted_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_todo_tombstones_deleted_at', table_name='todo_tombstones')
+    op.drop_column('users', 'pruned_change_seq')
@@ -0,0 +1,122 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from uuid import UUID
+import os
+import time
+from sqlalchemy import event
+from src.entities.user import User
+
+
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv('AUTH_CACHE_MAX_ENTRIES') or 10_000)
+AUTH_CACHE_TTL_SECONDS = float(os.getenv('AUTH_CACHE_TTL_SECONDS') or 60)
+
+
+@dataclass
+class _Entry:
+    principal: User
+    expires_at: float
+
+
+class PrincipalCache:
+    """
+    Bounded LRU cache of verified access tokens -> authenticated user.
+
+    A hit skips both `jwt.decode` and the `users` lookup. Entries live for at most
+    `ttl_seconds` and never past the token's own `exp`. The cache is per process, so
+    with several workers an invalidation only reaches the worker that ran it; the TTL
+    bounds how long the others can serve a stale principal.
+    """
+
+    def __init__(self, max_entries: int = AUTH_CACHE_MAX_ENTRIES, ttl_seconds: float = AUTH_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._tokens_by_user: dict[UUID, set[str]] = {}
+        self._lock = Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, token: str) -> User | None:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry.principal
+
+    def put(self, token: str, user: User, token_exp: float | None = None) -> User:
+        """Cache a detached snapshot of `user` for `token` and return the snapshot."""
+        principal = _snapshot(user)
+        if not self.enabled:
+            return principal
+
+        ttl = self.ttl_seconds
+        if token_exp is not None:
+            ttl = min(ttl, token_exp - time.time())
+        if ttl <= 0:
+            return principal
+
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = _Entry(principal, time.monotonic() + ttl)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return principal
+
+    def invalidate_user(self, user_id: UUID) -> None:
+        with self._lock:
+            for token in self._tokens_by_user.pop(user_id, set()):
+                self._entries.pop(token, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def _remove(self, token: str) -> None:
+        entry = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(entry.principal.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[entry.principal.id]
+
+
+def _snapshot(user: User) -> User:
+    # A transient copy is never attached to a session, so it cannot be expired by a
+    # commit in some later request or fail with DetachedInstanceError once cached.
+    return User(id=user.id, email=user.email, first_name=user.first_name, last_name=user.last_name)
+
+
+principal_cache = PrincipalCache()
+
+
+@event.listens_for(User, 'after_delete')
+def _invalidate_deleted_user(mapper, connection, target: User) -> None:
+    principal_cache.invalidate_user(target.id)
@@ -1,7 +1,7 @@
 from typing import Annotated
 from fastapi import APIRouter, status, Request, Depends
 from fastapi.security import OAuth2PasswordRequestForm
-from ..database.core import DbSession
+from ..database.core import RouteDbSession
 from ..rate_limiter import limiter
 from . import schemas
 from . import service
@@ -16,19 +16,31 @@ router = APIRouter(
 
 @router.post('/', status_code=status.HTTP_201_CREATED, response_model=UserResponse)
 @limiter.limit('5/minute')
-async def register_user(request: Request, register_user_request: schemas.RegisterUserRequest, db: DbSession):
-    return service.register_user(db, register_user_request)
+async def register_user(request: Request, register_user_request: schemas.RegisterUserRequest, db: RouteDbSession):
+    return await service.register_user_async(db, register_user_request)
 
 
 @router.post('/login', response_model=schemas.Token)
 @limiter.limit('5/minute')
-async def login(login_request: schemas.LoginRequest, db: DbSession):
+async def login(request: Request, login_request: schemas.LoginRequest, db: RouteDbSession):
     """Login with email and password - works well with /docs"""
-    return service.login_for_access_token(login_request.email, login_request.password, db)
+    return await service.login_for_access_token_async(login_request.email, login_request.password, db)
 
 
 @router.post('/token', response_model=schemas.Token)
 @limiter.limit('5/minute')
-async def login_for_access_token(form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: DbSession):
+async def login_for_access_token(request: Request, form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: RouteDbSession):
     """OAuth2 compatible login for external clients"""
-    return service.login_for_access_token(form_data.username, form_data.password, db)
\ No newline at end of file
+    return await service.login_for_access_token_async(form_data.username, form_data.password, db)
+
+@router.post('/refresh', response_model=schemas.Token)
+@limiter.limit('60/minute')
+async def refresh(request: Request, refresh_request: schemas.RefreshRequest, db: RouteDbSession):
+    """Trade a refresh token for a new token pair; each refresh token works once"""
+    return await service.refresh_access_token_async(db, refresh_request.refresh_token)
+
+
+@router.post('/logout', status_code=status.HTTP_204_NO_CONTENT)
+async def logout(refresh_request: schemas.RefreshRequest, db: RouteDbSession):
+    """Revoke the session of this refresh token, including its access tokens"""
+    await service.logout_async(db, refresh_request.refresh_token)
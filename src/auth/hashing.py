@@ -0,0 +1,153 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import cache
+from typing import Any, Callable
+import asyncio
+import logging
+import os
+import threading
+import time
+from ..exceptions import PasswordHashingBusyError
+
+
+PASSWORD_HASH_EXECUTOR = (os.getenv('PASSWORD_HASH_EXECUTOR') or 'thread').lower()
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS') or min(4, os.cpu_count() or 1))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv('PASSWORD_HASH_MAX_QUEUE') or 64)
+
+# bcrypt cost of new hashes: fixed by PASSWORD_HASH_ROUNDS, or else the highest cost
+# whose hash fits PASSWORD_HASH_TARGET_MS on this hardware, within the min/max bounds
+PASSWORD_HASH_ROUNDS = int(os.getenv('PASSWORD_HASH_ROUNDS') or 0)
+PASSWORD_HASH_TARGET_MS = float(os.getenv('PASSWORD_HASH_TARGET_MS') or 250)
+PASSWORD_HASH_MIN_ROUNDS = int(os.getenv('PASSWORD_HASH_MIN_ROUNDS') or 10)
+PASSWORD_HASH_MAX_ROUNDS = int(os.getenv('PASSWORD_HASH_MAX_ROUNDS') or 14)
+
+# Calibration times this cheap cost and extrapolates: every extra round doubles the work
+CALIBRATION_ROUNDS = 8
+
+
+class PasswordHashPool:
+    """
+    Bounded executor for CPU-bound bcrypt work.
+
+    Hashing runs on `workers` threads (bcrypt releases the GIL) or processes, never on
+    the event loop. At most `max_queue` calls may wait for a free worker; beyond that
+    callers get a 503 straight away instead of piling up behind a login storm.
+    """
+
+    def __init__(self, kind: str = PASSWORD_HASH_EXECUTOR, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        if kind not in ('thread', 'process'):
+            raise ValueError(f"PASSWORD_HASH_EXECUTOR must be 'thread' or 'process', got {kind!r}")
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._executor: Executor | None = None
+
+    @property
+    def queued(self) -> int:
+        return max(0, self.pending - self.workers)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        # Only touched from the event loop thread, so the counters need no lock
+        if self.pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            logging.warning('Password hashing pool saturated (%s pending), rejecting request', self.pending)
+            raise PasswordHashingBusyError()
+
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            'executor': self.kind,
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'in_flight': min(self.pending, self.workers),
+            'queued': self.queued,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'bcrypt_rounds': _rounds or 0,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+        return self._executor
+
+
+password_hash_pool = PasswordHashPool()
+
+
+""" bcrypt cost """
+
+def calibrate_bcrypt_rounds(
+    target_ms: float = PASSWORD_HASH_TARGET_MS,
+    min_rounds: int = PASSWORD_HASH_MIN_ROUNDS,
+    max_rounds: int = PASSWORD_HASH_MAX_ROUNDS,
+) -> tuple[int, float]:
+    """The highest cost within the bounds whose hash takes at most `target_ms`, and its expected milliseconds."""
+    import bcrypt
+
+    salt = bcrypt.gensalt(rounds=CALIBRATION_ROUNDS)
+    samples = []
+    for _ in range(3):
+        started = time.perf_counter()
+        bcrypt.hashpw(b'calibration', salt)
+        samples.append((time.perf_counter() - started) * 1000)
+    base_ms = min(samples)
+
+    rounds = max(min_rounds, CALIBRATION_ROUNDS)
+    while rounds < max_rounds and base_ms * 2 ** (rounds + 1 - CALIBRATION_ROUNDS) <= target_ms:
+        rounds += 1
+    rounds = min(rounds, max_rounds)
+    return rounds, base_ms * 2 ** (rounds - CALIBRATION_ROUNDS)
+
+
+_rounds: int | None = None
+_rounds_lock = threading.Lock()
+
+
+def bcrypt_rounds() -> int:
+    """Cost for new hashes, calibrated once per process (the app does it at startup)."""
+    global _rounds
+    if _rounds is None:
+        with _rounds_lock:
+            if _rounds is None:
+                if PASSWORD_HASH_ROUNDS:
+                    _rounds = PASSWORD_HASH_ROUNDS
+                    logging.info('bcrypt cost fixed at %s', _rounds)
+                else:
+                    _rounds, expected_ms = calibrate_bcrypt_rounds()
+                    if expected_ms > PASSWORD_HASH_TARGET_MS:
+                        logging.warning('bcrypt cost %s takes about %.0f ms here, over the %.0f ms target', _rounds, expected_ms, PASSWORD_HASH_TARGET_MS)
+                    else:
+                        logging.info('bcrypt cost calibrated to %s, about %.0f ms per hash', _rounds, expected_ms)
+    return _rounds
+
+
+@cache
+def password_context(rounds: int | None = None):
+    """
+    passlib context for the stored hash formats. `rounds` only matters for hashing and
+    `needs_update`; verifying reads the cost from the hash itself.
+
+    `bcrypt` is used up to bcrypt's 72-byte input limit. Longer passwords go through
+    `bcrypt_sha256`, whose hashes record that the password was pre-hashed.
+    """
+    from passlib.context import CryptContext
+
+    settings = {'bcrypt__rounds': rounds, 'bcrypt_sha256__rounds': rounds} if rounds else {}
+    return CryptContext(schemes=['bcrypt', 'bcrypt_sha256'], **settings)
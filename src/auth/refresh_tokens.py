@@ -0,0 +1,153 @@
+"""
+Refresh token housekeeping: the revocation filter and pruning.
+
+Access tokens carry the refresh token family they were issued for (`fid`). When a
+family is revoked (logout, or reuse of a rotated refresh token), its access tokens
+must stop working before they expire. `revoked_families` is a Bloom filter of the
+families revoked within one access token lifetime. Most requests pass it with a few
+hash probes; a hit is confirmed with one indexed lookup, so false positives only
+cost time. Revocations made by this process go in immediately. Each worker reloads
+the filter from the database every REVOCATION_SYNC_SECONDS to see the others' revocations;
+local revocations made while a reload reads the database are carried over into the
+reloaded filter.
+
+Expired tokens are pruned with:
+
+    python -m src.auth.refresh_tokens
+"""
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+import argparse
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import threading
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from src.database.core import SessionLocal
+from src.entities.refresh_token import RefreshToken
+
+
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv('REFRESH_TOKEN_EXPIRE_DAYS') or 30)
+REVOCATION_FILTER_BITS = int(os.getenv('REVOCATION_FILTER_BITS') or 1 << 20)  # 128 KiB
+REVOCATION_FILTER_HASHES = 7
+REVOCATION_SYNC_SECONDS = float(os.getenv('REVOCATION_SYNC_SECONDS') or 30)
+PRUNE_BATCH_SIZE = 1000
+
+
+def utcnow() -> datetime:
+    # The DateTime columns hold naive UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class RevocationFilter:
+    """Bloom filter over family ids: no false negatives, about 1% false positives at 100k entries."""
+
+    def __init__(self, bits: int = REVOCATION_FILTER_BITS, hashes: int = REVOCATION_FILTER_HASHES):
+        self.bits = bits
+        self.hashes = hashes
+        self.entries = 0
+        self._array = bytearray(math.ceil(bits / 8))
+        self._lock = threading.Lock()
+        # Families added since begin_reload(), while a reload is in progress
+        self._pending: list[UUID] | None = None
+
+    def _positions(self, family_id: UUID):
+        # Double hashing: k probes from the two halves of one digest
+        digest = hashlib.blake2b(family_id.bytes, digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def _set(self, family_id: UUID) -> None:
+        for position in self._positions(family_id):
+            self._array[position >> 3] |= 1 << (position & 7)
+        self.entries += 1
+
+    def add(self, family_id: UUID) -> None:
+        with self._lock:
+            self._set(family_id)
+            if self._pending is not None:
+                self._pending.append(family_id)
+
+    def might_contain(self, family_id: UUID) -> bool:
+        array = self._array
+        return all(array[position >> 3] & (1 << (position & 7)) for position in self._positions(family_id))
+
+    def begin_reload(self) -> None:
+        """Call before reading the snapshot for `replace`: adds from here on are kept."""
+        with self._lock:
+            self._pending = []
+
+    def replace(self, family_ids: list[UUID]) -> None:
+        """
+        Rebuild from scratch, so families that aged out stop matching. Families added
+        since begin_reload() may be missing from `family_ids` and are merged in.
+        """
+        fresh = RevocationFilter(self.bits, self.hashes)
+        for family_id in family_ids:
+            fresh._set(family_id)
+        with self._lock:
+            for family_id in self._pending or ():
+                fresh._set(family_id)
+            self._array, self.entries = fresh._array, fresh.entries
+            self._pending = None
+
+    def stats(self) -> dict:
+        false_positive_rate = (1 - math.exp(-self.hashes * self.entries / self.bits)) ** self.hashes
+        return {'entries': self.entries, 'bits': self.bits, 'false_positive_rate': false_positive_rate}
+
+
+revoked_families = RevocationFilter()
+
+
+def recently_revoked_families(db: Session) -> list[UUID]:
+    from .service import ACCESS_TOKEN_EXPIRE_MINUTES  # service imports this module
+
+    # Older revocations have no live access tokens left to reject
+    cutoff = utcnow() - timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    return list(db.scalars(select(RefreshToken.family_id).where(RefreshToken.revoked_at >= cutoff).distinct()))
+
+
+def reload_revocations() -> None:
+    revoked_families.begin_reload()
+    with SessionLocal() as db:
+        revoked_families.replace(recently_revoked_families(db))
+
+
+async def sync_revocations(interval: float = REVOCATION_SYNC_SECONDS) -> None:
+    """Reload the filter forever; the app runs this from its lifespan."""
+    while True:
+        try:
+            await run_in_threadpool(reload_revocations)
+        except Exception as e:
+            logging.warning('Could not reload revoked refresh token families: %s', e)
+        await asyncio.sleep(interval)
+
+
+def prune(db: Session, batch_size: int = PRUNE_BATCH_SIZE) -> int:
+    """Delete expired refresh tokens in batches. Returns the number deleted."""
+    pruned = 0
+    while True:
+        expired = select(RefreshToken.id).where(RefreshToken.expires_at < utcnow()).limit(batch_size)
+        deleted = db.execute(delete(RefreshToken).where(RefreshToken.id.in_(expired.scalar_subquery()))).rowcount
+        db.commit()
+        pruned += deleted
+        if deleted < batch_size:
+            return pruned
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Delete expired refresh tokens.')
+    parser.add_argument('--batch-size', type=int, default=PRUNE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        pruned = prune(db, args.batch_size)
+    print(f'Pruned {pruned} expired refresh tokens')
+
+
+if __name__ == "__main__":
+    main()
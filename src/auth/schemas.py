@@ -16,10 +16,19 @@ class LoginRequest(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    # Trade it at /auth/refresh for the next pair instead of logging in again
+    refresh_token: str | None = None
+    expires_in: int | None = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
     user_id: str | None = None
+    exp: float | None = None
+    family_id: str | None = None
 
     def get_uuid(self) -> UUID | None:
         if self.user_id:
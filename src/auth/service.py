@@ -1,21 +1,26 @@
-from datetime import timedelta, datetime, timezone
+from datetime import timedelta, datetime
 from typing import Annotated
 from uuid import UUID, uuid4
+import base64
+import hmac
 from fastapi import Depends, HTTPException, status
-from passlib.context import CryptContext
-import jwt
-from jwt import PyJWTError
 import hashlib
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from src.entities.refresh_token import RefreshToken
 from src.entities.user import User
 from . import schemas
-from fastapi.security import HTTPBearer, OAuth2PasswordRequestForm, OAuth2PasswordBearer
+from fastapi.security import OAuth2PasswordBearer
 from ..exceptions import AuthenticationError
 import logging
 import os
-from ..database.core import get_db
+from ..database.core import RouteDbSession, run_sync
+from .cache import principal_cache
+from .hashing import bcrypt_rounds, password_context, password_hash_pool
+from .refresh_tokens import REFRESH_TOKEN_EXPIRE_DAYS, revoked_families, utcnow
 from sqlalchemy.exc import IntegrityError
-from fastapi.security import HTTPAuthorizationCredentials
 
 
 SECRET_KEY = os.getenv('SECRET_KEY') or 'your-secret-key-change-in-production'
@@ -26,115 +31,184 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 # oauth2_bearer = OAuth2PasswordBearer(tokenUrl='auth/token')
 # oauth2_bearer = HTTPBearer()
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="auth/token")
-bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 
+# bcrypt only reads this many bytes of a password
+BCRYPT_MAX_BYTES = 72
 
 
 """ Password: Authenticate user """
 
+def _legacy_secret(plain_password: str, hashed_password: str) -> str:
+    # Before bcrypt_sha256, passwords over 72 bytes were stored as plain bcrypt hashes
+    # of their SHA-256 hex digest, which nothing in the hash itself records
+    if len(plain_password.encode('utf-8')) > BCRYPT_MAX_BYTES and password_context().identify(hashed_password) == 'bcrypt':
+        return hashlib.sha256(plain_password.encode('utf-8')).hexdigest()
+    return plain_password
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     try:
-        # Handle bcrypt length limit by hashing long passwords first
-        if len(plain_password.encode('utf-8')) > 72:
-            # Hash the password with SHA256 first, then use bcrypt
-            password_hash = hashlib.sha256(plain_password.encode('utf-8')).hexdigest()
-            return bcrypt_context.verify(password_hash, hashed_password)
-        else:
-            return bcrypt_context.verify(plain_password, hashed_password)
+        return password_context().verify(_legacy_secret(plain_password, hashed_password), hashed_password)
     except Exception as e:
-        logging.error(f"Password verification error: {e}")
+        logging.error("Password verification error: %s", e)
         return False
 
-def get_password_hash(password: str) -> str:
+
+def password_needs_rehash(plain_password: str, hashed_password: str, rounds: int | None = None) -> bool:
+    """After a successful verify: is the stored hash in an older format or cost than new hashes get?"""
+    if _legacy_secret(plain_password, hashed_password) != plain_password:
+        return True
+    return password_context(rounds or bcrypt_rounds()).needs_update(hashed_password)
+
+
+def get_password_hash(password: str, rounds: int | None = None) -> str:
     try:
-        # Handle bcrypt length limit by hashing long passwords first
-        if len(password.encode('utf-8')) > 72:
-            # Hash the password with SHA256 first, then use bcrypt
-            password_hash = hashlib.sha256(password.encode('utf-8')).hexdigest()
-            return bcrypt_context.hash(password_hash)
-        else:
-            return bcrypt_context.hash(password)
+        # bcrypt ignores everything past 72 bytes, so longer passwords are pre-hashed
+        # by bcrypt_sha256, whose hash format says so
+        scheme = 'bcrypt_sha256' if len(password.encode('utf-8')) > BCRYPT_MAX_BYTES else 'bcrypt'
+        return password_context(rounds or bcrypt_rounds()).handler(scheme).hash(password)
     except Exception as e:
-        logging.error(f"Password hashing error: {e}")
+        logging.error("Password hashing error: %s", e)
         # Fallback to simple hash if bcrypt fails
         return hashlib.sha256(password.encode('utf-8')).hexdigest()
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hash_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    # The cost is settled here, so process workers never calibrate on their own
+    return await password_hash_pool.run(get_password_hash, password, bcrypt_rounds())
+
+
+def _store_rehashed_password(db: Session, user: User, password_hash: str) -> None:
+    # A failed rehash must not fail the login: the old hash still works next time
+    try:
+        user.password_hash = password_hash
+        db.commit()
+        logging.info('Rehashed password of user %s with the current parameters', user.id)
+    except Exception as e:
+        db.rollback()
+        logging.warning('Could not store rehashed password of user %s: %s', user.id, e)
+
+
+def _get_user_by_email(db: Session, email: str) -> User | None:
+    # Same expression as ix_users_email_lower, so the lookup uses that index
+    return db.query(User).filter(func.lower(User.email) == func.lower(email)).first()
+
+
 def authenticate_user(email:str, password:str, db:Session) -> User | bool:
-    user = db.query(User).filter(User.email == email).first()
+    user = _get_user_by_email(db, email)
     if not user or not verify_password(password, user.password_hash):
-        logging.warning(f'Failed to authenticate email for {email}')
+        logging.warning('Failed to authenticate email for %s', email)
         return False
+    if password_needs_rehash(password, user.password_hash):
+        _store_rehashed_password(db, user, get_password_hash(password))
+    return user
+
+
+async def authenticate_user_async(email: str, password: str, db: Session | AsyncSession) -> User | bool:
+    user = await run_sync(db, _get_user_by_email, email)
+    if not user or not await verify_password_async(password, user.password_hash):
+        logging.warning('Failed to authenticate email for %s', email)
+        return False
+    # Parsing the stored hash is cheap; only an outdated one costs a second bcrypt
+    if password_needs_rehash(password, user.password_hash):
+        await run_sync(db, _store_rehashed_password, user, await get_password_hash_async(password))
     return user
 
 
 """ Access Token"""
 
-def create_access_token(email:str, user_id: UUID, expires_delta: timedelta) -> str:
+def create_access_token(email:str, user_id: UUID, expires_delta: timedelta, family_id: UUID | None = None) -> str:
+    import jwt  # on first use, to keep PyJWT off the cold-start path
     encode = {
         'sub': email,
         'id': str(user_id),
         'exp': datetime.utcnow() + expires_delta
     }
+    if family_id is not None:
+        # Revoking the refresh token family also rejects the access tokens issued for it
+        encode['fid'] = str(family_id)
     return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
 def verify_token(token: str) -> schemas.TokenData:
+    import jwt
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get('id')
         if not user_id:
             raise AuthenticationError("Missing user ID in token")
-        return schemas.TokenData(user_id=user_id)
-    except jwt.JWTError as e:
-        logging.warning(f'Token verification failed: {str(e)}')
+        return schemas.TokenData(user_id=user_id, exp=payload.get('exp'), family_id=payload.get('fid'))
+    except jwt.PyJWTError as e:
+        logging.warning('Token verification failed: %s', e)
         raise AuthenticationError("Invalid token")
     
 
 """" Fetch Current User using access token"""
 
 
-def register_user(db, register_user_request: schemas.RegisterUserRequest):
-    try:
-        # 1️⃣ Check if user already exists
-        existing_user = db.query(User).filter(User.email == register_user_request.email).first()
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
+def _insert_user(db: Session):
+    # Dialects with ON CONFLICT report a taken email as "no row returned" instead of
+    # an IntegrityError, so registering is a single statement either way
+    dialect = db.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(User).on_conflict_do_nothing(index_elements=[func.lower(User.email)])
+    if dialect == 'sqlite':
+        return sqlite.insert(User).on_conflict_do_nothing(index_elements=[func.lower(User.email)])
+    return insert(User)
 
-        # 2️⃣ Create new user
-        hashed_password = get_password_hash(register_user_request.password)
-        new_user = User(
-            id=uuid4(),
-            email=register_user_request.email,
-            first_name=register_user_request.first_name,
-            last_name=register_user_request.last_name,
-            password_hash=hashed_password
-        )
 
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+def _email_taken() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Email already registered"
+    )
+
 
-        logging.info(f"✅ User {new_user.email} registered successfully.")
-        return new_user  # Returning model (works fine if response_model handles it)
+def _create_user(db: Session, register_user_request: schemas.RegisterUserRequest, hashed_password: str) -> User:
+    try:
+        new_user = db.scalars(
+            _insert_user(db)
+            .values(
+                id=uuid4(),
+                email=register_user_request.email,
+                first_name=register_user_request.first_name,
+                last_name=register_user_request.last_name,
+                password_hash=hashed_password
+            )
+            .returning(User)
+        ).one_or_none()
+        db.commit()
 
     except IntegrityError as e:
         db.rollback()
-        logging.error(f"IntegrityError: ❌ Email already registered - {e}")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already exists."
-        )
+        logging.error("IntegrityError: ❌ Email already registered - %s", e)
+        raise _email_taken()
     except Exception as e:
         db.rollback()
-        logging.error(f"Unexpected error: {e}")
+        logging.error("Unexpected error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Something went wrong while creating the user."
         )
+
+    if new_user is None:
+        logging.warning("❌ Email already registered: %s", register_user_request.email)
+        raise _email_taken()
+    logging.info("✅ User %s registered successfully.", new_user.email)
+    return new_user  # Returning model (works fine if response_model handles it)
+
+
+def register_user(db, register_user_request: schemas.RegisterUserRequest):
+    return _create_user(db, register_user_request, get_password_hash(register_user_request.password))
+
+
+async def register_user_async(db: Session | AsyncSession, register_user_request: schemas.RegisterUserRequest) -> User:
+    hashed_password = await get_password_hash_async(register_user_request.password)
+    return await run_sync(db, _create_user, register_user_request, hashed_password)
     
 
 # def get_current_user(token: Annotated[str, Depends(oauth2_bearer)], db: Annotated[Session, Depends(get_db)]) -> User:
@@ -151,11 +225,17 @@ def register_user(db, register_user_request: schemas.RegisterUserRequest):
 
 # CurrentUser = Annotated[User, Depends(get_current_user)]
 
-def get_current_user(token: Annotated[str, Depends(oauth2_bearer)], db: Annotated[Session, Depends(get_db)]) -> User:
+def _get_user_by_id(db: Session, user_id: UUID) -> User | None:
+    return db.query(User).filter(User.id == user_id).first()
+
 
-# def get_current_user(token: Annotated[HTTPAuthorizationCredentials, Depends(oauth2_bearer)],db: Annotated[Session, Depends(get_db)]) -> User:
-    # Extract actual token string from credentials object
-    token_data = verify_token(token.credentials)
+async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)], db: RouteDbSession) -> User:
+    # Tokens already verified in this process skip jwt.decode and the users lookup
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
+    token_data = verify_token(token)
     user_id = token_data.user_id
 
     if user_id is None:
@@ -167,11 +247,22 @@ def get_current_user(token: Annotated[str, Depends(oauth2_bearer)], db: Annotate
     except ValueError:
         raise AuthenticationError("Invalid user ID in token")
     
-    user = db.query(User).filter(User.id == user_id).first()
+    # A filter miss proves the session was not revoked; a hit is confirmed in the database.
+    # Other workers' revocations show up after REVOCATION_SYNC_SECONDS, and tokens
+    # already in their principal cache last up to AUTH_CACHE_TTL_SECONDS longer
+    if token_data.family_id is not None:
+        try:
+            family_id = UUID(token_data.family_id)
+        except ValueError:
+            raise AuthenticationError("Invalid token data")
+        if revoked_families.might_contain(family_id) and await run_sync(db, _family_revoked, family_id):
+            raise AuthenticationError("Session has been revoked")
+
+    user = await run_sync(db, _get_user_by_id, user_uuid)
     if user is None:
         raise AuthenticationError("User not found")
-    
-    return user
+
+    return principal_cache.put(token, user, token_data.exp)
 
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
@@ -206,8 +297,7 @@ CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
 
-def login_for_access_token(email: str, password: str, db: Session) -> schemas.Token:
-    user = authenticate_user(email, password, db)
+def _issue_tokens(db: Session, user: User | bool) -> schemas.Token:
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -215,5 +305,138 @@ def login_for_access_token(email: str, password: str, db: Session) -> schemas.To
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    token = create_access_token(user.email, user.id, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    return schemas.Token(access_token=token, token_type='bearer')
\ No newline at end of file
+    # Every login starts a new refresh token family
+    return _token_pair(db, user.id, user.email, uuid4())
+
+
+def login_for_access_token(email: str, password: str, db: Session) -> schemas.Token:
+    return _issue_tokens(db, authenticate_user(email, password, db))
+
+
+async def login_for_access_token_async(email: str, password: str, db: Session | AsyncSession) -> schemas.Token:
+    user = await authenticate_user_async(email, password, db)
+    return await run_sync(db, _issue_tokens, user)
+
+
+""" Refresh Token """
+
+def _sign_refresh_token(token_id: UUID) -> str:
+    digest = hmac.new(SECRET_KEY.encode(), token_id.bytes, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+def _parse_refresh_token(refresh_token: str) -> UUID:
+    # The signature turns away guessed or mangled tokens before they cost a query
+    token_id, _, signature = refresh_token.partition('.')
+    try:
+        token_uuid = UUID(hex=token_id)
+    except ValueError:
+        raise AuthenticationError("Invalid refresh token")
+    if not hmac.compare_digest(signature, _sign_refresh_token(token_uuid)):
+        raise AuthenticationError("Invalid refresh token")
+    return token_uuid
+
+
+def _token_pair(db: Session, user_id: UUID, email: str, family_id: UUID) -> schemas.Token:
+    token_id = uuid4()
+    db.add(RefreshToken(
+        id=token_id,
+        user_id=user_id,
+        family_id=family_id,
+        expires_at=utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    db.commit()
+
+    access_token = create_access_token(email, user_id, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES), family_id)
+    return schemas.Token(
+        access_token=access_token,
+        token_type='bearer',
+        refresh_token=f'{token_id.hex}.{_sign_refresh_token(token_id)}',
+        expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    )
+
+
+def revoke_family(db: Session, family_id: UUID, user_id: UUID) -> None:
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    revoked_families.add(family_id)
+    principal_cache.invalidate_user(user_id)
+
+
+def revoke_user_families(db: Session, user_id: UUID) -> None:
+    """Revoke every refresh token family of `user_id`, ending all of its sessions; commits the session's pending changes with it."""
+    families = db.scalars(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=utcnow())
+        .returning(RefreshToken.family_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    for family_id in set(families):
+        revoked_families.add(family_id)
+    principal_cache.invalidate_user(user_id)
+
+
+def _family_revoked(db: Session, family_id: UUID) -> bool:
+    revoked = select(RefreshToken.id).where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_not(None))
+    return db.scalar(revoked.limit(1)) is not None
+
+
+def refresh_access_token(db: Session, refresh_token: str) -> schemas.Token:
+    """
+    Trade a refresh token for a new access and refresh token pair. No password is
+    checked, so this costs a few indexed queries instead of a bcrypt hash.
+    """
+    token_id = _parse_refresh_token(refresh_token)
+    now = utcnow()
+    # Marking the token used and reading it is one statement, so of two requests
+    # presenting the same token only one can win
+    used = db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.id == token_id,
+            RefreshToken.used_at.is_(None),
+            RefreshToken.revoked_at.is_(None),
+            RefreshToken.expires_at > now,
+        )
+        .values(used_at=now)
+        .returning(RefreshToken.user_id, RefreshToken.family_id)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+    if used is None:
+        token = db.get(RefreshToken, token_id)
+        if token is not None and token.used_at is not None and token.revoked_at is None:
+            # A rotated token came back: whoever holds the family now may be a thief,
+            # so the whole family and its access tokens stop working
+            logging.warning('Refresh token reuse for user %s, revoking family %s', token.user_id, token.family_id)
+            revoke_family(db, token.family_id, token.user_id)
+        raise AuthenticationError("Invalid or expired refresh token")
+
+    email = db.scalar(select(User.email).where(User.id == used.user_id))
+    if email is None:
+        db.rollback()
+        raise AuthenticationError("User not found")
+    return _token_pair(db, used.user_id, email, used.family_id)
+
+
+async def refresh_access_token_async(db: Session | AsyncSession, refresh_token: str) -> schemas.Token:
+    return await run_sync(db, refresh_access_token, refresh_token)
+
+
+def logout(db: Session, refresh_token: str) -> None:
+    """Revoke the refresh token family, and with it the access tokens issued for it."""
+    token = db.get(RefreshToken, _parse_refresh_token(refresh_token))
+    if token is None:
+        raise AuthenticationError("Invalid refresh token")
+    revoke_family(db, token.family_id, token.user_id)
+
+
+async def logout_async(db: Session | AsyncSession, refresh_token: str) -> None:
+    await run_sync(db, logout, refresh_token)
@@ -0,0 +1,112 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from fastapi import Response
+import math
+import os
+import time
+from .service import CurrentUser
+from ..exceptions import UserRateLimitError
+
+
+USER_RATE_LIMIT_PER_SECOND = float(os.getenv('USER_RATE_LIMIT_PER_SECOND') or 10)
+USER_RATE_LIMIT_BURST = int(os.getenv('USER_RATE_LIMIT_BURST') or 60)
+USER_RATE_LIMIT_MAX_USERS = int(os.getenv('USER_RATE_LIMIT_MAX_USERS') or 100_000)
+
+
+@dataclass
+class _Bucket:
+    tokens: float
+    updated_at: float
+
+
+@dataclass
+class ThrottleDecision:
+    allowed: bool
+    remaining: int
+    reset_seconds: int    # until the bucket is full again
+    retry_after: int = 0  # until the next request would be allowed
+
+
+class TokenBucketThrottle:
+    """
+    Per-user token buckets holding `burst` requests, refilled at `rate` per second.
+
+    Buckets are kept in least-recently-used order. One that has been idle long enough
+    to refill completely is indistinguishable from a fresh bucket, so it is dropped,
+    keeping memory proportional to the users active within the last `burst / rate`
+    seconds (and never above `max_users`). Buckets are per process, like the principal
+    cache, and are only touched from the event loop thread, so they need no lock.
+    """
+
+    def __init__(self, rate: float = USER_RATE_LIMIT_PER_SECOND, burst: int = USER_RATE_LIMIT_BURST, max_users: int = USER_RATE_LIMIT_MAX_USERS):
+        self.rate = rate
+        self.burst = burst
+        self.max_users = max_users
+        self.enabled = rate > 0 and burst > 0
+        self.allowed = 0
+        self.rejected = 0
+        self._buckets: OrderedDict[str, _Bucket] = OrderedDict()
+
+    @property
+    def idle_seconds(self) -> float:
+        return self.burst / self.rate
+
+    def acquire(self, key: str) -> ThrottleDecision:
+        now = time.monotonic()
+        self._evict_idle(now)
+
+        bucket = self._buckets.pop(key, None)
+        if bucket is None:
+            bucket = _Bucket(tokens=self.burst, updated_at=now)
+        else:
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated_at) * self.rate)
+            bucket.updated_at = now
+        self._buckets[key] = bucket
+        while len(self._buckets) > self.max_users:
+            self._buckets.popitem(last=False)
+
+        allowed = bucket.tokens >= 1
+        if allowed:
+            bucket.tokens -= 1
+            self.allowed += 1
+        else:
+            self.rejected += 1
+        return ThrottleDecision(
+            allowed=allowed,
+            remaining=int(bucket.tokens),
+            reset_seconds=math.ceil((self.burst - bucket.tokens) / self.rate),
+            retry_after=0 if allowed else math.ceil((1 - bucket.tokens) / self.rate),
+        )
+
+    def stats(self) -> dict:
+        return {
+            'buckets': len(self._buckets),
+            'allowed': self.allowed,
+            'rejected': self.rejected,
+        }
+
+    def _evict_idle(self, now: float) -> None:
+        cutoff = now - self.idle_seconds
+        while self._buckets:
+            key, oldest = next(iter(self._buckets.items()))
+            if oldest.updated_at > cutoff:
+                break
+            del self._buckets[key]
+
+
+user_throttle = TokenBucketThrottle()
+
+
+async def throttle_user(current_user: CurrentUser, response: Response) -> None:
+    """Router dependency: spend one token from the caller's bucket or answer 429."""
+    if not user_throttle.enabled:
+        return
+    decision = user_throttle.acquire(str(current_user.id))
+    headers = {
+        'RateLimit-Limit': str(user_throttle.burst),
+        'RateLimit-Remaining': str(decision.remaining),
+        'RateLimit-Reset': str(decision.reset_seconds),
+    }
+    if not decision.allowed:
+        raise UserRateLimitError(decision.retry_after, headers)
+    response.headers.update(headers)
@@ -0,0 +1,37 @@
+"""
+Electing one runner for a background job across app workers and hosts.
+
+`singleton(name)` takes a PostgreSQL session-level advisory lock on a connection of
+its own and yields whether it got it; it never waits. A worker that does not get the
+lock skips that run. Other databases have no such lock, so every caller runs (SQLite
+deployments are a single host, and run jobs from cron to have only one).
+"""
+from contextlib import contextmanager
+from hashlib import blake2b
+from typing import Iterator
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from .core import engine as default_engine
+
+
+def advisory_lock_key(name: str) -> int:
+    """Stable signed 64-bit key for `name`, as pg_try_advisory_lock takes it."""
+    return int.from_bytes(blake2b(name.encode(), digest_size=8).digest(), 'big', signed=True)
+
+
+@contextmanager
+def singleton(name: str, engine: Engine = default_engine) -> Iterator[bool]:
+    if engine.dialect.name != 'postgresql':
+        yield True
+        return
+    key = advisory_lock_key(name)
+    with engine.connect() as connection:
+        acquired = connection.scalar(select(func.pg_try_advisory_lock(key)))
+        # Session locks outlive transactions: end this one so the connection does not sit idle in it
+        connection.commit()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                connection.scalar(select(func.pg_advisory_unlock(key)))
+                connection.commit()
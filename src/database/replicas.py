@@ -0,0 +1,225 @@
+"""
+Read replicas with read-your-writes consistency.
+
+DATABASE_REPLICA_URLS names replica databases (comma separated). Read-only routes take
+`RouteReadDbSession` instead of `RouteDbSession`. That session is bound to the next
+healthy replica in round-robin order, or to the primary when no replica is healthy
+or the current user wrote something in the last DB_READ_YOUR_WRITES_SECONDS, so
+clients always see their own writes while replicas lag. A replica whose connection
+fails is skipped for DB_REPLICA_RETRY_SECONDS.
+
+The read-your-writes window lives in a `limits` storage (DB_STICKY_STORAGE_URI,
+default RATE_LIMIT_STORAGE_URI), so with shm:// or redis:// it holds across workers.
+Two database files are enough to try it out:
+
+    DATABASE_URL=sqlite:///./primary.db DATABASE_REPLICA_URLS=sqlite:///./replica.db
+"""
+from contextlib import contextmanager
+from typing import Annotated
+from uuid import UUID
+import itertools
+import logging
+import os
+import time
+from fastapi import Depends
+from limits.storage import storage_from_string
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from ..auth.service import CurrentUser
+from ..rate_limiter import RATE_LIMIT_STORAGE_URI
+from .core import DATABASE_ASYNC, AsyncSessionLocal, SessionLocal, _engine_kwargs, _to_async_url
+
+
+DATABASE_REPLICA_URLS = [url.strip() for url in (os.getenv('DATABASE_REPLICA_URLS') or '').split(',') if url.strip()]
+ASYNC_DATABASE_REPLICA_URLS = (
+    [url.strip() for url in os.getenv('ASYNC_DATABASE_REPLICA_URLS').split(',') if url.strip()]
+    if os.getenv('ASYNC_DATABASE_REPLICA_URLS') else [_to_async_url(url) for url in DATABASE_REPLICA_URLS]
+)
+DB_READ_YOUR_WRITES_SECONDS = float(os.getenv('DB_READ_YOUR_WRITES_SECONDS') or 5)
+DB_REPLICA_RETRY_SECONDS = float(os.getenv('DB_REPLICA_RETRY_SECONDS') or 30)
+DB_STICKY_STORAGE_URI = os.getenv('DB_STICKY_STORAGE_URI') or RATE_LIMIT_STORAGE_URI
+
+# Session.info key collecting the users a transaction writes for
+WRITTEN_USERS = 'written_user_ids'
+
+
+class Replica:
+    def __init__(self, url: str, is_async: bool):
+        if is_async:
+            self.engine = create_async_engine(url, **_engine_kwargs(url, is_async=True))
+            self.sessionmaker = async_sessionmaker(self.engine, autoflush=False, expire_on_commit=False)
+        else:
+            self.engine = create_engine(url, future=True, **_engine_kwargs(url))
+            self.sessionmaker = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=self.engine)
+        self.name = self.engine.url.render_as_string(hide_password=True)
+        self.down_until = 0.0
+        self.reads = 0
+        self.failures = 0
+
+    @property
+    def sync_engine(self):
+        return getattr(self.engine, 'sync_engine', self.engine)
+
+
+class ReplicaSet:
+    """Round-robin over the replicas that have not failed recently."""
+
+    def __init__(self, urls: list[str], is_async: bool, retry_seconds: float = DB_REPLICA_RETRY_SECONDS):
+        self.replicas = [Replica(url, is_async) for url in urls]
+        self.retry_seconds = retry_seconds
+        self._turn = itertools.count()
+
+    def pick(self) -> Replica | None:
+        if not self.replicas:
+            return None
+        now = time.monotonic()
+        start = next(self._turn)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if replica.down_until <= now:
+                return replica
+        return None
+
+    def mark_down(self, replica: Replica, error: Exception) -> None:
+        replica.failures += 1
+        replica.down_until = time.monotonic() + self.retry_seconds
+        logging.warning('Replica %s failed, reading from the others for %.0fs: %s', replica.name, self.retry_seconds, error)
+
+    @contextmanager
+    def watch(self, replica: Replica | None):
+        # Connection-level failures take the replica out of rotation; query errors do not
+        try:
+            yield
+        except DBAPIError as e:
+            if replica is not None and (isinstance(e, (OperationalError, InterfaceError)) or e.connection_invalidated):
+                self.mark_down(replica, e)
+            raise
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            result = replica.engine.dispose()
+            if result is not None:
+                await result
+
+    def stats(self) -> list[dict]:
+        now = time.monotonic()
+        return [
+            {
+                'replica': replica.name,
+                'healthy': replica.down_until <= now,
+                'reads': replica.reads,
+                'failures': replica.failures,
+            }
+            for replica in self.replicas
+        ]
+
+
+class ReadYourWrites:
+    """Remembers who wrote in the last `window` seconds; their reads go to the primary."""
+
+    def __init__(self, storage_uri: str, window: float):
+        self.window = window
+        self._storage = storage_from_string(storage_uri) if window > 0 else None
+        self.errors = 0
+
+    @staticmethod
+    def _key(user_id: UUID) -> str:
+        return f'read-your-writes/{user_id}'
+
+    def mark(self, user_id: UUID) -> None:
+        if self._storage is None:
+            return
+        # Runs after the write has committed, so a storage failure must not fail the request;
+        # the cost is that this user's next reads may hit a lagging replica
+        try:
+            # Restart the window: incr alone would keep the expiry of an earlier write
+            self._storage.clear(self._key(user_id))
+            self._storage.incr(self._key(user_id), self.window)
+        except Exception as e:
+            self.errors += 1
+            logging.warning('Could not record a write by user %s for read-your-writes: %s', user_id, e)
+
+    def is_sticky(self, user_id: UUID) -> bool:
+        if self._storage is None:
+            return False
+        try:
+            return self._storage.get(self._key(user_id)) > 0
+        except Exception as e:
+            # Unknown is treated as "just wrote": the primary is always correct
+            self.errors += 1
+            logging.warning('Read-your-writes storage unavailable: %s', e)
+            return True
+
+
+replica_set = ReplicaSet(ASYNC_DATABASE_REPLICA_URLS if DATABASE_ASYNC else DATABASE_REPLICA_URLS, is_async=DATABASE_ASYNC)
+read_your_writes = ReadYourWrites(DB_STICKY_STORAGE_URI, DB_READ_YOUR_WRITES_SECONDS if replica_set.replicas else 0)
+
+
+""" Write tracking """
+
+def mark_written(db: Session, user_id: UUID) -> None:
+    """Send `user_id`'s reads to the primary for a while once this transaction commits."""
+    db.info.setdefault(WRITTEN_USERS, set()).add(user_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _start_read_your_writes(session: Session) -> None:
+    for user_id in session.info.pop(WRITTEN_USERS, ()):
+        read_your_writes.mark(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_written(session: Session) -> None:
+    session.info.pop(WRITTEN_USERS, None)
+
+
+""" Read sessions """
+
+def _primary_session() -> Session | AsyncSession:
+    return (AsyncSessionLocal if DATABASE_ASYNC else SessionLocal)()
+
+
+def read_session(user_id: UUID) -> tuple[Session | AsyncSession, Replica | None]:
+    """A new session for reads on behalf of `user_id`, and the replica it uses (None: the primary)."""
+    replica = replica_set.pick() if replica_set.replicas and not read_your_writes.is_sticky(user_id) else None
+    if replica is None:
+        return _primary_session(), None
+    replica.reads += 1
+    return replica.sessionmaker(), replica
+
+
+def get_read_db(current_user: CurrentUser):
+    db, replica = read_session(current_user.id)
+    if replica is not None:
+        # Connect up front: a replica that cannot be reached costs this request
+        # a fallback to the primary rather than an error
+        try:
+            db.connection()
+        except DBAPIError as e:
+            replica_set.mark_down(replica, e)
+            db.close()
+            db, replica = _primary_session(), None
+    with db, replica_set.watch(replica):
+        yield db
+
+
+async def get_async_read_db(current_user: CurrentUser):
+    db, replica = read_session(current_user.id)
+    if replica is not None:
+        try:
+            await db.connection()
+        except DBAPIError as e:
+            replica_set.mark_down(replica, e)
+            await db.close()
+            db, replica = _primary_session(), None
+    async with db:
+        with replica_set.watch(replica):
+            yield db
+
+
+# The session kind read-only API routes use, selected by DATABASE_ASYNC
+RouteReadDbSession = (
+    Annotated[AsyncSession, Depends(get_async_read_db)] if DATABASE_ASYNC else Annotated[Session, Depends(get_read_db)]
+)
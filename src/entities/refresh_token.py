@@ -0,0 +1,31 @@
+from sqlalchemy import Column, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime, timezone
+from ..database.core import Base, UTCDateTime
+
+
+class RefreshToken(Base):
+    """
+    One link of a refresh token rotation chain. Every token of a login shares its
+    `family_id`; the client only ever holds the newest, and `used_at` marks the ones
+    already traded in, so presenting one again is detected as reuse.
+    """
+    __tablename__ = 'refresh_tokens'
+    __table_args__ = (
+        Index('ix_refresh_tokens_family_id', 'family_id'),
+        # Recently revoked families feed the in-memory revocation filter
+        Index('ix_refresh_tokens_revoked_at', 'revoked_at'),
+        # Pruning walks the expired tokens
+        Index('ix_refresh_tokens_expires_at', 'expires_at'),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    family_id = Column(UUID(as_uuid=True), nullable=False)
+    created_at = Column(UTCDateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    expires_at = Column(UTCDateTime, nullable=False)
+    used_at = Column(UTCDateTime, nullable=True)
+    revoked_at = Column(UTCDateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<RefreshToken(id={self.id}, family_id={self.family_id}, used_at={self.used_at}, revoked_at={self.revoked_at})>"
@@ -1,9 +1,9 @@
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, String, Boolean, ForeignKey, Enum, Index, Integer, BigInteger, text
 from sqlalchemy.dialects.postgresql import UUID, ARRAY
 from datetime import datetime, timezone
 import uuid
 import enum
-from ..database.core import Base
+from ..database.core import Base, UTCDateTime
 
 
 class Priority(enum.Enum):
@@ -16,15 +16,49 @@ class Priority(enum.Enum):
 
 class Todo(Base):
     __tablename__= 'todos'
+    __table_args__ = (
+        # Keyset pagination indexes: every list page is a range scan on one of these,
+        # with `id` as the tie-breaker that makes the sort order stable.
+        Index('ix_todos_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+        Index('ix_todos_user_id_is_completed_created_at_id', 'user_id', 'is_completed', 'created_at', 'id'),
+        Index('ix_todos_user_id_due_date_id', 'user_id', 'due_date', 'id'),
+        # Delta sync: `GET /todos/changes` is a range scan past the client's cursor
+        Index('ix_todos_user_id_change_seq_id', 'user_id', 'change_seq', 'id'),
+        # Overdue count for /todos/stats: a range scan over the user's open todos only
+        Index(
+            'ix_todos_open_user_id_due_date', 'user_id', 'due_date',
+            postgresql_where=text('NOT is_completed'), sqlite_where=text('NOT is_completed'),
+        ),
+        # The archiver's queue (todos.archive): completed todos, oldest completion first
+        Index(
+            'ix_todos_completed_completed_at', 'completed_at',
+            postgresql_where=text('is_completed'), sqlite_where=text('is_completed'),
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False)
     description = Column(String, nullable=False)
-    due_date = Column(DateTime, nullable=True)
+    due_date = Column(UTCDateTime, nullable=True)
     is_completed = Column(Boolean, nullable=False, default=False)
-    created_at = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
-    completed_at = Column(DateTime, nullable=True)
+    created_at = Column(UTCDateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    completed_at = Column(UTCDateTime, nullable=True)
     priority = Column(Enum(Priority), nullable=False, default=Priority.Medium)
+    # Bumped by every update/complete; the row's ETag is derived from it
+    version = Column(Integer, nullable=False, default=1, server_default='1')
+    updated_at = Column(UTCDateTime, nullable=True)
+    # The owner's `todos_version` at the todo's last write: per user it only grows,
+    # in commit order, because every write takes that user row's lock first
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default='0')
 
     def __repr__(self):
-        return f"<Todo(description='{self.description}', due_date={self.due_date}, priority={self.priority})>"
\ No newline at end of file
+        return f"<Todo(description='{self.description}', due_date={self.due_date}, priority={self.priority})>"
+
+
+# Full-text search. The generated `search_vector` tsvector column and the GIN indexes
+# over it and over `description` are PostgreSQL-only DDL, created by migration 0002
+# and not part of this model (other databases get the plain table, and todos.service
+# falls back to a substring match there). Both indexes lead with user_id via btree_gin,
+# so a search only ever walks one user's entries. The migration builds the column with
+# this configuration; changing it takes a new migration.
+SEARCH_CONFIG = 'english'
@@ -0,0 +1,33 @@
+from sqlalchemy import BigInteger, Boolean, Column, Enum, ForeignKey, Index, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime, timezone
+from ..database.core import Base, UTCDateTime
+from .todo import Priority
+
+
+class ArchivedTodo(Base):
+    """
+    A completed todo moved out of `todos` by todos.archive. Same columns, so reads
+    that ask for `include_archived` run the same queries against both tables.
+    """
+    __tablename__ = 'todos_archive'
+    __table_args__ = (
+        Index('ix_todos_archive_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+        Index('ix_todos_archive_user_id_due_date_id', 'user_id', 'due_date', 'id'),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    description = Column(String, nullable=False)
+    due_date = Column(UTCDateTime, nullable=True)
+    is_completed = Column(Boolean, nullable=False)
+    created_at = Column(UTCDateTime, nullable=False)
+    completed_at = Column(UTCDateTime, nullable=True)
+    priority = Column(Enum(Priority), nullable=False)
+    version = Column(Integer, nullable=False)
+    updated_at = Column(UTCDateTime, nullable=True)
+    change_seq = Column(BigInteger, nullable=False)
+    archived_at = Column(UTCDateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f"<ArchivedTodo(description='{self.description}', completed_at={self.completed_at})>"
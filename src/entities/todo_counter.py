@@ -0,0 +1,21 @@
+from sqlalchemy import Column, ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import UUID
+from ..database.core import Base
+
+
+class TodoCounter(Base):
+    """Per-user todo counts, kept in step with `todos` by every write in todos.service."""
+    __tablename__ = 'todo_counters'
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    open_count = Column(Integer, nullable=False, default=0, server_default='0')
+    completed_count = Column(Integer, nullable=False, default=0, server_default='0')
+    # Open todos per priority
+    open_normal = Column(Integer, nullable=False, default=0, server_default='0')
+    open_low = Column(Integer, nullable=False, default=0, server_default='0')
+    open_medium = Column(Integer, nullable=False, default=0, server_default='0')
+    open_high = Column(Integer, nullable=False, default=0, server_default='0')
+    open_top = Column(Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f"<TodoCounter(user_id={self.user_id}, open={self.open_count}, completed={self.completed_count})>"
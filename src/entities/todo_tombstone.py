@@ -0,0 +1,22 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime, timezone
+from ..database.core import Base, UTCDateTime
+
+
+class TodoTombstone(Base):
+    """Marker left behind by a deleted todo so `GET /todos/changes` can report the delete."""
+    __tablename__ = 'todo_tombstones'
+    __table_args__ = (
+        Index('ix_todo_tombstones_user_id_change_seq_todo_id', 'user_id', 'change_seq', 'todo_id'),
+        # Pruning walks the tombstones past retention, oldest first
+        Index('ix_todo_tombstones_deleted_at', 'deleted_at'),
+    )
+
+    todo_id = Column(UUID(as_uuid=True), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    change_seq = Column(BigInteger, nullable=False)
+    deleted_at = Column(UTCDateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f"<TodoTombstone(todo_id={self.todo_id}, change_seq={self.change_seq})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String
+from sqlalchemy import BigInteger, Column, Index, String, func
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from ..database.core import Base
@@ -8,10 +8,21 @@ class User(Base):
     __tablename__ = 'users'
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    email = Column(String, unique=True, nullable=False)
+    # Stored as typed; unique and looked up by lower(email), see ix_users_email_lower
+    email = Column(String, nullable=False)
     first_name = Column(String, nullable=False)
     last_name = Column(String, nullable=False)
     password_hash = Column(String, nullable=False)
+    # Bumped by every write to this user's todos; it is the list ETag and the change sequence
+    todos_version = Column(BigInteger, nullable=False, default=0, server_default='0')
+    # Tombstones up to this change sequence have been pruned (todos.tombstones); a delta
+    # sync from an older cursor could miss deletes and has to start over
+    pruned_change_seq = Column(BigInteger, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        # Registration's ON CONFLICT target and the login lookup
+        Index('ix_users_email_lower', func.lower(email), unique=True),
+    )
 
     def __repr__(self):
         return f"<User(email={self.email}, first_name={self.first_name}, last_name={self.last_name})>"
@@ -26,6 +26,24 @@ class TodoCreationError(TodoError):
         super().__init__(status_code=500, detail=f"Failed to create todo: {error}")
 
 
+class InvalidCursorError(TodoError):
+    def __init__(self):
+        super().__init__(status_code=400, detail="Invalid pagination cursor.")
+
+
+class ChangeCursorExpiredError(TodoError):
+    def __init__(self):
+        super().__init__(
+            status_code=410,
+            detail="Change cursor is older than the retained delete history; sync again without `since`.",
+        )
+
+
+class TodoBatchError(TodoError):
+    def __init__(self, error: str):
+        super().__init__(status_code=500, detail=f"Failed to apply todo batch: {error}")
+
+
 """ ---------- User Errors ---------- """
 
 class UserNotFoundError(UserError):
@@ -47,3 +65,21 @@ class InvalidPasswordError(UserError):
 class AuthenticationError(UserError):
     def __init__(self, detail: str = "Could not validate user credentials."):
         super().__init__(status_code=401, detail=detail)
+
+
+class PasswordHashingBusyError(UserError):
+    def __init__(self):
+        super().__init__(
+            status_code=503,
+            detail="Too many authentication requests in progress, please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
+
+
+class UserRateLimitError(UserError):
+    def __init__(self, retry_after: int, headers: dict[str, str]):
+        super().__init__(
+            status_code=429,
+            detail="Too many requests, please slow down.",
+            headers={**headers, "Retry-After": str(retry_after)},
+        )
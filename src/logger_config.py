@@ -1,5 +1,13 @@
+import atexit
+import json
 import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
 from enum import Enum
+from logging.handlers import QueueHandler, QueueListener
 
 
 # -------------------------------------------------------------------
@@ -16,17 +24,143 @@ class LogLevels(str, Enum):
 # Default format for detailed debugging
 # -------------------------------------------------------------------
 LOG_FORMAT_DEBUG = "%(levelname)s: %(message)s [%(pathname)s:%(funcName)s:%(lineno)d]"
+LOG_FORMAT_TEXT = "%(levelname)s:%(name)s:%(message)s"
+
+
+# -------------------------------------------------------------------
+# Pipeline settings
+# -------------------------------------------------------------------
+LOG_JSON = (os.getenv('LOG_JSON') or 'false').lower() in ('1', 'true', 'yes')
+LOG_QUEUE = (os.getenv('LOG_QUEUE') or 'true').lower() in ('1', 'true', 'yes')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE') or 10_000)
+LOG_INFO_SAMPLE_RATE = float(os.getenv('LOG_INFO_SAMPLE_RATE') or 1.0)
+
+
+# -------------------------------------------------------------------
+# Formatting, sampling and the non-blocking handler
+# -------------------------------------------------------------------
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra={...}` fields are kept as top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.levelno >= logging.WARNING or record.levelno <= logging.DEBUG:
+            entry['location'] = f'{record.pathname}:{record.lineno}'
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class InfoSamplingFilter(logging.Filter):
+    """
+    Keep roughly `rate` of the INFO and DEBUG records from each call site.
+
+    Sampling is a deterministic 1-in-N per (file, line), so a hot log line is thinned
+    evenly while rare ones still show up. Warnings and errors always pass. Handlers run
+    filters outside their own lock, so the per-site counters are guarded here.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self.dropped = 0
+        self._seen: dict[tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        # The logger name is shared by every module logging through the root logger
+        site = (record.pathname, record.lineno)
+        with self._lock:
+            if self.every == 0:
+                self.dropped += 1
+                return False
+            seen = self._seen.get(site, 0)
+            self._seen[site] = seen + 1
+            if seen % self.every:
+                self.dropped += 1
+                return False
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hand records to a background writer without formatting them on the caller's thread.
+
+    The stock `QueueHandler.prepare` renders the message eagerly; here only the
+    traceback is rendered up front (it pins stack frames), and `%` arguments are
+    formatted by the writer thread. When the queue is full the record is dropped and
+    counted rather than blocking the request.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: QueueListener | None = None
+_installed: list[logging.Handler] = []
+
+
+def logging_stats() -> dict:
+    dropped = sampled = 0
+    for handler in _installed:
+        dropped += getattr(handler, 'dropped', 0)
+        sampled += sum(f.dropped for f in handler.filters if isinstance(f, InfoSamplingFilter))
+    return {'queue_dropped': dropped, 'sampled_out': sampled}
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()  # drains whatever is still queued
+        _listener = None
 
 
 # -------------------------------------------------------------------
 # Configure the logging system
 # -------------------------------------------------------------------
-def configure_logging(log_level: str | LogLevels = LogLevels.ERROR) -> None:
+def configure_logging(
+    log_level: str | LogLevels = LogLevels.ERROR,
+    *,
+    json_output: bool = LOG_JSON,
+    use_queue: bool = LOG_QUEUE,
+    info_sample_rate: float = LOG_INFO_SAMPLE_RATE,
+) -> None:
     """
     Configure application logging.
 
     Args:
         log_level (str | LogLevels): Desired logging level. Defaults to ERROR.
+        json_output (bool): Write one JSON object per line instead of plain text.
+        use_queue (bool): Write from a background thread through a bounded queue.
+        info_sample_rate (float): Fraction of INFO/DEBUG records kept per call site.
     """
 
     # Convert enum to string if necessary
@@ -46,13 +180,41 @@ def configure_logging(log_level: str | LogLevels = LogLevels.ERROR) -> None:
 
     level = log_level_map.get(log_level, logging.ERROR)
 
-    # Apply configuration
-    if level == logging.DEBUG:
-        logging.basicConfig(level=level, format=LOG_FORMAT_DEBUG)
+    # Build the handler chain: formatter -> stderr, optionally behind a queue
+    if json_output:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(LOG_FORMAT_DEBUG if level == logging.DEBUG else LOG_FORMAT_TEXT)
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(formatter)
+
+    # Calling this again (tests, reloads) replaces the previous pipeline
+    _stop_listener()
+    root = logging.getLogger()
+    for handler in _installed:
+        root.removeHandler(handler)
+    _installed.clear()
+
+    global _listener
+    if use_queue:
+        handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        _listener = QueueListener(handler.queue, stream_handler, respect_handler_level=True)
+        _listener.start()
     else:
-        logging.basicConfig(level=level)
+        handler = stream_handler
+    if info_sample_rate < 1:
+        # Filter before enqueueing, so dropped records cost no queue slot or formatting
+        handler.addFilter(InfoSamplingFilter(info_sample_rate))
+
+    # Apply configuration
+    root.addHandler(handler)
+    root.setLevel(level)
+    _installed.append(handler)
 
     logging.getLogger("uvicorn").setLevel(level)
     logging.getLogger("uvicorn.error").setLevel(level)
     logging.getLogger("uvicorn.access").setLevel(level)
-    logging.info(f"Logging initialized with level: {log_level}")
+    logging.info("Logging initialized with level: %s", log_level)
+
+
+atexit.register(_stop_listener)
@@ -1,42 +1,102 @@
-from fastapi import FastAPI
+"""
+Application factory.
+
+Importing this module neither configures logging nor touches the database: that,
+migrations, the background jobs (revoked session sync, todo archiving, tombstone
+pruning) and disposing of the engines happen in the lifespan of the app that
+`create_app()` builds.
+`app` is created on first access, so both of these work:
+
+    uvicorn src.main:app
+    uvicorn src.main:create_app --factory
+"""
+from contextlib import asynccontextmanager, suppress
+import asyncio
+import json
+import os
+from fastapi import FastAPI, Response
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html, get_swagger_ui_oauth2_redirect_html
+from fastapi.openapi.utils import get_openapi
+from fastapi.responses import HTMLResponse
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
+from starlette.concurrency import run_in_threadpool
 from .rate_limiter import limiter
-from .database.core import engine, Base
+from .metrics import MetricsMiddleware
+from .database.core import async_engine, engine
+from .database.replicas import replica_set
 from .entities.todo import Todo  # Import models to register them
 from .entities.user import User
+from .entities.todo_counter import TodoCounter
+from .entities.todo_tombstone import TodoTombstone
+from .entities.refresh_token import RefreshToken
+from .entities.todo_archive import ArchivedTodo
 from .api import register_routes
+from .auth.hashing import bcrypt_rounds, password_hash_pool
+from .auth.refresh_tokens import sync_revocations
+from .todos.archive import TODO_ARCHIVE_INTERVAL_SECONDS, run_archiver
+from .todos.tombstones import TODO_TOMBSTONE_PRUNE_INTERVAL_SECONDS, run_pruner
 from .logger_config import configure_logging, LogLevels
-from fastapi.openapi.utils import get_openapi
 
 
-configure_logging(LogLevels.INFO)
+# Off by default: with several workers every one of them would race to migrate, so
+# deployments run `alembic upgrade head` once before starting the app instead
+DB_MIGRATE_ON_STARTUP = (os.getenv('DB_MIGRATE_ON_STARTUP') or 'false').lower() in ('1', 'true', 'yes')
+
+OPENAPI_URL = '/openapi.json'
+
 
-app = FastAPI()
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+def run_migrations() -> None:
+    """`alembic upgrade head` against DATABASE_URL."""
+    from alembic import command
+    from alembic.config import Config
 
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    config = Config(os.path.join(root, 'alembic.ini'))
+    config.attributes['configure_logger'] = False
+    command.upgrade(config, 'head')
 
-try:
-    Base.metadata.create_all(bind=engine)
-except Exception:
-    # Avoid startup crash in environments without DB connection
-    pass
 
-register_routes(app)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging(LogLevels.INFO)
+    if DB_MIGRATE_ON_STARTUP:
+        # A failed migration stops the startup instead of serving a stale schema
+        await run_in_threadpool(run_migrations)
+    # Settle the bcrypt cost now rather than on the first login
+    await run_in_threadpool(bcrypt_rounds)
+    # Likewise the OpenAPI document, rather than on the first /docs or /openapi.json hit
+    openapi_document(app)
+    background = [asyncio.create_task(sync_revocations())]
+    if TODO_ARCHIVE_INTERVAL_SECONDS > 0:
+        background.append(asyncio.create_task(run_archiver()))
+    if TODO_TOMBSTONE_PRUNE_INTERVAL_SECONDS > 0:
+        background.append(asyncio.create_task(run_pruner()))
+    yield
+    for task in background:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    password_hash_pool.shutdown()
+    await replica_set.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
 
 
-def custom_openapi():
+""" OpenAPI """
+
+def custom_openapi(app: FastAPI) -> dict:
     if app.openapi_schema:
         return app.openapi_schema
-    
+
     openapi_schema = get_openapi(
         title="Modern Todo App",
         version="1.0.0",
         description="An Ultra modern Productivity App built with FastAPI, PostgreSQL, and React.",
         routes=app.routes,
     )
-    
+
     # Add security scheme
     openapi_schema["components"]["securitySchemes"] = {
         "Bearer": {
@@ -45,12 +105,60 @@ def custom_openapi():
             "bearerFormat": "JWT"
         }
     }
-    
+
     # Add global security
     openapi_schema["security"] = [{"Bearer": []}]
-    
+
     app.openapi_schema = openapi_schema
     return app.openapi_schema
 
-app.openapi = custom_openapi
 
+def openapi_document(app: FastAPI) -> bytes:
+    """The encoded OpenAPI document, built once; the lifespan startup builds it ahead of the first request."""
+    if getattr(app.state, 'openapi_document', None) is None:
+        app.state.openapi_document = json.dumps(app.openapi(), separators=(',', ':')).encode()
+    return app.state.openapi_document
+
+
+def _register_docs(app: FastAPI) -> None:
+    # Replaces FastAPI's own /openapi.json, which re-encodes the whole document on every request
+    @app.get(OPENAPI_URL, include_in_schema=False)
+    async def openapi_json():
+        return Response(openapi_document(app), media_type='application/json')
+
+    @app.get('/docs', include_in_schema=False)
+    async def swagger_ui() -> HTMLResponse:
+        return get_swagger_ui_html(openapi_url=OPENAPI_URL, title='Modern Todo App - Swagger UI', oauth2_redirect_url='/docs/oauth2-redirect')
+
+    @app.get('/docs/oauth2-redirect', include_in_schema=False)
+    async def swagger_ui_redirect() -> HTMLResponse:
+        return get_swagger_ui_oauth2_redirect_html()
+
+    @app.get('/redoc', include_in_schema=False)
+    async def redoc() -> HTMLResponse:
+        return get_redoc_html(openapi_url=OPENAPI_URL, title='Modern Todo App - ReDoc')
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(lifespan=lifespan, openapi_url=None, docs_url=None, redoc_url=None)
+    app.state.limiter = limiter
+    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+    app.add_middleware(MetricsMiddleware)
+
+    register_routes(app)
+    app.openapi = lambda: custom_openapi(app)
+    _register_docs(app)
+    return app
+
+
+_app: FastAPI | None = None
+
+
+def __getattr__(name: str):
+    # `from src.main import app` builds the app on first use (PEP 562)
+    global _app
+    if name != 'app':
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    if _app is None:
+        _app = create_app()
+    return _app
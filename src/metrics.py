@@ -0,0 +1,195 @@
+from bisect import bisect_left
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.pool import QueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import time
+from .auth.cache import principal_cache
+from .auth.hashing import password_hash_pool
+from .auth.refresh_tokens import revoked_families
+from .todos.archive import archive_stats
+from .todos.tombstones import tombstone_stats
+from .auth.throttle import user_throttle
+from .database.core import async_engine, engine, pool_stats
+from .database.replicas import read_your_writes, replica_set
+from .logger_config import logging_stats
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, only updated from the event loop thread."""
+
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.in_flight = 0
+        self.latency: dict[tuple[str, str, str], Histogram] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float) -> None:
+        key = (method, route, str(status))
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = Histogram()
+        histogram.observe(seconds)
+
+
+request_metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing every HTTP request.
+
+    Requests are labelled with the matched route template (`/todos/{todo_id}`), not
+    the raw path, so label cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        request_metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_metrics.in_flight -= 1
+            route = scope.get('route')
+            template = getattr(route, 'path', None) or '<unmatched>'
+            request_metrics.observe(scope['method'], template, status, time.perf_counter() - started)
+
+
+""" Prometheus text exposition """
+
+def _labels(**labels) -> str:
+    escaped = (
+        f'{name}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _metric(lines: list[str], name: str, kind: str, help_text: str, samples: list[tuple[str, float]]) -> None:
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+    lines.extend(f'{name}{labels} {value}' for labels, value in samples)
+
+
+def _pool_samples(lines: list[str]) -> None:
+    pools = [('sync', engine.pool)]
+    if async_engine is not None:
+        pools.append(('async', async_engine.sync_engine.pool))
+    pools.extend((f'replica{n}', replica.sync_engine.pool) for n, replica in enumerate(replica_set.replicas))
+    pools = [(name, pool) for name, pool in pools if isinstance(pool, QueuePool)]
+
+    for name, kind, help_text, read in (
+        ('db_pool_size', 'gauge', 'Configured number of pooled connections.', lambda p: p.size()),
+        ('db_pool_checked_out', 'gauge', 'Connections currently checked out of the pool.', lambda p: p.checkedout()),
+        ('db_pool_overflow', 'gauge', 'Connections beyond the pool size (negative while the pool is not full).', lambda p: p.overflow()),
+        ('db_pool_checkouts_total', 'counter', 'Connection checkouts.', lambda p: getattr(p, 'checkout_count', 0)),
+        ('db_pool_checkout_wait_seconds_total', 'counter', 'Time spent waiting for a pooled connection.', lambda p: getattr(p, 'checkout_wait_seconds', 0.0)),
+        ('db_pool_checkout_wait_seconds_max', 'gauge', 'Longest wait for a pooled connection.', lambda p: getattr(p, 'checkout_wait_max_seconds', 0.0)),
+        ('db_pool_slow_checkouts_total', 'counter', 'Checkouts that waited at least DB_SLOW_CHECKOUT_MS.', lambda p: getattr(p, 'slow_checkout_count', 0)),
+    ):
+        _metric(lines, name, kind, help_text, [(_labels(engine=engine_name), read(pool)) for engine_name, pool in pools])
+
+    replicas = replica_set.stats()
+    for name, kind, help_text, field in (
+        ('db_replica_up', 'gauge', 'Whether the replica is in the read rotation.', 'healthy'),
+        ('db_replica_reads_total', 'counter', 'Read sessions opened on the replica.', 'reads'),
+        ('db_replica_failures_total', 'counter', 'Times the replica was taken out of rotation.', 'failures'),
+    ):
+        _metric(lines, name, kind, help_text, [(_labels(engine=f'replica{n}'), int(stats[field])) for n, stats in enumerate(replicas)])
+    _metric(lines, 'db_read_your_writes_errors_total', 'counter', 'Read-your-writes storage calls that failed.', [('', read_your_writes.errors)])
+
+
+def render_metrics() -> str:
+    lines: list[str] = []
+
+    buckets: list[tuple[str, float]] = []
+    sums: list[tuple[str, float]] = []
+    counts: list[tuple[str, float]] = []
+    for (method, route, status), histogram in sorted(request_metrics.latency.items()):
+        cumulative = 0
+        for bound, bucket_count in zip((*LATENCY_BUCKETS, '+Inf'), histogram.counts):
+            cumulative += bucket_count
+            buckets.append((_labels(method=method, route=route, status=status, le=bound), cumulative))
+        sums.append((_labels(method=method, route=route, status=status), histogram.total))
+        counts.append((_labels(method=method, route=route, status=status), histogram.count))
+    lines.append('# HELP http_request_duration_seconds Request latency by route template and status code.')
+    lines.append('# TYPE http_request_duration_seconds histogram')
+    lines.extend(f'http_request_duration_seconds_bucket{labels} {value}' for labels, value in buckets)
+    lines.extend(f'http_request_duration_seconds_sum{labels} {value}' for labels, value in sums)
+    lines.extend(f'http_request_duration_seconds_count{labels} {value}' for labels, value in counts)
+
+    _metric(lines, 'http_requests_in_flight', 'gauge', 'Requests currently being served.', [('', request_metrics.in_flight)])
+
+    _pool_samples(lines)
+
+    hashing = password_hash_pool.stats()
+    _metric(lines, 'password_hash_in_flight', 'gauge', 'bcrypt calls running on the hashing pool.', [('', hashing['in_flight'])])
+    _metric(lines, 'password_hash_queue_depth', 'gauge', 'bcrypt calls waiting for a hashing worker.', [('', hashing['queued'])])
+    _metric(lines, 'password_hash_rejected_total', 'counter', 'bcrypt calls refused because the queue was full.', [('', hashing['rejected'])])
+    _metric(lines, 'password_hash_bcrypt_rounds', 'gauge', 'bcrypt cost of new password hashes (0 until calibrated).', [('', hashing['bcrypt_rounds'])])
+
+    revocations = revoked_families.stats()
+    _metric(lines, 'revoked_sessions_filter_entries', 'gauge', 'Refresh token families in the revocation filter.', [('', revocations['entries'])])
+    _metric(lines, 'revoked_sessions_filter_false_positive_rate', 'gauge', 'Estimated share of live sessions that need a database check.', [('', revocations['false_positive_rate'])])
+
+    _metric(lines, 'todos_archived_total', 'counter', 'Completed todos moved to the archive table by this process.', [('', archive_stats['archived'])])
+    _metric(lines, 'todos_archive_skipped_total', 'counter', 'Users skipped by the archiver because their rows were locked.', [('', archive_stats['skipped_locked'])])
+    _metric(lines, 'todo_tombstones_pruned_total', 'counter', 'Delete tombstones pruned past retention by this process.', [('', tombstone_stats['pruned'])])
+
+    auth_cache = principal_cache.stats()
+    _metric(lines, 'auth_cache_entries', 'gauge', 'Verified tokens held in the principal cache.', [('', auth_cache['entries'])])
+    _metric(lines, 'auth_cache_hits_total', 'counter', 'Requests authenticated from the principal cache.', [('', auth_cache['hits'])])
+    _metric(lines, 'auth_cache_misses_total', 'counter', 'Requests that had to decode the token and load the user.', [('', auth_cache['misses'])])
+
+    throttle = user_throttle.stats()
+    _metric(lines, 'user_throttle_buckets', 'gauge', 'Users with a partially spent token bucket.', [('', throttle['buckets'])])
+    _metric(lines, 'user_throttle_rejected_total', 'counter', 'Requests refused with 429 by the per-user token bucket.', [('', throttle['rejected'])])
+
+    log = logging_stats()
+    _metric(lines, 'log_records_dropped_total', 'counter', 'Log records discarded because the log queue was full.', [('', log['queue_dropped'])])
+    _metric(lines, 'log_records_sampled_out_total', 'counter', 'INFO/DEBUG log records skipped by sampling.', [('', log['sampled_out'])])
+
+    return '\n'.join(lines) + '\n'
+
+
+router = APIRouter(tags=['Metrics'])
+
+
+@router.get('/metrics', response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type='text/plain; version=0.0.4')
+
+
+@router.get('/metrics/pool', include_in_schema=False)
+async def pool_metrics():
+    return {**pool_stats(), 'replicas': replica_set.stats()}
@@ -0,0 +1,214 @@
+"""
+Cross-process storage backend for the rate limiter.
+
+`limits`' default `memory://` storage keeps counters per process, so with N uvicorn
+workers every limit is effectively N times higher. `SharedMemoryStorage` keeps them
+in one memory-mapped file (put it on tmpfs, e.g. /dev/shm) that all workers on the
+host map, and is registered with `limits` under the `shm://` scheme:
+
+    RATE_LIMIT_STORAGE_URI=shm:///dev/shm/todo-rate-limits?slots=65536
+
+The file is a fixed-size open-addressing table of (key hash, expiry, count) slots,
+so memory is bounded no matter how many clients show up: expired slots are reused,
+and when a probe window is full the slot closest to expiry is evicted. Every update
+runs under a thread lock plus an exclusive `flock`, which makes it atomic across
+threads and worker processes. An flock belongs to the open file description, which a
+forked worker shares with its parent (gunicorn --preload), so each process opens the
+file itself on first use.
+"""
+from contextlib import contextmanager
+from hashlib import blake2b
+from threading import Lock
+from typing import Iterator
+from urllib.parse import parse_qs, urlparse
+import math
+import mmap
+import os
+import struct
+import time
+from limits.errors import ConfigurationError
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport
+
+try:
+    import fcntl
+except ImportError:  # Windows: the shm:// backend is unavailable, memory:// still works
+    fcntl = None
+
+
+_MAGIC = b'TODORL01'
+_HEADER = struct.Struct('<8sQ')          # magic, slot count
+_SLOT = struct.Struct('<Qdq')            # key hash, expires at (epoch seconds), count
+_MAX_PROBES = 32
+DEFAULT_SLOTS = 65536
+
+
+class SharedMemoryStorage(Storage, SlidingWindowCounterSupport):
+    STORAGE_SCHEME = ['shm']
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        if fcntl is None:
+            raise ConfigurationError('shm:// rate limit storage needs a POSIX platform (fcntl)')
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+        parsed = urlparse(uri)
+        self.path = parsed.path or '/dev/shm/todo-rate-limits'
+        query = parse_qs(parsed.query)
+        self.slots = int(options.get('slots') or query.get('slots', [DEFAULT_SLOTS])[0])
+        self._pid = None
+        self._open()
+
+    @property
+    def base_exceptions(self) -> type[Exception] | tuple[type[Exception], ...]:
+        return OSError
+
+    def _open(self) -> None:
+        # A descriptor inherited across fork would share its flock with the parent
+        self._pid = os.getpid()
+        self._thread_lock = Lock()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._map = self._open_table()
+
+    def _open_table(self) -> mmap.mmap:
+        size = _HEADER.size + self.slots * _SLOT.size
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, _HEADER.pack(_MAGIC, self.slots), 0)
+            magic, slots = _HEADER.unpack(os.pread(self._fd, _HEADER.size, 0))
+            if magic != _MAGIC:
+                raise ConfigurationError(f'{self.path} is not a rate limit table')
+            # Another worker created the table first: adopt its size
+            self.slots = slots
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return mmap.mmap(self._fd, _HEADER.size + self.slots * _SLOT.size)
+
+    """ Slot table """
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        if self._pid != os.getpid():
+            # First use after a fork: the inherited descriptor and map stay with the parent
+            self._open()
+        # flock is held per open file, so threads of one worker also need the thread lock
+        with self._thread_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        # 0 marks an empty slot, so never hand it out as a key hash
+        return int.from_bytes(blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+
+    def _offset(self, index: int) -> int:
+        return _HEADER.size + index * _SLOT.size
+
+    def _read(self, index: int) -> tuple[int, float, int]:
+        return _SLOT.unpack_from(self._map, self._offset(index))
+
+    def _write(self, index: int, key_hash: int, expires_at: float, count: int) -> None:
+        _SLOT.pack_into(self._map, self._offset(index), key_hash, expires_at, count)
+
+    def _find(self, key_hash: int, now: float) -> tuple[int | None, int]:
+        """Return (live slot holding the key or None, slot to use if it has to be inserted)."""
+        start = key_hash % self.slots
+        free = None
+        victim, victim_expiry = start, math.inf
+        for probe in range(_MAX_PROBES):
+            index = (start + probe) % self.slots
+            slot_hash, expires_at, _ = self._read(index)
+            alive = slot_hash != 0 and expires_at > now
+            if alive and slot_hash == key_hash:
+                return index, index
+            if not alive:
+                if free is None:
+                    free = index
+            elif expires_at < victim_expiry:
+                victim, victim_expiry = index, expires_at
+        return None, free if free is not None else victim
+
+    def _incr(self, key: str, expiry: float, amount: int, now: float) -> int:
+        key_hash = self._hash(key)
+        index, insert_at = self._find(key_hash, now)
+        if index is None:
+            self._write(insert_at, key_hash, now + expiry, amount)
+            return amount
+        _, expires_at, count = self._read(index)
+        self._write(index, key_hash, expires_at, count + amount)
+        return count + amount
+
+    def _get(self, key: str, now: float) -> tuple[int, float]:
+        index, _ = self._find(self._hash(key), now)
+        if index is None:
+            return 0, now
+        _, expires_at, count = self._read(index)
+        return count, expires_at
+
+    """ limits Storage API """
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        with self._locked():
+            return self._incr(key, expiry, amount, time.time())
+
+    def get(self, key: str) -> int:
+        with self._locked():
+            return self._get(key, time.time())[0]
+
+    def get_expiry(self, key: str) -> float:
+        with self._locked():
+            return self._get(key, time.time())[1]
+
+    def check(self) -> bool:
+        return not self._map.closed
+
+    def reset(self) -> int | None:
+        with self._locked():
+            now = time.time()
+            live = sum(1 for index in range(self.slots) if self._read(index)[1] > now)
+            self._map[_HEADER.size:] = bytes(self.slots * _SLOT.size)
+            return live
+
+    def clear(self, key: str) -> None:
+        with self._locked():
+            index, _ = self._find(self._hash(key), time.time())
+            if index is not None:
+                self._write(index, 0, 0.0, 0)
+
+    """ Sliding window counter """
+
+    @staticmethod
+    def _window_keys(key: str, expiry: int, now: float) -> tuple[str, str]:
+        return f'{key}/{int((now - expiry) / expiry)}', f'{key}/{int(now / expiry)}'
+
+    def _window(self, key: str, expiry: int, now: float) -> tuple[int, float, int, float]:
+        previous_key, current_key = self._window_keys(key, expiry, now)
+        previous_count = self._get(previous_key, now)[0]
+        current_count = self._get(current_key, now)[0]
+        previous_ttl = 0.0 if previous_count == 0 else (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        with self._locked():
+            # Check and increment under one lock, so concurrent workers cannot overshoot
+            now = time.time()
+            previous_count, previous_ttl, current_count, _ = self._window(key, expiry, now)
+            if math.floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+                return False
+            self._incr(self._window_keys(key, expiry, now)[1], 2 * expiry, amount, now)
+            return True
+
+    def get_sliding_window(self, key: str, expiry: int) -> tuple[int, float, int, float]:
+        with self._locked():
+            return self._window(key, expiry, time.time())
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        for window_key in self._window_keys(key, expiry, time.time()):
+            self.clear(window_key)
@@ -1,5 +1,13 @@
 from slowapi import Limiter
 from slowapi.util import get_remote_address
+import os
+from . import rate_limit_storage  # registers the shm:// storage scheme with `limits`
 
 
-limiter = Limiter(key_func=get_remote_address)
\ No newline at end of file
+# memory:// counts per worker process; with several workers use the shared table
+# (shm:///dev/shm/todo-rate-limits) or a local Redis (redis://localhost:6379)
+RATE_LIMIT_STORAGE_URI = os.getenv('RATE_LIMIT_STORAGE_URI') or 'memory://'
+RATE_LIMIT_STRATEGY = os.getenv('RATE_LIMIT_STRATEGY') or 'sliding-window-counter'
+
+
+limiter = Limiter(key_func=get_remote_address, storage_uri=RATE_LIMIT_STORAGE_URI, strategy=RATE_LIMIT_STRATEGY)
\ No newline at end of file
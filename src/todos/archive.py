@@ -0,0 +1,154 @@
+"""
+Archival of old completed todos to `todos_archive`.
+
+Completed todos are rarely read again, but left in `todos` they make up most of its
+rows and index entries. Todos completed more than TODO_ARCHIVE_AFTER_DAYS ago are
+moved to the archive table in small batches. Each user's share of a batch is its own
+short transaction, shaped like any other todo write: lock the user row and bump its
+`todos_version` (so list ETags change), DELETE ... RETURNING from `todos`, INSERT into
+the archive, leave a tombstone per moved todo (so /todos/changes reports it gone),
+subtract the moved rows from the counters, commit. On PostgreSQL every
+such transaction gives up after TODO_ARCHIVE_LOCK_TIMEOUT_MS rather than queueing
+behind a busy user, who is retried on the next run.
+
+Reads reach archived todos with `include_archived=true`; they are read-only, and the
+counters, /todos/stats and search only cover `todos`. The app runs the archiver every
+TODO_ARCHIVE_INTERVAL_SECONDS; on PostgreSQL an advisory lock lets only one worker
+run at a time, elsewhere each worker runs it. 0 turns that off, e.g. to run it from
+cron instead:
+
+    python -m src.todos.archive --older-than-days 90
+"""
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from uuid import UUID
+import argparse
+import asyncio
+import logging
+import os
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from src.database.core import SessionLocal
+from src.database.locks import singleton
+from src.entities.todo import Todo
+from src.entities.todo_archive import ArchivedTodo
+from src.entities.todo_tombstone import TodoTombstone
+from . import counters
+from .service import _next_change_seq
+
+
+TODO_ARCHIVE_AFTER_DAYS = int(os.getenv('TODO_ARCHIVE_AFTER_DAYS') or 90)
+TODO_ARCHIVE_INTERVAL_SECONDS = float(os.getenv('TODO_ARCHIVE_INTERVAL_SECONDS') or 3600)
+TODO_ARCHIVE_BATCH_SIZE = int(os.getenv('TODO_ARCHIVE_BATCH_SIZE') or 500)
+TODO_ARCHIVE_LOCK_TIMEOUT_MS = int(os.getenv('TODO_ARCHIVE_LOCK_TIMEOUT_MS') or 2000)
+
+ARCHIVED_COLUMNS = tuple(column.name for column in ArchivedTodo.__table__.columns if column.name != 'archived_at')
+
+# Totals for /metrics
+archive_stats = {'archived': 0, 'skipped_locked': 0}
+
+
+def archive_cutoff(older_than_days: int = TODO_ARCHIVE_AFTER_DAYS) -> datetime:
+    # completed_at holds naive UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=older_than_days)
+
+
+def archive_user_todos(db: Session, user_id: UUID, todo_ids: list[UUID], cutoff: datetime) -> int:
+    """Move those of `todo_ids` that are still archivable; one transaction. Returns the number moved."""
+    try:
+        if db.get_bind().dialect.name == 'postgresql':
+            db.execute(text(f'SET LOCAL lock_timeout = {TODO_ARCHIVE_LOCK_TIMEOUT_MS}'))
+        change_seq = _next_change_seq(db, user_id)
+        # Rechecked under the user lock: the todo may have been edited or deleted meanwhile
+        moved = db.execute(
+            delete(Todo)
+            .where(Todo.user_id == user_id, Todo.id.in_(todo_ids), Todo.is_completed, Todo.completed_at < cutoff)
+            .returning(*(getattr(Todo, column) for column in ARCHIVED_COLUMNS))
+            .execution_options(synchronize_session=False)
+        ).all()
+        if not moved:
+            db.rollback()
+            return 0
+        now = datetime.now(timezone.utc)
+        db.execute(insert(ArchivedTodo), [{**row._mapping, 'archived_at': now} for row in moved])
+        # To a syncing client an archived todo is gone, like a deleted one
+        db.execute(
+            insert(TodoTombstone),
+            [{'todo_id': row.id, 'user_id': user_id, 'change_seq': change_seq, 'deleted_at': now} for row in moved],
+        )
+        counters.apply_delta(db, user_id, counters.counter_delta([(row.is_completed, row.priority) for row in moved], []))
+        db.commit()
+    except OperationalError as e:
+        db.rollback()
+        archive_stats['skipped_locked'] += 1
+        logging.warning('Skipped archiving todos of user %s this run: %s', user_id, e)
+        return 0
+
+    archive_stats['archived'] += len(moved)
+    return len(moved)
+
+
+def archive_batch(db: Session, cutoff: datetime, batch_size: int = TODO_ARCHIVE_BATCH_SIZE) -> tuple[int, int]:
+    """Archive up to `batch_size` todos completed before `cutoff`. Returns (candidates, moved)."""
+    candidates = db.execute(
+        select(Todo.user_id, Todo.id)
+        .where(Todo.is_completed, Todo.completed_at < cutoff)
+        .order_by(Todo.completed_at)
+        .limit(batch_size)
+    ).all()
+    db.rollback()  # end the read transaction before taking any user lock
+
+    moved = 0
+    for user_id, rows in groupby(sorted(candidates, key=lambda row: row.user_id), key=lambda row: row.user_id):
+        moved += archive_user_todos(db, user_id, [row.id for row in rows], cutoff)
+    return len(candidates), moved
+
+
+def archive_completed(db: Session, older_than_days: int = TODO_ARCHIVE_AFTER_DAYS, batch_size: int = TODO_ARCHIVE_BATCH_SIZE) -> int:
+    """Archive batches until nothing is left to move. Returns the number archived."""
+    cutoff = archive_cutoff(older_than_days)
+    archived = 0
+    while True:
+        candidates, moved = archive_batch(db, cutoff, batch_size)
+        archived += moved
+        # A batch that moved nothing was all skipped users: they wait for the next run
+        if candidates < batch_size or moved == 0:
+            if archived:
+                logging.info('Archived %s todos completed before %s', archived, cutoff)
+            return archived
+
+
+def _archive_once() -> int:
+    with singleton('todos.archive') as elected:
+        if not elected:
+            logging.debug('Another worker is archiving todos, skipping this run')
+            return 0
+        with SessionLocal() as db:
+            return archive_completed(db)
+
+
+async def run_archiver(interval: float = TODO_ARCHIVE_INTERVAL_SECONDS) -> None:
+    """Archive forever; the app runs this from its lifespan. Runs that overlap would still be safe."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(_archive_once)
+        except Exception as e:
+            logging.warning('Todo archiver run failed: %s', e)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Move old completed todos to the archive table.')
+    parser.add_argument('--older-than-days', type=int, default=TODO_ARCHIVE_AFTER_DAYS)
+    parser.add_argument('--batch-size', type=int, default=TODO_ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        archived = archive_completed(db, args.older_than_days, args.batch_size)
+    print(f'Archived {archived} todos')
+
+
+if __name__ == "__main__":
+    main()
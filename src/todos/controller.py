@@ -1,41 +1,173 @@
-from fastapi import APIRouter, status
-from typing import List
+from fastapi import APIRouter, Depends, Header, Query, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+from datetime import datetime
 from uuid import UUID
-from ..database.core import DbSession
+from ..database.core import RouteDbSession
+from ..database.replicas import RouteReadDbSession
+from ..entities.todo import Priority
 from . import schemas
 from . import service
+from . import importer
 from ..auth.service import CurrentUser
+from ..auth.throttle import throttle_user
 
 
 router = APIRouter(
     prefix='/todos',
-    tags=['Todos']
+    tags=['Todos'],
+    dependencies=[Depends(throttle_user)],
 )
 
+# Clients may keep a copy but must revalidate it (cheaply, via If-None-Match) on every use
+CACHE_CONTROL = 'private, no-cache'
+
+
+def _dependency_headers(dependency_response: Response) -> dict[str, str]:
+    # Headers set on the injected Response (e.g. RateLimit-*) are only merged into
+    # responses FastAPI builds itself, so copy them over when returning one directly
+    return {key: value for key, value in dependency_response.headers.items() if key != 'content-length'}
+
+
+def _direct_response(dependency_response: Response, body: bytes | None, etag: str, status_code: int = status.HTTP_200_OK) -> Response:
+    response = Response(body, status_code=status_code, media_type='application/json' if body is not None else None)
+    response.headers.update(_dependency_headers(dependency_response))
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+
 @router.post('/', response_model=schemas.TodoResponse, status_code=status.HTTP_201_CREATED)
-def create_todo(todo: schemas.TodoCreate, current_user: CurrentUser, db: DbSession):
-    return service.create_todo(current_user, db, todo)
+async def create_todo(todo: schemas.TodoCreate, current_user: CurrentUser, db: RouteDbSession):
+    return await service.create_todo_async(current_user, db, todo)
+
+@router.get('/', response_model=schemas.TodoPage)
+async def get_todos(
+    current_user: CurrentUser,
+    db: RouteReadDbSession,
+    response: Response,
+    is_completed: Optional[bool] = None,
+    # Query strings are never coerced to the int-valued enum, so take the number
+    priority: Optional[int] = Query(None, ge=Priority.Normal.value, le=Priority.Top.value, description="0 (Normal) to 4 (Top)"),
+    due_after: Optional[datetime] = None,
+    due_before: Optional[datetime] = None,
+    sort: schemas.TodoSort = schemas.TodoSort.created_at,
+    cursor: Optional[str] = Query(None, description="`next_cursor` from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    include_archived: bool = Query(False, description="Also list old completed todos moved to the archive"),
+    if_none_match: Optional[str] = Header(None),
+):
+    """List todos; answers 304 when `If-None-Match` carries the current list ETag"""
+    params = schemas.TodoListParams(
+        is_completed=is_completed,
+        priority=None if priority is None else Priority(priority),
+        due_after=due_after,
+        due_before=due_before,
+        sort=sort,
+        cursor=cursor,
+        limit=limit,
+        include_archived=include_archived,
+    )
+    etag, page = await service.get_todos_if_changed_async(current_user, db, params, if_none_match, as_json=service.TODO_FAST_JSON)
+    if page is None:
+        return _direct_response(response, None, etag, status.HTTP_304_NOT_MODIFIED)
+    if isinstance(page, bytes):
+        return _direct_response(response, page, etag)
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return page
+
+
+@router.get('/search', response_model=schemas.TodoPage)
+async def search_todos(
+    current_user: CurrentUser,
+    db: RouteReadDbSession,
+    q: str = Query(..., min_length=1, max_length=200, description="Words, \"phrases\", -excluded words, or any substring"),
+    cursor: Optional[str] = Query(None, description="`next_cursor` from the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """Search the user's todo descriptions, best match first"""
+    return await service.search_todos_async(current_user, db, q, cursor, limit)
+
+
+@router.get('/changes', response_model=schemas.TodoChanges)
+async def get_changes(
+    current_user: CurrentUser,
+    db: RouteDbSession,
+    since: Optional[str] = Query(None, description="`next_cursor` from the previous sync; omit for a full sync"),
+    limit: int = Query(500, ge=1, le=1000),
+):
+    """Todos created, modified or deleted since the last sync"""
+    return await service.get_changes_async(current_user, db, since, limit)
+
+
+@router.get('/stats', response_model=schemas.TodoStats)
+async def get_todo_stats(current_user: CurrentUser, db: RouteDbSession):
+    """Open, completed, overdue and per-priority counts for badges"""
+    return await service.get_todo_stats_async(current_user, db)
+
+
+@router.get('/export', response_class=StreamingResponse)
+async def export_todos(
+    current_user: CurrentUser,
+    response: Response,
+    format: schemas.TodoFileFormat = schemas.TodoFileFormat.ndjson,
+    include_archived: bool = False,
+):
+    """Stream every todo of the current user as NDJSON or CSV"""
+    media_type = 'text/csv' if format == schemas.TodoFileFormat.csv else 'application/x-ndjson'
+    return StreamingResponse(
+        service.export_todos(current_user, format, include_archived),
+        media_type=media_type,
+        headers={
+            **_dependency_headers(response),
+            'Content-Disposition': f'attachment; filename="todos.{format.value}"',
+        },
+    )
+
+
+@router.post('/batch', response_model=schemas.TodoBatchResponse)
+async def apply_batch(batch: schemas.TodoBatchRequest, current_user: CurrentUser, db: RouteDbSession):
+    """Apply many create/update/complete/delete operations in one transaction, with a result per operation"""
+    return await service.apply_batch_async(current_user, db, batch)
+
 
-@router.get('/', response_model=List[schemas.TodoResponse])
-def get_todos(current_user: CurrentUser, db: DbSession):
-    return service.get_todos(current_user, db)
+@router.post('/import', response_model=schemas.ImportReport)
+async def import_todos(file: UploadFile, current_user: CurrentUser, format: Optional[schemas.TodoFileFormat] = None):
+    """Bulk load todos from a CSV or NDJSON upload; invalid rows are reported and skipped"""
+    if format is None:
+        format = schemas.TodoFileFormat.csv if (file.filename or '').endswith('.csv') else schemas.TodoFileFormat.ndjson
+    return await run_in_threadpool(importer.import_todo_file, current_user.id, file.file, format)
 
 
 @router.get('/{todo_id}', response_model=schemas.TodoResponse)
-def get_todo(todo_id: UUID, current_user: CurrentUser, db: DbSession):
-    return service.get_todo_by_id(current_user, db, todo_id)
+async def get_todo(
+    todo_id: UUID,
+    current_user: CurrentUser,
+    db: RouteReadDbSession,
+    response: Response,
+    include_archived: bool = False,
+    if_none_match: Optional[str] = Header(None),
+):
+    etag, todo = await service.get_todo_if_changed_async(current_user, db, todo_id, if_none_match, include_archived)
+    if todo is None:
+        return _direct_response(response, None, etag, status.HTTP_304_NOT_MODIFIED)
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return todo
 
 @router.put('/{todo_id}', response_model=schemas.TodoResponse)
-def update_todo(todo_id: UUID, todo_update: schemas.TodoCreate, current_user: CurrentUser, db: DbSession):
-    return service.update_todo(current_user, db, todo_id, todo_update)
+async def update_todo(todo_id: UUID, todo_update: schemas.TodoCreate, current_user: CurrentUser, db: RouteDbSession):
+    return await service.update_todo_async(current_user, db, todo_id, todo_update)
 
 
 @router.put('/{todo_id}/complete', response_model=schemas.TodoResponse)
-def complete_todo(todo_id: UUID, current_user: CurrentUser, db: DbSession):
-    return service.complete_todo(current_user, db, todo_id)
+async def complete_todo(todo_id: UUID, current_user: CurrentUser, db: RouteDbSession):
+    return await service.complete_todo_async(current_user, db, todo_id)
 
 
 @router.delete('/{todo_id}', status_code=status.HTTP_204_NO_CONTENT)
-def delete_todo(todo_id: UUID, current_user: CurrentUser, db: DbSession):
-    service.delete_todo(current_user, db, todo_id)
+async def delete_todo(todo_id: UUID, current_user: CurrentUser, db: RouteDbSession):
+    await service.delete_todo_async(current_user, db, todo_id)
     
\ No newline at end of file
@@ -0,0 +1,195 @@
+"""
+Denormalized per-user todo counts (`todo_counters`).
+
+Every write path in todos.service and the importer turns the (is_completed, priority)
+states of the rows it touched, before and after, into a delta. That delta is applied
+with one UPDATE in the writer's own transaction, so the counts commit or roll back
+together with the todos. On PostgreSQL the single-todo writes put that UPDATE in the
+write statement itself (`delta_applied`), computed from the rows it returns.
+`reconcile` recounts from `todos` and repairs any drift:
+
+    python -m src.todos.counters                              # every user
+    python -m src.todos.counters --email someone@example.com
+"""
+from typing import Iterable
+from uuid import UUID
+import argparse
+import logging
+from sqlalchemy import ColumnElement, Select, and_, exists, func, insert, literal, or_, select, union_all, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from src.database.core import SessionLocal
+from src.entities.todo import Todo, Priority
+from src.entities.todo_counter import TodoCounter
+from src.entities.user import User
+
+
+TodoState = tuple[bool, Priority]  # (is_completed, priority)
+
+PRIORITY_COLUMNS = {
+    Priority.Normal: 'open_normal',
+    Priority.Low: 'open_low',
+    Priority.Medium: 'open_medium',
+    Priority.High: 'open_high',
+    Priority.Top: 'open_top',
+}
+COUNTER_COLUMNS = ('open_count', 'completed_count', *PRIORITY_COLUMNS.values())
+RECONCILE_BATCH_SIZE = 1000
+
+
+def _add(counts: dict[str, int], is_completed: bool, priority: Priority, n: int) -> None:
+    if is_completed:
+        counts['completed_count'] += n
+    else:
+        counts['open_count'] += n
+        counts[PRIORITY_COLUMNS[priority]] += n
+
+
+def counter_delta(before: Iterable[TodoState], after: Iterable[TodoState]) -> dict[str, int]:
+    """Column deltas for rows that were in the `before` states and are now in `after`."""
+    delta = dict.fromkeys(COUNTER_COLUMNS, 0)
+    for states, sign in ((before, -1), (after, 1)):
+        for is_completed, priority in states:
+            _add(delta, is_completed, priority, sign)
+    return {column: value for column, value in delta.items() if value}
+
+
+def count_todos(db: Session, user_ids: list[UUID]) -> dict[UUID, dict[str, int]]:
+    """Recount from `todos` with one grouped scan of the (user_id, ...) indexes."""
+    counts = {user_id: dict.fromkeys(COUNTER_COLUMNS, 0) for user_id in user_ids}
+    rows = db.execute(
+        select(Todo.user_id, Todo.is_completed, Todo.priority, func.count())
+        .where(Todo.user_id.in_(user_ids))
+        .group_by(Todo.user_id, Todo.is_completed, Todo.priority)
+    )
+    for user_id, is_completed, priority, n in rows:
+        _add(counts[user_id], is_completed, priority, n)
+    return counts
+
+
+def _update(db: Session, user_id: UUID, delta: dict[str, int]):
+    table = TodoCounter.__table__
+    return db.execute(
+        update(table)
+        .where(table.c.user_id == user_id)
+        .values({column: table.c[column] + value for column, value in delta.items()})
+    )
+
+
+def _create(db: Session, user_id: UUID, delta: dict[str, int]) -> dict[str, int]:
+    # The recount already sees this transaction's own writes, so `delta` is not added.
+    # If a concurrent transaction creates the row first, fall back to the increment.
+    counts = count_todos(db, [user_id])[user_id]
+    try:
+        with db.begin_nested():
+            db.execute(insert(TodoCounter).values(user_id=user_id, **counts))
+    except IntegrityError:
+        if delta:
+            _update(db, user_id, delta)
+    return counts
+
+
+def apply_delta(db: Session, user_id: UUID, delta: dict[str, int], applied: bool | None = None) -> None:
+    """
+    Apply `delta` in the caller's transaction; the caller commits. A write statement
+    that carried `delta_applied` passes its value as `applied`: true means it is done.
+    """
+    if not delta or applied:
+        return
+    if applied is False or _update(db, user_id, delta).rowcount == 0:
+        # First write since the table was introduced: backfill the row instead
+        _create(db, user_id, delta)
+
+
+def delta_applied(user_id: ColumnElement, before: Select | None = None, after: Select | None = None):
+    """
+    The counter UPDATE as a CTE, for a write statement on PostgreSQL. `user_id` is an
+    expression, usually the statement's bound parameter. `before` and `after` select the
+    (is_completed, priority) states the written rows left and entered, usually from the
+    statement's RETURNING. Returns a boolean column to select: false when nothing was
+    updated, i.e. no delta, or no counter row yet (see `apply_delta`).
+    """
+    table = TodoCounter.__table__
+    states = union_all(*(
+        rows.add_columns(literal(sign).label('n')) for rows, sign in ((before, -1), (after, 1)) if rows is not None
+    )).subquery('states')
+    is_completed, priority, n = states.c
+    conditions = {'open_count': ~is_completed, 'completed_count': is_completed}
+    conditions.update({column: and_(~is_completed, priority == p) for p, column in PRIORITY_COLUMNS.items()})
+    delta = select(
+        user_id.label('user_id'),
+        *(func.coalesce(func.sum(n).filter(condition), 0).label(column) for column, condition in conditions.items()),
+    ).subquery('delta')
+    counted = (
+        update(table)
+        .where(table.c.user_id == delta.c.user_id, or_(*(delta.c[column] != 0 for column in COUNTER_COLUMNS)))
+        .values({column: table.c[column] + delta.c[column] for column in COUNTER_COLUMNS})
+        .returning(table.c.user_id)
+        .cte('counted')
+    )
+    return exists(counted.select()).label('counted')
+
+
+def get_counts(db: Session, user_id: UUID) -> dict[str, int]:
+    """One primary-key lookup; a user without a row yet gets it backfilled once."""
+    columns = [getattr(TodoCounter, column) for column in COUNTER_COLUMNS]
+    row = db.execute(select(*columns).where(TodoCounter.user_id == user_id)).one_or_none()
+    if row is not None:
+        return dict(zip(COUNTER_COLUMNS, row))
+    counts = _create(db, user_id, {})
+    db.commit()
+    return counts
+
+
+def reconcile(db: Session, user_ids: list[UUID] | None = None, batch_size: int = RECONCILE_BATCH_SIZE) -> int:
+    """Recount the given users (default: everyone) and fix rows that drifted. Returns the number fixed."""
+    repaired = 0
+    last_id = None
+    while True:
+        if user_ids is not None:
+            batch, user_ids = user_ids[:batch_size], user_ids[batch_size:]
+        else:
+            stmt = select(User.id).order_by(User.id).limit(batch_size)
+            if last_id is not None:
+                stmt = stmt.where(User.id > last_id)
+            batch = list(db.scalars(stmt))
+        if not batch:
+            return repaired
+        last_id = batch[-1]
+
+        # Lock the counter rows first: writers that have not reached their counter
+        # UPDATE yet queue behind us and apply their delta on top of the fresh counts
+        stored = {
+            row.user_id: row
+            for row in db.scalars(select(TodoCounter).where(TodoCounter.user_id.in_(batch)).with_for_update())
+        }
+        for user_id, counts in count_todos(db, batch).items():
+            row = stored.get(user_id)
+            if row is None:
+                db.add(TodoCounter(user_id=user_id, **counts))
+            elif all(getattr(row, column) == value for column, value in counts.items()):
+                continue
+            else:
+                logging.warning('Todo counters for user %s drifted, repairing', user_id)
+                for column, value in counts.items():
+                    setattr(row, column, value)
+            repaired += 1
+        db.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Recompute per-user todo counters and repair drift.')
+    parser.add_argument('--email', help='only this user')
+    parser.add_argument('--batch-size', type=int, default=RECONCILE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        user_ids = None
+        if args.email:
+            user_ids = list(db.scalars(select(User.id).where(func.lower(User.email) == func.lower(args.email))))
+        repaired = reconcile(db, user_ids, args.batch_size)
+    print(f'Repaired {repaired} counter rows')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Bulk import of todos from CSV or NDJSON.
+
+Rows are read as a stream, validated against `schemas.TodoCreate` in chunks and
+loaded with PostgreSQL `COPY` through the psycopg2 connection (other databases fall
+back to a multi-row INSERT). Invalid rows are reported with their line number and
+skipped; each chunk commits on its own, so a bad row never aborts the whole import.
+
+    python -m src.todos.importer --email someone@example.com todos.csv
+"""
+from datetime import datetime, timezone
+from typing import IO, Iterable, Iterator
+from uuid import UUID, uuid4
+import argparse
+import csv
+import io
+import json
+import logging
+import sys
+import time
+from pydantic import ValidationError
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+from . import schemas
+from src.database.core import SessionLocal, UTCDateTime
+from . import counters
+from .service import _next_change_seq
+from src.entities.todo import Todo, Priority
+from src.entities.user import User
+
+
+IMPORT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+COPY_COLUMNS = ('id', 'user_id', 'description', 'due_date', 'is_completed', 'created_at', 'priority', 'updated_at', 'change_seq')
+
+
+def _coerce_priority(record: dict) -> dict:
+    # CSV cells are strings, and a priority may also be spelled by name ("High")
+    value = record.get('priority')
+    if isinstance(value, str):
+        if value.isdigit():
+            record['priority'] = int(value)
+        elif value in Priority.__members__:
+            record['priority'] = Priority[value]
+    return record
+
+
+def _iter_records(lines: Iterable[str], fmt: schemas.TodoFileFormat) -> Iterator[tuple[int, dict | Exception]]:
+    """Yield (line number, record or parse error) without reading the whole input."""
+    if fmt == schemas.TodoFileFormat.csv:
+        reader = csv.DictReader(lines)
+        for record in reader:
+            # Empty CSV cells mean "not given", so optional fields fall back to their defaults
+            yield reader.line_num, _coerce_priority({key: value for key, value in record.items() if value not in ('', None)})
+        return
+
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError('expected a JSON object')
+            yield line_no, _coerce_priority(record)
+        except ValueError as e:
+            yield line_no, e
+
+
+def _copy_timestamp(value: datetime | None) -> str:
+    # COPY bypasses UTCDateTime, and PostgreSQL drops the offset of a literal for a
+    # TIMESTAMP WITHOUT TIME ZONE column, so convert to naive UTC here the same way
+    if value is None:
+        return ''
+    return UTCDateTime().process_bind_param(value, None).isoformat()
+
+
+def _copy_rows(db: Session, rows: list[dict]) -> None:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([
+            row['id'],
+            row['user_id'],
+            row['description'],
+            _copy_timestamp(row['due_date']),
+            't' if row['is_completed'] else 'f',
+            _copy_timestamp(row['created_at']),
+            row['priority'].name,  # SQLAlchemy stores Enum members by name
+            _copy_timestamp(row['updated_at']),
+            row['change_seq'],
+        ])
+    buffer.seek(0)
+
+    # Unquoted empty fields are NULL in CSV mode, quoted empty strings stay ''
+    cursor = db.connection().connection.driver_connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY todos ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+
+def _load_chunk(db: Session, user_id: UUID, rows: list[dict]) -> None:
+    change_seq = _next_change_seq(db, user_id)
+    for row in rows:
+        row['change_seq'] = change_seq
+        row['updated_at'] = row['created_at']
+    if db.get_bind().dialect.driver == 'psycopg2':
+        _copy_rows(db, rows)
+    else:
+        db.execute(insert(Todo), rows)
+    counters.apply_delta(db, user_id, counters.counter_delta([], [(row['is_completed'], row['priority']) for row in rows]))
+    db.commit()
+
+
+def import_todos(user_id: UUID, lines: Iterable[str], fmt: schemas.TodoFileFormat, chunk_size: int = IMPORT_CHUNK_SIZE) -> schemas.ImportReport:
+    """Import todos for `user_id` from an iterable of text lines and report the outcome."""
+    report = schemas.ImportReport()
+    started = time.perf_counter()
+
+    def record_error(line: int, error: str) -> None:
+        report.failed += 1
+        if len(report.errors) < MAX_REPORTED_ERRORS:
+            report.errors.append(schemas.ImportRowError(line=line, error=error))
+
+    with SessionLocal() as db:
+        chunk: list[dict] = []
+        chunk_lines: list[int] = []
+
+        def flush() -> None:
+            if not chunk:
+                return
+            try:
+                _load_chunk(db, user_id, chunk)
+                report.imported += len(chunk)
+            except Exception as e:
+                db.rollback()
+                logging.error('Import chunk of %s rows rejected for user %s: %s', len(chunk), user_id, e)
+                for line in chunk_lines:
+                    record_error(line, f'chunk rejected by the database: {e}')
+            chunk.clear()
+            chunk_lines.clear()
+
+        for line, record in _iter_records(lines, fmt):
+            if isinstance(record, Exception):
+                record_error(line, str(record))
+                continue
+            try:
+                todo = schemas.TodoCreate.model_validate(record)
+            except ValidationError as e:
+                record_error(line, '; '.join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+                continue
+
+            chunk.append({
+                **todo.model_dump(),
+                'id': uuid4(),
+                'user_id': user_id,
+                'is_completed': False,
+                'created_at': datetime.now(timezone.utc),
+            })
+            chunk_lines.append(line)
+            if len(chunk) >= chunk_size:
+                flush()
+        flush()
+
+    report.elapsed_seconds = round(time.perf_counter() - started, 3)
+    report.rows_per_second = round(report.imported / report.elapsed_seconds, 1) if report.elapsed_seconds else 0.0
+    logging.info('Imported %s todos (%s failed) for user %s at %s rows/s', report.imported, report.failed, user_id, report.rows_per_second)
+    return report
+
+
+def import_todo_file(user_id: UUID, file: IO[bytes], fmt: schemas.TodoFileFormat) -> schemas.ImportReport:
+    lines = io.TextIOWrapper(file, encoding='utf-8', newline='')
+    try:
+        return import_todos(user_id, lines, fmt)
+    finally:
+        lines.detach()  # leave closing the upload to its owner
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Bulk import todos for one user from CSV or NDJSON.')
+    parser.add_argument('path', help="input file, or '-' for stdin")
+    parser.add_argument('--email', required=True, help='email of the user that will own the todos')
+    parser.add_argument('--format', choices=[f.value for f in schemas.TodoFileFormat], help='defaults to the file extension')
+    parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    fmt = schemas.TodoFileFormat(args.format or ('csv' if args.path.endswith('.csv') else 'ndjson'))
+    with SessionLocal() as db:
+        user = db.query(User).filter(func.lower(User.email) == func.lower(args.email)).first()
+    if user is None:
+        sys.exit(f'No user with email {args.email}')
+
+    if args.path == '-':
+        report = import_todos(user.id, io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline=''), fmt, args.chunk_size)
+    else:
+        with open(args.path, encoding='utf-8', newline='') as lines:
+            report = import_todos(user.id, lines, fmt, args.chunk_size)
+    print(report.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 from typing import Optional
 from datetime import datetime
 from uuid import UUID
+from enum import Enum
 from src.entities.todo import Priority
 
 
@@ -19,5 +20,101 @@ class TodoResponse(TodoBase):
     id: UUID
     is_completed: bool
     completed_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    version: int = 1
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+class TodoSort(str, Enum):
+    created_at = "created_at"   # newest first
+    due_date = "due_date"       # soonest first, undated todos last
+
+
+class TodoListParams(BaseModel):
+    is_completed: Optional[bool] = None
+    priority: Optional[Priority] = None
+    due_after: Optional[datetime] = None
+    due_before: Optional[datetime] = None
+    sort: TodoSort = TodoSort.created_at
+    cursor: Optional[str] = None
+    limit: int = Field(default=50, ge=1, le=200)
+    include_archived: bool = False  # also list todos moved to the archive table
+
+
+class TodoPage(BaseModel):
+    items: list[TodoResponse]
+    next_cursor: Optional[str] = None
+
+
+class TodoChanges(BaseModel):
+    upserted: list[TodoResponse]   # created or modified since the cursor
+    deleted: list[UUID]            # ids deleted (or archived) since the cursor
+    next_cursor: str               # pass as `since` on the next call
+    has_more: bool
+
+
+class TodoStats(BaseModel):
+    open: int
+    completed: int
+    overdue: int                 # open todos whose due date has passed
+    by_priority: dict[str, int]  # open todos per priority name
+
+
+class TodoFileFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class TodoBatchOp(str, Enum):
+    create = "create"
+    update = "update"
+    complete = "complete"
+    delete = "delete"
+
+
+class TodoBatchOperation(BaseModel):
+    op: TodoBatchOp
+    id: Optional[UUID] = None
+    todo: Optional[TodoCreate] = None
+
+    @model_validator(mode='after')
+    def check_fields_for_op(self):
+        if self.op == TodoBatchOp.create:
+            if self.todo is None or self.id is not None:
+                raise ValueError("'create' takes a 'todo' and no 'id'")
+        elif self.op == TodoBatchOp.update:
+            if self.todo is None or self.id is None:
+                raise ValueError("'update' takes an 'id' and a 'todo'")
+        elif self.id is None or self.todo is not None:
+            raise ValueError(f"'{self.op.value}' takes an 'id' and no 'todo'")
+        return self
+
+
+class TodoBatchRequest(BaseModel):
+    operations: list[TodoBatchOperation] = Field(min_length=1, max_length=1000)
+
+
+class TodoBatchResult(BaseModel):
+    index: int
+    op: TodoBatchOp
+    id: Optional[UUID] = None
+    status: int     # what the matching single-item route would have answered: 200, 201, 204 or 404
+    todo: Optional[TodoResponse] = None
+
+
+class TodoBatchResponse(BaseModel):
+    results: list[TodoBatchResult]
+
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+
+class ImportReport(BaseModel):
+    imported: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+    rows_per_second: float = 0.0
+    errors: list[ImportRowError] = []   # first 1000 failures, `failed` has the full count
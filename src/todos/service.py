@@ -1,75 +1,925 @@
 from datetime import datetime, timezone
-from uuid import UUID
-from sqlalchemy.orm import Session
+from functools import cache
+from uuid import UUID, uuid4
+from typing import AsyncIterator, Iterator
+import base64
+import binascii
+import csv
+import io
+import json
+import os
+from sqlalchemy import Float, bindparam, cast, delete, func, insert, literal, literal_column, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
 from . import schemas
+from . import counters
 from src.entities.user import User
-from src.entities.todo import Todo
-from src.exceptions import TodoCreationError, TodoNotFoundError
+from src.entities.todo import SEARCH_CONFIG, Todo, Priority
+from src.entities.todo_archive import ArchivedTodo
+from src.entities.todo_tombstone import TodoTombstone
+from src.database.core import DATABASE_ASYNC, run_sync
+from src.database.replicas import mark_written, read_session, replica_set
+from src.exceptions import ChangeCursorExpiredError, TodoCreationError, TodoNotFoundError, InvalidCursorError, TodoBatchError
 import logging
 
+try:
+    import orjson
+except ImportError:  # optional: the fast path falls back to the stdlib encoder
+    orjson = None
+
+
+# Opt-in: serve list pages and exports from column tuples, encoded straight to bytes
+TODO_FAST_JSON = (os.getenv('TODO_FAST_JSON') or 'false').lower() in ('1', 'true', 'yes')
+
+
+def _next_change_seq(db: Session, user_id: UUID) -> int:
+    """
+    Bump the user's `todos_version` and return it as the change sequence of this write.
+
+    Called first in every write transaction: the user row stays locked until commit, so
+    a user's writes commit in sequence order (and always take their locks in the same
+    order), and the list ETag never changes before the rows do. Once the write commits,
+    the user's reads stick to the primary for a while (see database.replicas).
+    """
+    mark_written(db, user_id)
+    return db.scalars(
+        update(User)
+        .where(User.id == user_id)
+        .values(todos_version=User.todos_version + 1)
+        .returning(User.todos_version)
+        .execution_options(synchronize_session=False)
+    ).one()
+
+
+""" Single-statement writes """
+
+def _chained_writes(db: Session) -> bool:
+    # PostgreSQL runs data-modifying CTEs, so the parts of a write go out as one statement
+    return db.get_bind().dialect.name == 'postgresql'
+
+
+# A chained statement is built once per shape by the @cache builders below and run
+# with `_run_chained`: composing the CTEs costs more Python time than the round trips
+# they save, while a bound statement only pays for its (cached) compilation
+def _param(name: str, column):
+    return bindparam(f'b_{name}', type_=column.type)
+
+
+def _run_chained(db: Session, stmt, **params):
+    mark_written(db, params['user_id'])
+    return db.execute(stmt, {f'b_{name}': value for name, value in params.items()})
+
+
+def _version_cte():
+    """`_next_change_seq` as a CTE, to run inside the write statement itself."""
+    return (
+        update(User)
+        .where(User.id == _param('user_id', User.id))
+        .values(todos_version=User.todos_version + 1)
+        .returning(User.todos_version.label('change_seq'))
+        .cte('version')
+    )
+
+
+def _chained_change_seq():
+    """The change sequence of a chained write. Every use in one statement must share the object."""
+    return select(_version_cte().c.change_seq).scalar_subquery()
+
+
+def _written(stmt):
+    """A todo INSERT/UPDATE as a CTE returning whole rows."""
+    return stmt.returning(*Todo.__table__.c).cte('written')
+
+
+def _select_written(written, *columns):
+    """The todos a `_written` CTE wrote, as Todo objects, next to `columns`."""
+    return select(aliased(Todo, written), *columns).execution_options(populate_existing=True)
+
+
+def _states(rows):
+    """The (is_completed, priority) states of the rows of a CTE, for `counters.delta_applied`."""
+    return select(rows.c.is_completed, rows.c.priority)
+
+
+def _owned(*conditions):
+    return (Todo.id == _param('todo_id', Todo.id), Todo.user_id == _param('user_id', Todo.user_id), *conditions)
+
+
+# Column defaults are spelled out: SQLAlchemy skips them in an INSERT with a CTE
+CREATE_COLUMNS = ('id', 'user_id', 'description', 'due_date', 'priority', 'is_completed', 'version', 'created_at', 'updated_at')
+
+
+@cache
+def _chained_create():
+    written = _written(insert(Todo).values({
+        **{column: _param(column, Todo.__table__.c[column]) for column in CREATE_COLUMNS},
+        'change_seq': _chained_change_seq(),
+    }))
+    return _select_written(written, counters.delta_applied(_param('user_id', Todo.user_id), after=_states(written)))
+
+
+@cache
+def _chained_update(columns: tuple[str, ...], moves_counters: bool):
+    change_seq = _chained_change_seq()
+    stmt = update(Todo).values({
+        **{column: _param(column, Todo.__table__.c[column]) for column in columns},
+        'version': Todo.version + 1, 'change_seq': change_seq, 'updated_at': _param('now', Todo.updated_at),
+    })
+    if not moves_counters:
+        return _select_written(_written(stmt.where(*_owned())))
+    # The old state is locked and read in the same statement; testing the sequence
+    # takes the user row lock before the todo's
+    old = (
+        select(Todo.id, Todo.is_completed, Todo.priority)
+        .where(*_owned(change_seq.is_not(None)))
+        .with_for_update(of=Todo)
+        .cte('before')
+    )
+    written = _written(stmt.where(*_owned(), Todo.id == old.c.id))
+    return _select_written(
+        written, old.c.is_completed, old.c.priority,
+        counters.delta_applied(_param('user_id', Todo.user_id), _states(old), _states(written)),
+    ).where(old.c.id == written.c.id)
+
+
+@cache
+def _chained_complete():
+    now = _param('now', Todo.updated_at)
+    written = _written(
+        update(Todo)
+        .where(*_owned(Todo.is_completed.is_(False)))
+        .values(is_completed=True, completed_at=now, version=Todo.version + 1, change_seq=_chained_change_seq(), updated_at=now)
+    )
+    opened = select(literal(False).label('is_completed'), written.c.priority)
+    return _select_written(written, counters.delta_applied(_param('user_id', Todo.user_id), opened, _states(written)))
+
+
+@cache
+def _chained_delete():
+    change_seq = _chained_change_seq()
+    # Testing the sequence makes the version bump, and its user row lock, come before
+    # the todo row is locked, as in every other write
+    deleted_rows = (
+        delete(Todo)
+        .where(*_owned(change_seq.is_not(None)))
+        .returning(Todo.is_completed, Todo.priority, change_seq.label('change_seq'))
+        .cte('deleted')
+    )
+    # The tombstone is written from the DELETE's RETURNING, in the same statement
+    tombstone = insert(TodoTombstone).from_select(
+        ['todo_id', 'user_id', 'change_seq', 'deleted_at'],
+        select(
+            _param('todo_id', TodoTombstone.todo_id), _param('user_id', TodoTombstone.user_id),
+            deleted_rows.c.change_seq, _param('now', TodoTombstone.deleted_at),
+        ),
+    ).cte('tombstone')
+    return select(
+        deleted_rows, counters.delta_applied(_param('user_id', Todo.user_id), before=_states(deleted_rows)),
+    ).add_cte(tombstone)
+
 
 def create_todo(current_user: User, db: Session, todo: schemas.TodoCreate) -> Todo:
     try:
-        new_todo = Todo(**todo.model_dump())
-        new_todo.user_id = current_user.id
-        db.add(new_todo)
+        now = datetime.now(timezone.utc)
+        values = dict(
+            **todo.model_dump(), id=uuid4(), user_id=current_user.id, is_completed=False, version=1,
+            created_at=now, updated_at=now,
+        )
+        if _chained_writes(db):
+            new_todo, applied = _run_chained(db, _chained_create(), **values).one()
+        else:
+            # INSERT ... RETURNING hands back server-side values, so no refresh SELECT is needed
+            stmt = insert(Todo).values(**values, change_seq=_next_change_seq(db, current_user.id))
+            new_todo, applied = db.scalars(stmt.returning(Todo)).one(), None
+        counters.apply_delta(db, current_user.id, counters.counter_delta([], [(new_todo.is_completed, new_todo.priority)]), applied)
         db.commit()
-        db.refresh(new_todo)
-        logging.info(f'Created new todo for user: {current_user.id}')
+        logging.info('Created new todo for user: %s', current_user.id)
         return new_todo
         
     except Exception as e:
-        logging.error(f'Failed to create todo for user {current_user.id}: {e}')
+        logging.error('Failed to create todo for user %s: %s', current_user.id, e)
         raise TodoCreationError(str(e))
 
 
-def get_todos(current_user: User, db: Session) -> list[Todo]:
-    todos = db.query(Todo).filter(Todo.user_id == current_user.id).all()
-    logging.info(f'Retrieved {len(todos)} todos for user: {current_user.id}')
-    return todos
+""" Keyset pagination """
+
+def _encode_cursor(sort: schemas.TodoSort, todo: Todo) -> str:
+    key = todo.created_at if sort == schemas.TodoSort.created_at else todo.due_date
+    payload = json.dumps({'s': sort.value, 'k': key and key.isoformat(), 'id': str(todo.id)})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(sort: schemas.TodoSort, cursor: str) -> tuple[datetime | None, UUID]:
+    """The sort key and id of the last row served; the key is None for an undated todo."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload['s'] != sort.value:
+            raise ValueError('cursor was issued for a different sort order')
+        if payload['k'] is None and sort != schemas.TodoSort.due_date:
+            raise ValueError('cursor has no sort key')
+        return payload['k'] and datetime.fromisoformat(payload['k']), UUID(payload['id'])
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        logging.warning('Rejected pagination cursor: %s', e)
+        raise InvalidCursorError()
+
 
+def _list_stmts(current_user: User, params: schemas.TodoListParams, *entities, model=Todo) -> list:
+    """
+    The statements that produce one page, in page order; `_fetch_page` runs them in turn.
 
-def get_todo_by_id(current_user: User, db: Session, todo_id: UUID) -> Todo:
+    Sort key + id gives a total order, so a page boundary is just a row-value comparison
+    that the (user_id, <sort key>, id) indexes can seek to directly. Undated todos come
+    last in due_date order. A NULL never compares greater than the cursor, so they are
+    a second seek (on due_date IS NULL, by id) once the dated ones run out.
+    """
+    stmt = select(*entities).where(model.user_id == current_user.id)
+
+    if params.is_completed is not None:
+        stmt = stmt.where(model.is_completed == params.is_completed)
+    if params.priority is not None:
+        stmt = stmt.where(model.priority == params.priority)
+    if params.due_after is not None:
+        stmt = stmt.where(model.due_date >= params.due_after)
+    if params.due_before is not None:
+        stmt = stmt.where(model.due_date < params.due_before)
+
+    if params.sort == schemas.TodoSort.created_at:
+        if params.cursor:
+            stmt = stmt.where(tuple_(model.created_at, model.id) < tuple_(*_decode_cursor(params.sort, params.cursor)))
+        return [stmt.order_by(model.created_at.desc(), model.id.desc())]
+
+    key, last_id = _decode_cursor(params.sort, params.cursor) if params.cursor else (None, None)
+    stmts = []
+    undated = stmt.where(model.due_date.is_(None))
+    if key is not None or last_id is None:
+        dated = stmt.where(model.due_date.is_not(None))
+        if key is not None:
+            dated = dated.where(tuple_(model.due_date, model.id) > tuple_(key, last_id))
+        stmts.append(dated.order_by(model.due_date.asc(), model.id.asc()))
+    else:
+        undated = undated.where(model.id > last_id)
+    # A due date range never matches an undated todo
+    if params.due_after is None and params.due_before is None:
+        stmts.append(undated.order_by(model.id.asc()))
+    return stmts
+
+
+def _fetch_page(run, params: schemas.TodoListParams, stmts: list) -> list:
+    """Up to limit + 1 rows from `stmts`; `run` executes one statement and returns its rows."""
+    rows = []
+    for stmt in stmts:
+        rows.extend(run(stmt.limit(params.limit + 1 - len(rows))))
+        if len(rows) > params.limit:
+            break
+    return rows
+
+
+def _page_key(params: schemas.TodoListParams):
+    if params.sort == schemas.TodoSort.created_at:
+        return lambda row: (row.created_at, row.id)
+    return lambda row: (row.due_date is None, row.due_date or datetime.min, row.id)
+
+
+def _with_archived(params: schemas.TodoListParams, rows: list, archived_rows: list) -> list:
+    """Merge a page of `todos` with the same page of the archive; both are in page order."""
+    merged = sorted([*rows, *archived_rows], key=_page_key(params), reverse=params.sort == schemas.TodoSort.created_at)
+    # Each side holds at most limit + 1 rows, so the first limit + 1 of the merge are exact
+    return merged[:params.limit + 1]
+
+
+def get_todos(current_user: User, db: Session, params: schemas.TodoListParams | None = None) -> schemas.TodoPage:
+    params = params or schemas.TodoListParams()
+    scalars = lambda stmt: db.scalars(stmt).all()
+    todos = _fetch_page(scalars, params, _list_stmts(current_user, params, Todo))
+    # The archive only holds completed todos, so a list of open ones never reads it
+    if params.include_archived and params.is_completed is not False:
+        archived = _fetch_page(scalars, params, _list_stmts(current_user, params, ArchivedTodo, model=ArchivedTodo))
+        todos = _with_archived(params, todos, archived)
+    next_cursor = None
+    if len(todos) > params.limit:
+        todos = todos[:params.limit]
+        next_cursor = _encode_cursor(params.sort, todos[-1])
+
+    logging.info('Retrieved %s todos for user: %s', len(todos), current_user.id)
+    return schemas.TodoPage.model_validate({'items': todos, 'next_cursor': next_cursor})
+
+
+def get_todo_by_id(current_user: User, db: Session, todo_id: UUID, include_archived: bool = False) -> Todo | ArchivedTodo:
     todo = (
         db.query(Todo)
         .filter(Todo.id == todo_id)
         .filter(Todo.user_id == current_user.id)
         .first()
     )
+    if not todo and include_archived:
+        todo = db.scalars(select(ArchivedTodo).where(ArchivedTodo.id == todo_id, ArchivedTodo.user_id == current_user.id)).first()
     if not todo:
-        logging.warning(f'Todo {todo_id} not found for user {current_user.id}')
+        logging.warning('Todo %s not found for user %s', todo_id, current_user.id)
         raise TodoNotFoundError(todo_id)
-    logging.info(f'Retrieved todo {todo_id} for user: {current_user.id}')
+    logging.info('Retrieved todo %s for user: %s', todo_id, current_user.id)
     return todo
 
 
 def update_todo(current_user: User, db: Session, todo_id: UUID, todo_update: schemas.TodoCreate) -> Todo:
-    todo = get_todo_by_id(current_user, db, todo_id)
     update_data = todo_update.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(todo, key, value)
+    # Only a priority change moves counters, and only then is the old value needed
+    moves_counters = 'priority' in update_data
+    now = datetime.now(timezone.utc)
+    before = applied = None
+    if _chained_writes(db):
+        result = _run_chained(
+            db, _chained_update(tuple(update_data), moves_counters),
+            **update_data, todo_id=todo_id, user_id=current_user.id, now=now,
+        )
+        if not moves_counters:
+            todo = result.scalars().one_or_none()
+        else:
+            row = result.one_or_none()
+            todo, before, applied = (row[0], tuple(row[1:3]), row[3]) if row is not None else (None, None, None)
+    else:
+        change_seq = _next_change_seq(db, current_user.id)
+        if moves_counters:
+            before = db.execute(
+                select(Todo.is_completed, Todo.priority)
+                .where(Todo.id == todo_id, Todo.user_id == current_user.id)
+                .with_for_update()
+            ).one_or_none()
+        todo = db.scalars(
+            update(Todo)
+            .where(Todo.id == todo_id, Todo.user_id == current_user.id)
+            .values(**update_data, version=Todo.version + 1, change_seq=change_seq, updated_at=now)
+            .returning(Todo)
+        ).one_or_none()
+    if todo is None:
+        db.rollback()
+        logging.warning('Todo %s not found for user %s', todo_id, current_user.id)
+        raise TodoNotFoundError(todo_id)
+    if before is not None:
+        counters.apply_delta(db, current_user.id, counters.counter_delta([tuple(before)], [(todo.is_completed, todo.priority)]), applied)
     db.commit()
-    db.refresh(todo)
-    logging.info(f'Successfully updated todo {todo_id} for user: {current_user.id}')
+    logging.info('Successfully updated todo %s for user: %s', todo_id, current_user.id)
     return todo
 
 
 def complete_todo(current_user: User, db: Session, todo_id: UUID) -> Todo:
-    todo = get_todo_by_id(current_user, db, todo_id)
-    if todo.is_completed:
-        logging.debug(f'Todo {todo_id} is already complete')
+    now = datetime.now(timezone.utc)
+    # Only an open todo is updated, so the statement itself tells whether anything changed
+    if _chained_writes(db):
+        row = _run_chained(db, _chained_complete(), todo_id=todo_id, user_id=current_user.id, now=now).one_or_none()
+        todo, applied = row if row is not None else (None, None)
+    else:
+        change_seq = _next_change_seq(db, current_user.id)
+        todo, applied = db.scalars(
+            update(Todo)
+            .where(Todo.id == todo_id, Todo.user_id == current_user.id, Todo.is_completed.is_(False))
+            .values(is_completed=True, completed_at=now, version=Todo.version + 1, change_seq=change_seq, updated_at=now)
+            .returning(Todo)
+        ).one_or_none(), None
+    if todo is None:
+        # Completing twice is a no-op: an already completed todo keeps its original
+        # completed_at, and the sequence bump is rolled back since nothing changed
+        db.rollback()
+        todo = db.scalars(select(Todo).where(Todo.id == todo_id, Todo.user_id == current_user.id)).one_or_none()
+        if todo is None:
+            logging.warning('Todo %s not found for user %s', todo_id, current_user.id)
+            raise TodoNotFoundError(todo_id)
         return todo
-
-    todo.is_completed = True
-    todo.completed_at = datetime.now(timezone.utc)
+    counters.apply_delta(db, current_user.id, counters.counter_delta([(False, todo.priority)], [(True, todo.priority)]), applied)
     db.commit()
-    db.refresh(todo)
-    logging.info(f'Todo {todo_id} marked as complete by user {current_user.id}')
+    logging.info('Todo %s marked as complete by user %s', todo_id, current_user.id)
     return todo
 
 
 def delete_todo(current_user: User, db: Session, todo_id: UUID) -> None:
-    todo = get_todo_by_id(current_user, db, todo_id)
-    db.delete(todo)
+    if _chained_writes(db):
+        deleted = _run_chained(
+            db, _chained_delete(), todo_id=todo_id, user_id=current_user.id, now=datetime.now(timezone.utc),
+        ).one_or_none()
+    else:
+        change_seq = _next_change_seq(db, current_user.id)
+        deleted = db.execute(
+            delete(Todo)
+            .where(Todo.id == todo_id, Todo.user_id == current_user.id)
+            .returning(Todo.is_completed, Todo.priority)
+            .execution_options(synchronize_session=False)
+        ).one_or_none()
+        if deleted is not None:
+            db.execute(insert(TodoTombstone).values(todo_id=todo_id, user_id=current_user.id, change_seq=change_seq))
+    if deleted is None:
+        db.rollback()
+        logging.warning('Todo %s not found for user %s', todo_id, current_user.id)
+        raise TodoNotFoundError(todo_id)
+    delta = counters.counter_delta([(deleted.is_completed, deleted.priority)], [])
+    counters.apply_delta(db, current_user.id, delta, deleted._mapping.get('counted'))
     db.commit()
-    logging.info(f'Todo {todo_id} deleted by user {current_user.id}')
\ No newline at end of file
+    logging.info('Todo %s deleted by user %s', todo_id, current_user.id)
+
+
+""" Fast serialization """
+
+# The columns of `TodoResponse`, in field order, so the JSON keys come out the same
+RESPONSE_COLUMNS = tuple(schemas.TodoResponse.model_fields)
+
+
+def _json_value(value):
+    # Mirrors pydantic's JSON mode for the column types of `todos`
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Priority):
+        return value.value
+    return value
+
+
+def _json_bytes(obj) -> bytes:
+    """Compact UTF-8 JSON, byte for byte what FastAPI's JSONResponse renders."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def get_todos_json(current_user: User, db: Session, params: schemas.TodoListParams | None = None) -> bytes:
+    """
+    `get_todos` rendered to its JSON body without ORM objects or model validation.
+
+    Rows come back as plain column tuples (no identity map) and go straight into dicts
+    for the encoder. `benchmarks/serialization.py` checks the output is identical to
+    the regular response.
+    """
+    params = params or schemas.TodoListParams()
+    columns = [getattr(Todo, column) for column in RESPONSE_COLUMNS]
+    execute = lambda stmt: db.execute(stmt).all()
+    rows = _fetch_page(execute, params, _list_stmts(current_user, params, *columns, Todo.created_at))
+    if params.include_archived and params.is_completed is not False:
+        archived_columns = [getattr(ArchivedTodo, column) for column in RESPONSE_COLUMNS]
+        archived = _fetch_page(execute, params, _list_stmts(current_user, params, *archived_columns, ArchivedTodo.created_at, model=ArchivedTodo))
+        rows = _with_archived(params, rows, archived)
+    next_cursor = None
+    if len(rows) > params.limit:
+        rows = rows[:params.limit]
+        next_cursor = _encode_cursor(params.sort, rows[-1])
+
+    width = len(RESPONSE_COLUMNS)
+    items = [dict(zip(RESPONSE_COLUMNS, map(_json_value, row[:width]))) for row in rows]
+    logging.info('Retrieved %s todos for user: %s', len(items), current_user.id)
+    return _json_bytes({'items': items, 'next_cursor': next_cursor})
+
+
+""" Search """
+
+def _encode_search_cursor(rank: float, todo_id: UUID) -> str:
+    payload = json.dumps({'r': rank, 'id': str(todo_id)})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _decode_search_cursor(cursor: str) -> tuple[float, UUID]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return float(payload['r']), UUID(payload['id'])
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        logging.warning('Rejected search cursor: %s', e)
+        raise InvalidCursorError()
+
+
+def search_todos(current_user: User, db: Session, q: str, cursor: str | None = None, limit: int = 20) -> schemas.TodoPage:
+    """
+    Rank the user's todos against `q`, best match first.
+
+    On PostgreSQL a todo matches when its `search_vector` matches the web-search style
+    query (stemmed words, "phrases", -exclusions) or its description contains `q` as a
+    substring (trigram index). Rank is the text rank plus trigram similarity. Pages are
+    keyset on (rank, id). Elsewhere only the substring match applies and rank is 0.
+    """
+    substring = Todo.description.icontains(q, autoescape=True)
+    if db.get_bind().dialect.name == 'postgresql':
+        query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+        vector = literal_column('todos.search_vector')
+        rank = cast(func.ts_rank_cd(vector, query) + func.similarity(Todo.description, q), Float)
+        match = or_(vector.op('@@')(query), substring)
+    else:
+        rank = literal(0.0, Float)
+        match = substring
+
+    stmt = select(Todo, rank.label('rank')).where(Todo.user_id == current_user.id, match)
+    if cursor:
+        stmt = stmt.where(tuple_(rank, Todo.id) < tuple_(*_decode_search_cursor(cursor)))
+    rows = db.execute(stmt.order_by(rank.desc(), Todo.id.desc()).limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_search_cursor(rows[-1].rank, rows[-1].Todo.id)
+
+    logging.info('Search matched %s todos for user: %s', len(rows), current_user.id)
+    return schemas.TodoPage.model_validate({'items': [row.Todo for row in rows], 'next_cursor': next_cursor})
+
+
+""" Delta sync """
+
+# Sorts after every todo id: a cursor at (seq, MAX_CHANGE_ID) has seen all of `seq`
+MAX_CHANGE_ID = UUID(int=2**128 - 1)
+
+
+def _encode_change_cursor(change_seq: int, todo_id: UUID, floor: int | None = None) -> str:
+    payload = {'c': change_seq, 'id': str(todo_id)}
+    if floor is not None:
+        payload['f'] = floor
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def _decode_change_cursor(cursor: str) -> tuple[tuple[int, UUID], int | None]:
+    """Return the position and, while a paged full sync is unfinished, the version it started at."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        floor = payload.get('f')
+        return (int(payload['c']), UUID(payload['id'])), None if floor is None else int(floor)
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        logging.warning('Rejected change cursor: %s', e)
+        raise InvalidCursorError()
+
+
+def get_changes(current_user: User, db: Session, since: str | None = None, limit: int = 500) -> schemas.TodoChanges:
+    """
+    Todos written and deleted after the `since` cursor, oldest change first.
+
+    Changes are ordered by (change_seq, id). Live rows and tombstones are two keyset
+    range scans on their (user_id, change_seq, id) indexes, merged here, so the cost
+    follows the number of changes rather than the size of the list. Without `since`
+    every todo is returned, and no deletes; the cursors of its later pages keep the
+    version it started at, so those skip deletes from before it. A call that returns
+    the last change moves the cursor up to the user's version. Tombstones are kept for
+    TODO_TOMBSTONE_RETENTION_DAYS (todos.tombstones); a cursor from before the
+    pruned ones gets 410, and the client syncs from scratch.
+    """
+    # Read before the rows: every change up to this version is committed and visible
+    version = db.scalar(select(User.todos_version).where(User.id == current_user.id))
+    todos_stmt = select(Todo).where(Todo.user_id == current_user.id)
+    tombstones_stmt = select(TodoTombstone.change_seq, TodoTombstone.todo_id).where(TodoTombstone.user_id == current_user.id)
+    position = floor = None
+    if since:
+        position, floor = _decode_change_cursor(since)
+        todos_stmt = todos_stmt.where(tuple_(Todo.change_seq, Todo.id) > tuple_(*position))
+        tombstones_stmt = tombstones_stmt.where(tuple_(TodoTombstone.change_seq, TodoTombstone.todo_id) > tuple_(*position))
+        if floor is not None:
+            # Later pages of a full sync: todos deleted before it started were never sent
+            tombstones_stmt = tombstones_stmt.where(TodoTombstone.change_seq > floor)
+
+    todos = db.scalars(todos_stmt.order_by(Todo.change_seq, Todo.id).limit(limit + 1)).all()
+    tombstones = []
+    if since:
+        tombstones = db.execute(
+            tombstones_stmt.order_by(TodoTombstone.change_seq, TodoTombstone.todo_id).limit(limit + 1)
+        ).all()
+        # Read after the tombstones: a prune that removed any of them is visible here
+        pruned = db.scalar(select(User.pruned_change_seq).where(User.id == current_user.id))
+        seen = max(position, (floor, MAX_CHANGE_ID)) if floor is not None else position
+        if pruned and seen < (pruned, MAX_CHANGE_ID):
+            logging.info('Change cursor of user %s predates pruned tombstones', current_user.id)
+            raise ChangeCursorExpiredError()
+
+    # Each stream holds at most limit + 1 rows, so the first `limit` of the merge are exact
+    merged = sorted(
+        [((todo.change_seq, todo.id), todo) for todo in todos]
+        + [((change_seq, todo_id), None) for change_seq, todo_id in tombstones],
+        key=lambda change: change[0],
+    )
+    page = merged[:limit]
+    if page:
+        position = page[-1][0]
+    if len(merged) <= limit:
+        # Everything up to the version read above has been seen, deletes included, so
+        # the next delta starts there; an idle user's cursor then never falls behind
+        # the pruned tombstones
+        position, floor = max(position or (0, UUID(int=0)), (version, MAX_CHANGE_ID)), None
+    elif since is None:
+        floor = version
+    elif floor is not None and position >= (floor, MAX_CHANGE_ID):
+        floor = None
+    next_cursor = _encode_change_cursor(*position, floor)
+
+    logging.info('Returned %s changes for user: %s', len(page), current_user.id)
+    return schemas.TodoChanges(
+        upserted=[schemas.TodoResponse.model_validate(todo) for _, todo in page if todo is not None],
+        deleted=[key[1] for key, todo in page if todo is None],
+        next_cursor=next_cursor,
+        has_more=len(merged) > limit,
+    )
+
+
+""" Counters """
+
+def get_todo_stats(current_user: User, db: Session) -> schemas.TodoStats:
+    counts = counters.get_counts(db, current_user.id)
+    # Overdue depends on the clock, not only on writes, so it cannot be a stored
+    # counter; it is a count over the partial index of the user's open todos
+    overdue = db.scalar(
+        select(func.count())
+        .select_from(Todo)
+        .where(Todo.user_id == current_user.id, ~Todo.is_completed, Todo.due_date < datetime.now(timezone.utc).replace(tzinfo=None))
+    )
+    return schemas.TodoStats(
+        open=counts['open_count'],
+        completed=counts['completed_count'],
+        overdue=overdue,
+        by_priority={priority.name: counts[column] for priority, column in counters.PRIORITY_COLUMNS.items()},
+    )
+
+
+""" Conditional reads """
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # Weak comparison (RFC 9110): W/"3" and "3" name the same version
+    return any(tag.strip().removeprefix('W/') == etag.removeprefix('W/') for tag in if_none_match.split(','))
+
+
+def get_todos_if_changed(
+    current_user: User, db: Session, params: schemas.TodoListParams | None, if_none_match: str | None, as_json: bool = False,
+) -> tuple[str, schemas.TodoPage | bytes | None]:
+    """
+    Return the list ETag and the requested page, or None instead of the page when
+    the client's copy is current. The check is a primary-key read of one column, so
+    an unchanged poll loads and serializes no todos at all. With `as_json` the page
+    comes back already encoded, from `get_todos_json`.
+    """
+    version = db.scalar(select(User.todos_version).where(User.id == current_user.id))
+    etag = f'W/"{version}"'
+    if _etag_matches(if_none_match, etag):
+        return etag, None
+    if as_json:
+        return etag, get_todos_json(current_user, db, params)
+    return etag, get_todos(current_user, db, params)
+
+
+def get_todo_if_changed(
+    current_user: User, db: Session, todo_id: UUID, if_none_match: str | None, include_archived: bool = False,
+) -> tuple[str, Todo | ArchivedTodo | None]:
+    version = db.scalar(select(Todo.version).where(Todo.id == todo_id, Todo.user_id == current_user.id))
+    if version is None and include_archived:
+        version = db.scalar(select(ArchivedTodo.version).where(ArchivedTodo.id == todo_id, ArchivedTodo.user_id == current_user.id))
+    if version is None:
+        logging.warning('Todo %s not found for user %s', todo_id, current_user.id)
+        raise TodoNotFoundError(todo_id)
+    etag = f'W/"{version}"'
+    if _etag_matches(if_none_match, etag):
+        return etag, None
+    return etag, get_todo_by_id(current_user, db, todo_id, include_archived)
+
+
+""" Batch operations """
+
+def apply_batch(current_user: User, db: Session, batch: schemas.TodoBatchRequest) -> schemas.TodoBatchResponse:
+    """
+    Apply a list of create/update/complete/delete operations in one transaction.
+
+    Operations are grouped by kind and each group runs as a set-based statement
+    (creates, then updates, completes and deletes), so the number of round trips does
+    not depend on the batch size. Ids the user does not own are reported as 404.
+    """
+    Op = schemas.TodoBatchOp
+    ops = batch.operations
+    try:
+        change_seq = _next_change_seq(db, current_user.id)
+        now = datetime.now(timezone.utc)
+        referenced = {o.id for o in ops if o.id is not None}
+        # Locked, so the counter delta below is computed against the states we change
+        before = {row.id: (row.is_completed, row.priority) for row in db.execute(
+            select(Todo.id, Todo.is_completed, Todo.priority)
+            .where(Todo.user_id == current_user.id, Todo.id.in_(referenced))
+            .with_for_update()
+        )} if referenced else {}
+        owned = set(before)
+
+        creates = [o for o in ops if o.op == Op.create]
+        created_ids = [uuid4() for _ in creates]
+        created = {}
+        if creates:
+            rows = [
+                {**o.todo.model_dump(), 'id': new_id, 'user_id': current_user.id, 'change_seq': change_seq, 'updated_at': now}
+                for o, new_id in zip(creates, created_ids)
+            ]
+            created = {t.id: t for t in db.scalars(insert(Todo).returning(Todo), rows)}
+
+        # executemany needs the same columns in every row, so partial updates are grouped
+        # by which fields they set (description is always present, so at most 4 groups)
+        updates = [o for o in ops if o.op == Op.update and o.id in owned]
+        update_groups: dict[frozenset, list[dict]] = {}
+        for o in updates:
+            values = o.todo.model_dump(exclude_unset=True)
+            update_groups.setdefault(frozenset(values), []).append(
+                {'b_id': o.id, **{f'b_{key}': value for key, value in values.items()}}
+            )
+        todos_table = Todo.__table__
+        for keys, params in update_groups.items():
+            stmt = (
+                update(todos_table)
+                .where(todos_table.c.id == bindparam('b_id'), todos_table.c.user_id == current_user.id)
+                .values({
+                    **{key: bindparam(f'b_{key}') for key in keys},
+                    'version': todos_table.c.version + 1, 'change_seq': change_seq, 'updated_at': now,
+                })
+            )
+            db.execute(stmt, params)
+
+        complete_ids = {o.id for o in ops if o.op == Op.complete and o.id in owned}
+        if complete_ids:
+            db.execute(
+                update(Todo)
+                .where(Todo.user_id == current_user.id, Todo.id.in_(complete_ids), Todo.is_completed.is_(False))
+                .values(is_completed=True, completed_at=now, version=Todo.version + 1, change_seq=change_seq, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+
+        delete_ids = {o.id for o in ops if o.op == Op.delete and o.id in owned}
+        if delete_ids:
+            db.execute(
+                delete(Todo)
+                .where(Todo.user_id == current_user.id, Todo.id.in_(delete_ids))
+                .execution_options(synchronize_session=False)
+            )
+            db.execute(insert(TodoTombstone), [
+                {'todo_id': todo_id, 'user_id': current_user.id, 'change_seq': change_seq, 'deleted_at': now}
+                for todo_id in delete_ids
+            ])
+
+        touched = ({o.id for o in updates} | complete_ids) - delete_ids
+        current = {t.id: t for t in db.scalars(
+            select(Todo)
+            .where(Todo.user_id == current_user.id, Todo.id.in_(touched))
+            .execution_options(populate_existing=True)
+        )} if touched else {}
+
+        after = [(t.is_completed, t.priority) for t in (*created.values(), *current.values())]
+        counters.apply_delta(db, current_user.id, counters.counter_delta(
+            [before[todo_id] for todo_id in touched | delete_ids], after,
+        ))
+
+        new_ids = iter(created_ids)
+        results = []
+        for index, o in enumerate(ops):
+            if o.op == Op.create:
+                new_todo = created[next(new_ids)]
+                results.append(schemas.TodoBatchResult(
+                    index=index, op=o.op, id=new_todo.id, status=201,
+                    todo=schemas.TodoResponse.model_validate(new_todo),
+                ))
+            elif o.id not in owned:
+                results.append(schemas.TodoBatchResult(index=index, op=o.op, id=o.id, status=404))
+            elif o.op == Op.delete:
+                results.append(schemas.TodoBatchResult(index=index, op=o.op, id=o.id, status=204))
+            else:
+                todo = current.get(o.id)  # None when a later delete in the batch removed it
+                results.append(schemas.TodoBatchResult(
+                    index=index, op=o.op, id=o.id, status=200,
+                    todo=schemas.TodoResponse.model_validate(todo) if todo is not None else None,
+                ))
+
+        db.commit()
+        logging.info('Applied batch of %s operations for user: %s', len(ops), current_user.id)
+        return schemas.TodoBatchResponse(results=results)
+
+    except Exception as e:
+        db.rollback()
+        logging.error('Failed to apply todo batch for user %s: %s', current_user.id, e)
+        raise TodoBatchError(str(e))
+
+
+""" Streaming export """
+
+EXPORT_COLUMNS = ('id', 'description', 'due_date', 'priority', 'is_completed', 'created_at', 'completed_at')
+EXPORT_BATCH_SIZE = 1000
+
+
+def _export_stmt(user_id: UUID, model=Todo):
+    # Plain column tuples: no identity map, no ORM objects, constant memory per batch
+    return (
+        select(*(getattr(model, column) for column in EXPORT_COLUMNS))
+        .where(model.user_id == user_id)
+        .order_by(model.created_at, model.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Priority):
+        return value.value
+    return value
+
+
+def _encode_export_rows(rows, fmt: schemas.TodoFileFormat) -> bytes:
+    if fmt == schemas.TodoFileFormat.csv:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows([_export_value(v) for v in row] for row in rows)
+        return buffer.getvalue().encode()
+    if TODO_FAST_JSON:
+        return b''.join(_json_bytes(dict(zip(EXPORT_COLUMNS, map(_export_value, row)))) + b'\n' for row in rows)
+    return b''.join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, map(_export_value, row))), ensure_ascii=False, separators=(',', ':')).encode() + b'\n'
+        for row in rows
+    )
+
+
+def _export_header(fmt: schemas.TodoFileFormat) -> bytes:
+    return (','.join(EXPORT_COLUMNS) + '\r\n').encode() if fmt == schemas.TodoFileFormat.csv else b''
+
+
+def iter_todo_export(user_id: UUID, fmt: schemas.TodoFileFormat, include_archived: bool = False) -> Iterator[bytes]:
+    """Yield the user's todos as NDJSON or CSV, one chunk per server-side cursor batch."""
+    yield _export_header(fmt)
+    # The export owns its session: it outlives the request-scoped one while the body streams
+    db, replica = read_session(user_id)
+    exported = 0
+    with db, replica_set.watch(replica):
+        # Archived todos follow the others
+        for model in (Todo, ArchivedTodo) if include_archived else (Todo,):
+            result = db.execute(_export_stmt(user_id, model))
+            for rows in result.partitions():
+                exported += len(rows)
+                yield _encode_export_rows(rows, fmt)
+    logging.info('Exported %s todos for user: %s', exported, user_id)
+
+
+async def iter_todo_export_async(user_id: UUID, fmt: schemas.TodoFileFormat, include_archived: bool = False) -> AsyncIterator[bytes]:
+    yield _export_header(fmt)
+    db, replica = read_session(user_id)
+    exported = 0
+    async with db:
+        with replica_set.watch(replica):
+            for model in (Todo, ArchivedTodo) if include_archived else (Todo,):
+                result = await db.stream(_export_stmt(user_id, model))
+                async for rows in result.partitions():
+                    exported += len(rows)
+                    yield _encode_export_rows(rows, fmt)
+    logging.info('Exported %s todos for user: %s', exported, user_id)
+
+
+def export_todos(current_user: User, fmt: schemas.TodoFileFormat, include_archived: bool = False) -> Iterator[bytes] | AsyncIterator[bytes]:
+    if DATABASE_ASYNC:
+        return iter_todo_export_async(current_user.id, fmt, include_archived)
+    return iter_todo_export(current_user.id, fmt, include_archived)
+
+
+""" Async versions: same queries, awaited through run_sync on the configured session """
+
+async def create_todo_async(current_user: User, db: Session | AsyncSession, todo: schemas.TodoCreate) -> Todo:
+    return await run_sync(db, lambda session: create_todo(current_user, session, todo))
+
+
+async def get_todos_async(current_user: User, db: Session | AsyncSession, params: schemas.TodoListParams | None = None) -> schemas.TodoPage:
+    return await run_sync(db, lambda session: get_todos(current_user, session, params))
+
+
+async def get_todo_by_id_async(current_user: User, db: Session | AsyncSession, todo_id: UUID, include_archived: bool = False) -> Todo | ArchivedTodo:
+    return await run_sync(db, lambda session: get_todo_by_id(current_user, session, todo_id, include_archived))
+
+
+async def search_todos_async(current_user: User, db: Session | AsyncSession, q: str, cursor: str | None = None, limit: int = 20) -> schemas.TodoPage:
+    return await run_sync(db, lambda session: search_todos(current_user, session, q, cursor, limit))
+
+
+async def get_changes_async(current_user: User, db: Session | AsyncSession, since: str | None = None, limit: int = 500) -> schemas.TodoChanges:
+    return await run_sync(db, lambda session: get_changes(current_user, session, since, limit))
+
+
+async def get_todo_stats_async(current_user: User, db: Session | AsyncSession) -> schemas.TodoStats:
+    return await run_sync(db, lambda session: get_todo_stats(current_user, session))
+
+
+async def get_todos_if_changed_async(
+    current_user: User, db: Session | AsyncSession, params: schemas.TodoListParams | None, if_none_match: str | None, as_json: bool = False,
+) -> tuple[str, schemas.TodoPage | bytes | None]:
+    return await run_sync(db, lambda session: get_todos_if_changed(current_user, session, params, if_none_match, as_json))
+
+
+async def get_todo_if_changed_async(
+    current_user: User, db: Session | AsyncSession, todo_id: UUID, if_none_match: str | None, include_archived: bool = False,
+) -> tuple[str, Todo | ArchivedTodo | None]:
+    return await run_sync(db, lambda session: get_todo_if_changed(current_user, session, todo_id, if_none_match, include_archived))
+
+
+async def update_todo_async(current_user: User, db: Session | AsyncSession, todo_id: UUID, todo_update: schemas.TodoCreate) -> Todo:
+    return await run_sync(db, lambda session: update_todo(current_user, session, todo_id, todo_update))
+
+
+async def complete_todo_async(current_user: User, db: Session | AsyncSession, todo_id: UUID) -> Todo:
+    return await run_sync(db, lambda session: complete_todo(current_user, session, todo_id))
+
+
+async def delete_todo_async(current_user: User, db: Session | AsyncSession, todo_id: UUID) -> None:
+    await run_sync(db, lambda session: delete_todo(current_user, session, todo_id))
+
+
+async def apply_batch_async(current_user: User, db: Session | AsyncSession, batch: schemas.TodoBatchRequest) -> schemas.TodoBatchResponse:
+    return await run_sync(db, lambda session: apply_batch(current_user, session, batch))
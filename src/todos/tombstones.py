@@ -0,0 +1,121 @@
+"""
+Retention of delete tombstones (`todo_tombstones`).
+
+/todos/changes reports deletes from tombstones, one row per deleted todo, so left
+alone they only grow. Tombstones older than TODO_TOMBSTONE_RETENTION_DAYS are pruned
+in small batches. Each user's share is its own short transaction: raise the user's
+`pruned_change_seq` to the highest change sequence being removed (this takes the
+user row lock, like any todo write), delete their tombstones up to it, commit. A
+delta sync whose cursor is older than `pruned_change_seq` may have missed deletes,
+so it is answered 410 and the client syncs from scratch; clients that sync at least
+once per retention period never see that.
+
+Each app worker runs the pruner every TODO_TOMBSTONE_PRUNE_INTERVAL_SECONDS (0 turns
+that off, e.g. to run it from cron instead):
+
+    python -m src.todos.tombstones --older-than-days 30
+"""
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from uuid import UUID
+import argparse
+import asyncio
+import logging
+import os
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from src.database.core import SessionLocal
+from src.entities.todo_tombstone import TodoTombstone
+from src.entities.user import User
+
+
+TODO_TOMBSTONE_RETENTION_DAYS = int(os.getenv('TODO_TOMBSTONE_RETENTION_DAYS') or 30)
+TODO_TOMBSTONE_PRUNE_INTERVAL_SECONDS = float(os.getenv('TODO_TOMBSTONE_PRUNE_INTERVAL_SECONDS') or 3600)
+TODO_TOMBSTONE_PRUNE_BATCH_SIZE = int(os.getenv('TODO_TOMBSTONE_PRUNE_BATCH_SIZE') or 1000)
+
+# Totals for /metrics
+tombstone_stats = {'pruned': 0}
+
+
+def retention_cutoff(older_than_days: int = TODO_TOMBSTONE_RETENTION_DAYS) -> datetime:
+    # deleted_at holds naive UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=older_than_days)
+
+
+def prune_user_tombstones(db: Session, user_id: UUID, up_to_seq: int) -> int:
+    """Delete the user's tombstones up to `up_to_seq`; one transaction. Returns the number deleted."""
+    # Raised first and in the same transaction: a sync that still sees the tombstones
+    # also sees the old mark, and one that misses them sees the new one
+    db.execute(
+        update(User)
+        .where(User.id == user_id, User.pruned_change_seq < up_to_seq)
+        .values(pruned_change_seq=up_to_seq)
+    )
+    pruned = db.execute(
+        delete(TodoTombstone)
+        .where(TodoTombstone.user_id == user_id, TodoTombstone.change_seq <= up_to_seq)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    tombstone_stats['pruned'] += pruned
+    return pruned
+
+
+def prune_batch(db: Session, cutoff: datetime, batch_size: int = TODO_TOMBSTONE_PRUNE_BATCH_SIZE) -> tuple[int, int]:
+    """Prune up to about `batch_size` tombstones from before `cutoff`. Returns (candidates, pruned)."""
+    candidates = db.execute(
+        select(TodoTombstone.user_id, TodoTombstone.change_seq)
+        .where(TodoTombstone.deleted_at < cutoff)
+        .order_by(TodoTombstone.deleted_at)
+        .limit(batch_size)
+    ).all()
+    db.rollback()  # end the read transaction before taking any user lock
+
+    pruned = 0
+    for user_id, rows in groupby(sorted(candidates, key=lambda row: row.user_id), key=lambda row: row.user_id):
+        pruned += prune_user_tombstones(db, user_id, max(row.change_seq for row in rows))
+    return len(candidates), pruned
+
+
+def prune_tombstones(db: Session, older_than_days: int = TODO_TOMBSTONE_RETENTION_DAYS, batch_size: int = TODO_TOMBSTONE_PRUNE_BATCH_SIZE) -> int:
+    """Prune batches until no tombstone is past retention. Returns the number pruned."""
+    cutoff = retention_cutoff(older_than_days)
+    total = 0
+    while True:
+        candidates, pruned = prune_batch(db, cutoff, batch_size)
+        total += pruned
+        if candidates < batch_size:
+            if total:
+                logging.info('Pruned %s todo tombstones from before %s', total, cutoff)
+            return total
+
+
+def _prune_once() -> int:
+    with SessionLocal() as db:
+        return prune_tombstones(db)
+
+
+async def run_pruner(interval: float = TODO_TOMBSTONE_PRUNE_INTERVAL_SECONDS) -> None:
+    """Prune forever; the app runs this from its lifespan. Concurrent runs are safe."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(_prune_once)
+        except Exception as e:
+            logging.warning('Todo tombstone pruner run failed: %s', e)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Delete todo tombstones past their retention.')
+    parser.add_argument('--older-than-days', type=int, default=TODO_TOMBSTONE_RETENTION_DAYS)
+    parser.add_argument('--batch-size', type=int, default=TODO_TOMBSTONE_PRUNE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        pruned = prune_tombstones(db, args.older_than_days, args.batch_size)
+    print(f'Pruned {pruned} todo tombstones')
+
+
+if __name__ == "__main__":
+    main()
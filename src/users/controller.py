@@ -1,21 +1,23 @@
-from fastapi import APIRouter, status
-from ..database.core import DbSession
+from fastapi import APIRouter, Depends, status
+from ..database.core import RouteDbSession
 from . import schemas
 from . import service
 from ..auth.service import CurrentUser
+from ..auth.throttle import throttle_user
 
 
 router = APIRouter(
     prefix='/users',
-    tags=['Users']
+    tags=['Users'],
+    dependencies=[Depends(throttle_user)],
 )
 
 @router.get('/me', response_model=schemas.UserResponse)
-def get_current_user(current_user: CurrentUser):
+async def get_current_user(current_user: CurrentUser):
     return current_user
 
 
 @router.put('/change-password', status_code=status.HTTP_200_OK)
-def change_password(password_change: schemas.PasswordChange, current_user: CurrentUser, db=DbSession):
-    service.change_password(db, current_user.id, password_change)
+async def change_password(password_change: schemas.PasswordChange, current_user: CurrentUser, db: RouteDbSession):
+    await service.change_password_async(db, current_user.id, password_change)
 
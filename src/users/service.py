@@ -1,6 +1,8 @@
 from src.exceptions import UserNotFoundError, InvalidPasswordError, PasswordMismatchError
-from src.auth.service import verify_password, get_password_hash
+from src.auth.service import verify_password, get_password_hash, verify_password_async, get_password_hash_async, revoke_user_families
+from src.database.core import run_sync
 import logging
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from uuid import UUID
 from . import schemas
@@ -10,34 +12,67 @@ from src.entities.user import User
 def get_user_by_id(db: Session, user_id: UUID) -> schemas.UserResponse:
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
-        logging.warning(f'User not found with id: {user_id}')
+        logging.warning('User not found with id: %s', user_id)
         raise UserNotFoundError(user_id)
-    logging.info(f'Successfully retrieved user with ID: {user_id}')
+    logging.info('Successfully retrieved user with ID: %s', user_id)
     return user
 
 
+def _set_password_hash(db: Session, user: User, password_hash: str) -> None:
+    user.password_hash = password_hash
+    # A new password ends every session, so tokens issued under the old one stop
+    # working now rather than when they expire; commits the new hash with it
+    revoke_user_families(db, user.id)
+
+
 def change_password(db: Session, user_id: UUID, password_change: schemas.PasswordChange) -> None:
     try:
         user = db.query(User).filter(User.id == user_id).first()
         if not user:
-            logging.warning(f'User not found with id: {user_id}')
+            logging.warning('User not found with id: %s', user_id)
             raise UserNotFoundError(user_id)
 
         # verify current password
         if not verify_password(password_change.current_password, user.password_hash):
-            logging.warning(f'Invalid current password provided for user ID: {user_id}')
+            logging.warning('Invalid current password provided for user ID: %s', user_id)
             raise InvalidPasswordError()
         
         # verify new password match
         if password_change.new_password != password_change.new_password_confirm:
-            logging.warning(f'Password mismatch during change attempt')
+            logging.warning('Password mismatch during change attempt')
             raise PasswordMismatchError()
         
         # update password
-        user.password_hash = get_password_hash(password_change.new_password)
-        db.commit()
-        logging.info(f'Successfully changed password for user ID: {user_id}')
+        _set_password_hash(db, user, get_password_hash(password_change.new_password))
+        logging.info('Successfully changed password for user ID: %s', user_id)
+
+    except Exception as e:
+        logging.error('Error during password change. Error: %s', e)
+        raise
+
+
+""" Async versions: database work awaited through run_sync, bcrypt on the hashing pool """
+
+async def get_user_by_id_async(db: Session | AsyncSession, user_id: UUID) -> schemas.UserResponse:
+    return await run_sync(db, get_user_by_id, user_id)
+
+
+async def change_password_async(db: Session | AsyncSession, user_id: UUID, password_change: schemas.PasswordChange) -> None:
+    try:
+        user = await run_sync(db, get_user_by_id, user_id)
+
+        if not await verify_password_async(password_change.current_password, user.password_hash):
+            logging.warning('Invalid current password provided for user ID: %s', user_id)
+            raise InvalidPasswordError()
+
+        if password_change.new_password != password_change.new_password_confirm:
+            logging.warning('Password mismatch during change attempt')
+            raise PasswordMismatchError()
+
+        password_hash = await get_password_hash_async(password_change.new_password)
+        await run_sync(db, _set_password_hash, user, password_hash)
+        logging.info('Successfully changed password for user ID: %s', user_id)
 
     except Exception as e:
-        logging.error(f'Error during password change. Error: {e}')
-        raise
\ No newline at end of file
+        logging.error('Error during password change. Error: %s', e)
+        raise
@@ -0,0 +1,84 @@
+from uuid import uuid4
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from src.auth.throttle import user_throttle
+from src.database.core import Base, SessionLocal, engine
+from src.main import create_app, run_migrations
+from src.rate_limiter import limiter
+
+PASSWORD = 'password123'
+
+
+@pytest.fixture(scope='session')
+def app():
+    # The scripts next to tests/ may have run create_all: start from the migrated schema
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(text('DROP TABLE IF EXISTS alembic_version'))
+    run_migrations()
+    # Tests log in and write far faster than any client is allowed to
+    limiter.enabled = False
+    user_throttle.enabled = False
+    return create_app()
+
+
+@pytest.fixture(scope='session')
+def client(app):
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def db():
+    with SessionLocal() as session:
+        yield session
+
+
+def login(client: TestClient, email: str) -> dict:
+    response = client.post('/auth/token', data={'username': email, 'password': PASSWORD})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.fixture
+def register(client):
+    """POSTs a registration, for a unique email unless one is given; returns the response."""
+    def register(email: str | None = None):
+        return client.post('/auth/', json={
+            'email': email or f'user-{uuid4().hex[:12]}@example.com',
+            'password': PASSWORD,
+            'first_name': 'Test',
+            'last_name': 'User',
+        })
+    return register
+
+
+@pytest.fixture
+def make_user(client, register):
+    """Registers a new user: the registration response plus its `password`, and `tokens` and `headers` of a fresh login."""
+    def make() -> dict:
+        response = register()
+        assert response.status_code == 201, response.text
+        registered = response.json()
+        tokens = login(client, registered['email'])
+        return {
+            **registered, 'password': PASSWORD, 'tokens': tokens,
+            'headers': {'Authorization': f"Bearer {tokens['access_token']}"},
+        }
+    return make
+
+
+@pytest.fixture
+def user(make_user) -> dict:
+    return make_user()
+
+
+@pytest.fixture
+def create(client):
+    """Creates a todo for `user` through the API and returns it."""
+    def create(user: dict, description: str = 'todo', **fields) -> dict:
+        response = client.post('/todos/', json={'description': description, **fields}, headers=user['headers'])
+        assert response.status_code == 201, response.text
+        return response.json()
+    return create
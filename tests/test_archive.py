@@ -0,0 +1,55 @@
+from src.database.core import engine
+from src.database.locks import singleton
+from src.todos.archive import archive_completed
+
+
+def complete(client, user, todo):
+    assert client.put(f"/todos/{todo['id']}/complete", headers=user['headers']).status_code == 200
+
+
+def listed(client, user, **params) -> set[str]:
+    response = client.get('/todos/', params=params, headers=user['headers'])
+    assert response.status_code == 200, response.text
+    return {t['id'] for t in response.json()['items']}
+
+
+def test_archived_todos_leave_the_list_but_stay_readable(client, user, db, create):
+    old, kept = create(user, 'old'), create(user, 'kept')
+    complete(client, user, old)
+    cursor = client.get('/todos/changes', headers=user['headers']).json()['next_cursor']
+    etag = client.get('/todos/', headers=user['headers']).headers['ETag']
+
+    # A negative age puts the cutoff in the future, so todos completed just now qualify
+    assert archive_completed(db, older_than_days=-1) >= 1
+
+    assert listed(client, user) == {kept['id']}
+    assert listed(client, user, include_archived=True) == {old['id'], kept['id']}
+    assert client.get(f"/todos/{old['id']}", headers=user['headers']).status_code == 404
+    archived = client.get(f"/todos/{old['id']}", params={'include_archived': True}, headers=user['headers'])
+    assert archived.status_code == 200 and archived.json()['is_completed'] is True
+
+    stats = client.get('/todos/stats', headers=user['headers']).json()
+    assert (stats['open'], stats['completed']) == (1, 0)
+    # Clients holding the list or a sync cursor learn that it is gone
+    assert client.get('/todos/', headers={**user['headers'], 'If-None-Match': etag}).status_code == 200
+    delta = client.get('/todos/changes', params={'since': cursor}, headers=user['headers']).json()
+    assert (delta['upserted'], delta['deleted']) == ([], [old['id']])
+
+
+def test_only_old_completed_todos_are_archived(client, user, db, create):
+    open_todo, done = create(user, 'open'), create(user, 'done')
+    complete(client, user, done)
+
+    archive_completed(db, older_than_days=1)
+    assert listed(client, user) == {open_todo['id'], done['id']}
+    archive_completed(db, older_than_days=-1)
+    assert listed(client, user) == {open_todo['id']}
+
+
+def test_one_archiver_is_elected_at_a_time():
+    with singleton('todos.archive') as first, singleton('todos.archive') as second:
+        assert first
+        # PostgreSQL elects a single runner; elsewhere every caller runs
+        assert second is (engine.dialect.name != 'postgresql')
+    with singleton('todos.archive') as again:
+        assert again
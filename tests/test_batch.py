@@ -0,0 +1,52 @@
+from uuid import uuid4
+
+
+def test_batch_reports_the_status_of_each_operation(client, user, create):
+    kept, completed, deleted = (create(user, name) for name in ('kept', 'completed', 'deleted'))
+    missing = str(uuid4())
+
+    response = client.post('/todos/batch', headers=user['headers'], json={'operations': [
+        {'op': 'create', 'todo': {'description': 'new', 'priority': 4}},
+        {'op': 'update', 'id': kept['id'], 'todo': {'description': 'kept, renamed'}},
+        {'op': 'complete', 'id': completed['id']},
+        {'op': 'delete', 'id': deleted['id']},
+        {'op': 'update', 'id': missing, 'todo': {'description': 'nobody'}},
+        {'op': 'delete', 'id': missing},
+    ]})
+
+    assert response.status_code == 200, response.text
+    results = response.json()['results']
+    assert [(r['index'], r['op'], r['status']) for r in results] == [
+        (0, 'create', 201), (1, 'update', 200), (2, 'complete', 200),
+        (3, 'delete', 204), (4, 'update', 404), (5, 'delete', 404),
+    ]
+    assert results[0]['todo']['description'] == 'new'
+    assert results[1]['todo']['description'] == 'kept, renamed'
+    assert results[1]['todo']['version'] == 2
+    assert results[2]['todo']['is_completed'] is True
+    assert results[3]['todo'] is None
+
+    listed = {t['id']: t for t in client.get('/todos/', headers=user['headers']).json()['items']}
+    assert set(listed) == {results[0]['id'], kept['id'], completed['id']}
+    assert client.get('/todos/stats', headers=user['headers']).json()['open'] == 2
+
+
+def test_batch_does_not_touch_other_users_todos(client, user, make_user, create):
+    other = make_user()
+    theirs = create(other, 'theirs')
+
+    response = client.post('/todos/batch', headers=user['headers'], json={'operations': [
+        {'op': 'complete', 'id': theirs['id']},
+        {'op': 'delete', 'id': theirs['id']},
+    ]})
+
+    assert [r['status'] for r in response.json()['results']] == [404, 404]
+    unchanged = client.get(f"/todos/{theirs['id']}", headers=other['headers']).json()
+    assert unchanged['is_completed'] is False
+
+
+def test_batch_rejects_malformed_operations(client, user):
+    response = client.post('/todos/batch', headers=user['headers'], json={'operations': [
+        {'op': 'create', 'id': str(uuid4()), 'todo': {'description': 'x'}},
+    ]})
+    assert response.status_code == 422
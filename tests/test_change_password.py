@@ -0,0 +1,38 @@
+from src.auth.cache import principal_cache
+
+
+def me(client, access_token):
+    return client.get('/users/me', headers={'Authorization': f'Bearer {access_token}'})
+
+
+def change_password(client, user, current, new, confirm=None):
+    return client.put('/users/change-password', headers=user['headers'], json={
+        'current_password': current, 'new_password': new, 'new_password_confirm': confirm or new,
+    })
+
+
+def test_changing_the_password_rejects_cached_tokens_at_once(client, user, make_user):
+    other = make_user()
+    token = user['tokens']['access_token']
+    for access_token in (token, other['tokens']['access_token']):
+        assert me(client, access_token).status_code == 200
+    assert principal_cache.get(token) is not None     # cached for AUTH_CACHE_TTL_SECONDS
+
+    assert change_password(client, user, user['password'], 'a new password').status_code == 200
+
+    assert principal_cache.get(token) is None
+    assert me(client, token).status_code == 401
+    assert client.post('/auth/refresh', json={'refresh_token': user['tokens']['refresh_token']}).status_code == 401
+    # Only the new password logs in, and only this user's sessions ended
+    for password, status_code in ((user['password'], 401), ('a new password', 200)):
+        login = client.post('/auth/token', data={'username': user['email'], 'password': password})
+        assert login.status_code == status_code
+    assert me(client, login.json()['access_token']).status_code == 200
+    assert me(client, other['tokens']['access_token']).status_code == 200
+
+
+def test_a_refused_change_keeps_the_session(client, user):
+    token = user['tokens']['access_token']
+    assert change_password(client, user, 'not the password', 'a new password').status_code == 401
+    assert change_password(client, user, user['password'], 'a new password', 'a typo').status_code == 400
+    assert me(client, token).status_code == 200
@@ -0,0 +1,85 @@
+from src.todos.tombstones import prune_tombstones
+
+
+def changes(client, user, since=None, limit=None, expect=200):
+    params = {**({'since': since} if since else {}), **({'limit': limit} if limit else {})}
+    response = client.get('/todos/changes', params=params, headers=user['headers'])
+    assert response.status_code == expect, response.text
+    return response.json()
+
+
+def test_full_sync_then_deltas(client, user, create):
+    kept, gone = create(user, 'kept'), create(user, 'gone')
+    full = changes(client, user)
+    assert {t['id'] for t in full['upserted']} == {kept['id'], gone['id']}
+    assert full['deleted'] == [] and full['has_more'] is False
+
+    client.put(f"/todos/{kept['id']}", json={'description': 'edited'}, headers=user['headers'])
+    client.delete(f"/todos/{gone['id']}", headers=user['headers'])
+    added = create(user, 'added')
+
+    delta = changes(client, user, full['next_cursor'])
+    assert [t['description'] for t in delta['upserted']] == ['edited', 'added']
+    assert delta['deleted'] == [gone['id']]
+
+    # Nothing new: same cursor back, nothing repeated
+    again = changes(client, user, delta['next_cursor'])
+    assert (again['upserted'], again['deleted'], again['next_cursor']) == ([], [], delta['next_cursor'])
+    assert added['id'] in {t['id'] for t in delta['upserted']}
+
+
+def test_deltas_page_through_upserts_and_deletes_in_order(client, user, create):
+    cursor = changes(client, user)['next_cursor']
+    todos = [create(user, str(n)) for n in range(3)]
+    for todo in todos[:2]:
+        client.delete(f"/todos/{todo['id']}", headers=user['headers'])
+
+    seen, deleted = [], []
+    while True:
+        page = changes(client, user, cursor, limit=2)
+        seen += [t['description'] for t in page['upserted']]
+        deleted += page['deleted']
+        cursor = page['next_cursor']
+        if not page['has_more']:
+            break
+    # Created todos deleted again before the sync show up as deletes only
+    assert seen == ['2']
+    assert deleted == [todos[0]['id'], todos[1]['id']]
+
+
+def test_paged_full_sync_skips_earlier_deletes(client, user, create):
+    gone = create(user, 'gone')
+    client.delete(f"/todos/{gone['id']}", headers=user['headers'])
+    for n in range(3):
+        create(user, str(n))
+
+    page = changes(client, user, limit=2)
+    upserted = [t['description'] for t in page['upserted']]
+    while page['has_more']:
+        page = changes(client, user, page['next_cursor'], limit=2)
+        upserted += [t['description'] for t in page['upserted']]
+        assert page['deleted'] == []
+    assert upserted == ['0', '1', '2']
+
+
+def test_cursor_older_than_pruned_tombstones_gets_410(client, user, db, create):
+    todos = [create(user, str(n)) for n in range(3)]
+    old_cursor = changes(client, user)['next_cursor']
+    client.delete(f"/todos/{todos[0]['id']}", headers=user['headers'])
+    current_cursor = changes(client, user, old_cursor)['next_cursor']
+
+    assert prune_tombstones(db, older_than_days=-1) >= 1
+
+    gone = changes(client, user, old_cursor, expect=410)
+    assert 'sync again' in gone['detail']
+    # A cursor that already saw the pruned deletes keeps working
+    client.delete(f"/todos/{todos[1]['id']}", headers=user['headers'])
+    assert changes(client, user, current_cursor)['deleted'] == [todos[1]['id']]
+    # And so does a new full sync, paged or not
+    page = changes(client, user, limit=1)
+    while page['has_more']:
+        page = changes(client, user, page['next_cursor'], limit=1)
+
+
+def test_malformed_cursor_gets_400(client, user):
+    changes(client, user, 'not-a-cursor', expect=400)
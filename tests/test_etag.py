@@ -0,0 +1,72 @@
+def get(client, user, url, etag=None):
+    headers = {**user['headers'], **({'If-None-Match': etag} if etag else {})}
+    return client.get(url, headers=headers)
+
+
+def test_list_answers_304_until_a_write_changes_it(client, user, create):
+    todo = create(user)
+    first = get(client, user, '/todos/')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag.startswith('W/"')
+
+    unchanged = get(client, user, '/todos/', etag)
+    assert unchanged.status_code == 304
+    assert unchanged.content == b''
+    assert unchanged.headers['ETag'] == etag
+
+    for write in (
+        lambda: client.put(f"/todos/{todo['id']}", json={'description': 'renamed'}, headers=user['headers']),
+        lambda: client.put(f"/todos/{todo['id']}/complete", headers=user['headers']),
+        lambda: create(user, 'another'),
+        lambda: client.delete(f"/todos/{todo['id']}", headers=user['headers']),
+    ):
+        write()
+        changed = get(client, user, '/todos/', etag)
+        assert changed.status_code == 200
+        assert changed.headers['ETag'] != etag
+        etag = changed.headers['ETag']
+
+
+def test_list_etag_matches_weakly_and_in_lists(client, user, create):
+    create(user)
+    etag = get(client, user, '/todos/').headers['ETag']
+    strong = etag.removeprefix('W/')
+
+    assert get(client, user, '/todos/', strong).status_code == 304
+    assert get(client, user, '/todos/', f'"stale", {etag}').status_code == 304
+    assert get(client, user, '/todos/', '*').status_code == 304
+    assert get(client, user, '/todos/', '"stale"').status_code == 200
+
+
+def test_other_users_writes_do_not_change_the_list_etag(client, user, make_user, create):
+    create(user)
+    etag = get(client, user, '/todos/').headers['ETag']
+    create(make_user())
+    assert get(client, user, '/todos/', etag).status_code == 304
+
+
+def test_single_todo_answers_304_until_it_changes(client, user, create):
+    todo, other = create(user, 'watched'), create(user, 'other')
+    url = f"/todos/{todo['id']}"
+    etag = get(client, user, url).headers['ETag']
+    assert get(client, user, url, etag).status_code == 304
+
+    # The row has its own version: writes to other todos leave its tag alone
+    client.put(f"/todos/{other['id']}/complete", headers=user['headers'])
+    assert get(client, user, url, etag).status_code == 304
+
+    client.put(url, json={'description': 'renamed'}, headers=user['headers'])
+    changed = get(client, user, url, etag)
+    assert changed.status_code == 200
+    assert changed.json()['description'] == 'renamed'
+    assert changed.headers['ETag'] != etag
+
+
+def test_writes_that_change_nothing_keep_the_list_etag(client, user, create):
+    todo = create(user)
+    client.put(f"/todos/{todo['id']}/complete", headers=user['headers'])
+    etag = get(client, user, '/todos/').headers['ETag']
+
+    assert client.put(f"/todos/{todo['id']}/complete", headers=user['headers']).status_code == 200
+    assert client.delete('/todos/00000000-0000-0000-0000-000000000000', headers=user['headers']).status_code == 404
+    assert get(client, user, '/todos/', etag).status_code == 304
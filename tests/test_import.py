@@ -0,0 +1,83 @@
+from datetime import datetime
+from uuid import UUID
+from sqlalchemy import select
+from src.entities.todo import Todo
+from src.todos import importer, schemas
+
+# Loaded with COPY on PostgreSQL (TEST_DATABASE_URL), with a multi-row INSERT elsewhere
+
+
+def upload(client, user, name: str, content: str):
+    response = client.post('/todos/import', headers=user['headers'], files={'file': (name, content.encode())})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_csv_import_loads_valid_rows_and_reports_the_rest(client, user):
+    report = upload(client, user, 'todos.csv', (
+        'description,priority,due_date\n'
+        'first,High,2030-01-01T09:00:00\n'
+        'second,2,\n'
+        ',1,\n'                     # line 4: no description
+        'fourth,Urgent,\n'          # line 5: unknown priority
+        'fifth,,\n'
+    ))
+
+    assert (report['imported'], report['failed']) == (3, 2)
+    assert [error['line'] for error in report['errors']] == [4, 5]
+    todos = {t['description']: t for t in client.get('/todos/', headers=user['headers']).json()['items']}
+    assert set(todos) == {'first', 'second', 'fifth'}
+    assert todos['first']['priority'] == 3 and todos['first']['due_date'].startswith('2030-01-01T09:00:00')
+    assert todos['fifth']['priority'] == 2  # the default
+    assert client.get('/todos/stats', headers=user['headers']).json()['open'] == 3
+
+
+def test_ndjson_import_reports_unparseable_lines(client, user):
+    report = upload(client, user, 'todos.ndjson', (
+        '{"description": "one"}\n'
+        '{"description": \n'
+        '\n'
+        '["not", "an", "object"]\n'
+        '{"description": "two", "priority": "Top"}\n'
+    ))
+
+    assert (report['imported'], report['failed']) == (2, 2)
+    assert [error['line'] for error in report['errors']] == [2, 4]
+
+
+def test_due_dates_with_an_offset_are_stored_as_utc(client, user, db):
+    report = upload(client, user, 'todos.ndjson', (
+        '{"description": "east", "due_date": "2030-01-01T09:00:00+02:00"}\n'
+        '{"description": "west", "due_date": "2030-01-01T09:00:00-05:00"}\n'
+        '{"description": "utc", "due_date": "2030-01-01T09:00:00Z"}\n'
+    ))
+
+    assert report['imported'] == 3
+    stored = dict(db.execute(select(Todo.description, Todo.due_date).where(Todo.user_id == UUID(user['id']))).all())
+    assert stored == {
+        'east': datetime(2030, 1, 1, 7),
+        'west': datetime(2030, 1, 1, 14),
+        'utc': datetime(2030, 1, 1, 9),
+    }
+
+
+def test_a_rejected_chunk_does_not_undo_the_others(client, user, monkeypatch):
+    load_chunk = importer._load_chunk
+    calls = []
+
+    def fail_second_chunk(db, user_id, rows):
+        calls.append(len(rows))
+        if len(calls) == 2:
+            raise RuntimeError('rejected')
+        load_chunk(db, user_id, rows)
+
+    monkeypatch.setattr(importer, '_load_chunk', fail_second_chunk)
+    lines = [f'{{"description": "row {n}"}}\n' for n in range(5)]
+    report = importer.import_todos(UUID(user['id']), lines, schemas.TodoFileFormat.ndjson, chunk_size=2)
+
+    assert calls == [2, 2, 1]
+    assert (report.imported, report.failed) == (3, 2)
+    assert [error.line for error in report.errors] == [3, 4]
+    listed = client.get('/todos/', headers=user['headers']).json()['items']
+    assert sorted(t['description'] for t in listed) == ['row 0', 'row 1', 'row 4']
+    assert client.get('/todos/stats', headers=user['headers']).json()['open'] == 3
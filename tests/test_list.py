@@ -0,0 +1,62 @@
+def walk(client, user, limit, **params) -> list[str]:
+    """Descriptions of every todo the list returns, following next_cursor to the end."""
+    seen, cursor = [], None
+    while True:
+        response = client.get('/todos/', params={**params, 'limit': limit, **({'cursor': cursor} if cursor else {})}, headers=user['headers'])
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert len(page['items']) <= limit
+        seen += [t['description'] for t in page['items']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            return seen
+
+
+def test_created_at_pages_newest_first(client, user, create):
+    names = [str(n) for n in range(7)]
+    for name in names:
+        create(user, name)
+
+    for limit in (1, 3, 7, 50):
+        assert walk(client, user, limit) == names[::-1]
+
+
+def test_due_date_pages_soonest_first_with_undated_last(client, user, create):
+    for day in (4, 1, 3, 2):
+        create(user, f'day {day}', due_date=f'2030-01-0{day}T12:00:00Z')
+    undated = [create(user, f'undated {n}')['id'] for n in range(3)]
+    # Undated todos follow in id order
+    undated_order = [f'undated {undated.index(todo_id)}' for todo_id in sorted(undated)]
+    expected = ['day 1', 'day 2', 'day 3', 'day 4', *undated_order]
+
+    # limit 2 ends a page on the last dated todo, limit 3 has a page straddling both kinds
+    for limit in (1, 2, 3, 4, 50):
+        assert walk(client, user, limit, sort='due_date') == expected
+
+
+def test_filters(client, user, create):
+    create(user, 'low', priority=1, due_date='2030-01-01T00:00:00Z')
+    create(user, 'high', priority=3, due_date='2030-02-01T00:00:00Z')
+    done = create(user, 'done', priority=3, due_date='2030-03-01T00:00:00Z')
+    create(user, 'undated', priority=3)
+    client.put(f"/todos/{done['id']}/complete", headers=user['headers'])
+
+    assert walk(client, user, 2, is_completed=True) == ['done']
+    assert walk(client, user, 2, sort='due_date', is_completed=False) == ['low', 'high', 'undated']
+    assert walk(client, user, 2, sort='due_date', priority=3) == ['high', 'done', 'undated']
+    assert client.get('/todos/', params={'priority': 5}, headers=user['headers']).status_code == 422
+    # A due date range leaves out undated todos; due_after is inclusive, due_before is not
+    assert walk(client, user, 1, sort='due_date', due_after='2030-02-01T00:00:00Z') == ['high', 'done']
+    assert walk(client, user, 1, sort='due_date', due_before='2030-02-01T00:00:00Z') == ['low']
+    assert walk(client, user, 1, due_after='2030-01-15T00:00:00Z', due_before='2030-03-01T00:00:00Z', priority=3) == ['high']
+
+
+def test_malformed_cursors_get_400(client, user, create):
+    for _ in range(2):
+        create(user, due_date='2030-01-01T00:00:00Z')
+    cursor = client.get('/todos/', params={'limit': 1}, headers=user['headers']).json()['next_cursor']
+
+    for params in ({'cursor': 'not-a-cursor'}, {'cursor': cursor[:-4]}, {'cursor': cursor, 'sort': 'due_date'}):
+        response = client.get('/todos/', params=params, headers=user['headers'])
+        assert response.status_code == 400, params
+        assert response.json()['detail'] == 'Invalid pagination cursor.'
@@ -0,0 +1,74 @@
+import logging
+import queue
+import sys
+import pytest
+from src.logger_config import InfoSamplingFilter, LogLevels, NonBlockingQueueHandler, configure_logging, logging_stats
+
+
+def record(level: int, lineno: int = 1, **fields) -> logging.LogRecord:
+    return logging.makeLogRecord({
+        'levelno': level, 'levelname': logging.getLevelName(level), 'pathname': 'site.py', 'lineno': lineno,
+        'msg': 'message %s', 'args': ('argument',), **fields,
+    })
+
+
+def kept(sampler: InfoSamplingFilter, level: int, count: int, lineno: int = 1) -> int:
+    return sum(sampler.filter(record(level, lineno)) for _ in range(count))
+
+
+def test_sampling_thins_info_and_debug_per_call_site():
+    sampler = InfoSamplingFilter(0.25)
+    assert kept(sampler, logging.INFO, 100) == 25
+    assert kept(sampler, logging.DEBUG, 8, lineno=2) == 2
+    # A call site of its own is sampled from its own first record on
+    assert sampler.filter(record(logging.INFO, lineno=3))
+    assert sampler.dropped == 75 + 6
+
+
+def test_sampling_keeps_every_warning_and_above():
+    for rate in (0.25, 0):
+        sampler = InfoSamplingFilter(rate)
+        for level in (logging.WARNING, logging.ERROR, logging.CRITICAL):
+            assert kept(sampler, level, 20) == 20
+        assert sampler.dropped == 0
+    # A rate of 0 drops all INFO and DEBUG
+    assert kept(sampler, logging.INFO, 5) == kept(sampler, logging.DEBUG, 5) == 0
+
+
+def test_a_full_queue_drops_records_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(2))
+    for _ in range(5):
+        handler.handle(record(logging.ERROR))
+    assert (handler.queue.qsize(), handler.dropped) == (2, 3)
+
+
+def test_queued_records_are_formatted_by_the_writer():
+    handler = NonBlockingQueueHandler(queue.Queue())
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        handler.handle(record(logging.ERROR, exc_info=sys.exc_info()))
+
+    queued = handler.queue.get_nowait()
+    # The message is left to the writer thread; the traceback is rendered now, so no frames are pinned
+    assert (queued.msg, queued.args) == ('message %s', ('argument',))
+    assert queued.exc_info is None and 'ValueError: boom' in queued.exc_text
+
+
+@pytest.fixture
+def sampled_logging():
+    configure_logging(LogLevels.INFO, use_queue=True, info_sample_rate=0.5)
+    yield
+    configure_logging(LogLevels.INFO)
+
+
+def test_configured_pipeline_samples_before_the_queue(sampled_logging):
+    before = logging_stats()
+    logger = logging.getLogger('sampled')
+    for _ in range(10):
+        logger.info('hot path')
+    for _ in range(3):
+        logger.warning('always kept')
+    stats = logging_stats()
+    assert stats['sampled_out'] - before['sampled_out'] == 5
+    assert stats['queue_dropped'] == before['queue_dropped']
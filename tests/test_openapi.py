@@ -0,0 +1,11 @@
+import json
+
+
+def test_openapi_document_is_built_at_startup(app, client):
+    # The client fixture has run the lifespan startup
+    document = app.state.openapi_document
+    assert json.loads(document)['components']['securitySchemes']['Bearer']
+
+    response = client.get('/openapi.json')
+    assert response.status_code == 200
+    assert response.content == document
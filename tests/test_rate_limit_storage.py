@@ -0,0 +1,132 @@
+import multiprocessing
+import os
+from types import SimpleNamespace
+import pytest
+from limits import RateLimitItemPerHour
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter, SlidingWindowCounterRateLimiter
+from src import rate_limit_storage
+from src.rate_limit_storage import SharedMemoryStorage
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit_storage, 'time', SimpleNamespace(time=clock.time))
+    return clock
+
+
+@pytest.fixture
+def table(tmp_path):
+    return lambda slots=64: SharedMemoryStorage(f'shm://{tmp_path}/limits?slots={slots}')
+
+
+def test_counters_expire_and_clear(clock, table):
+    storage = table()
+    assert storage.incr('a', expiry=10) == 1
+    assert storage.incr('a', expiry=10, amount=2) == 3
+    assert (storage.get('a'), storage.get_expiry('a')) == (3, 1010.0)
+    assert storage.get('b') == 0
+
+    clock.now += 10
+    assert storage.get('a') == 0
+    assert storage.incr('a', expiry=10) == 1
+
+    storage.clear('a')
+    assert storage.get('a') == 0
+    storage.incr('b', expiry=10)
+    storage.incr('c', expiry=10)
+    assert storage.reset() == 2
+    assert storage.get('b') == storage.get('c') == 0
+
+
+def test_colliding_keys_share_the_table_until_it_is_full(clock, table):
+    storage = table(slots=8)
+    keys = [f'key {n}' for n in range(8)]
+    # Eight keys in eight slots: some start at the same slot and probe onwards
+    assert len({storage._hash(key) % storage.slots for key in keys}) < 8
+    for n, key in enumerate(keys):
+        storage.incr(key, expiry=100 + n, amount=n + 1)
+    assert [storage.get(key) for key in keys] == list(range(1, 9))
+
+    # A full table evicts the counter closest to expiry, and only that one
+    storage.incr('newcomer', expiry=100)
+    assert storage.get('newcomer') == 1
+    assert storage.get('key 0') == 0
+    assert [storage.get(key) for key in keys[1:]] == list(range(2, 9))
+    # Expired slots are taken before any live one
+    clock.now += 101.5
+    storage.incr('late', expiry=100)
+    assert [storage.get(key) for key in ('late', 'key 2', 'key 7')] == [1, 3, 8]
+
+
+def test_reopening_adopts_the_existing_table_size(tmp_path):
+    SharedMemoryStorage(f'shm://{tmp_path}/limits?slots=16').incr('a', expiry=60)
+    reopened = SharedMemoryStorage(f'shm://{tmp_path}/limits?slots=1024')
+    assert reopened.slots == 16
+    assert reopened.get('a') == 1
+
+
+def test_sliding_window_weights_the_previous_window(clock, table):
+    storage = table()
+    limiter = SlidingWindowCounterRateLimiter(storage)
+    item = RateLimitItemPerHour(5)
+    clock.now = 3600.0 * 100
+
+    assert [limiter.hit(item, 'client') for _ in range(6)] == [True] * 5 + [False]
+    assert limiter.hit(item, 'someone else')
+
+    # Half way through the next window half of the previous one still counts: 2.5, rounded down
+    clock.now += 3600 * 1.5
+    assert [limiter.hit(item, 'client') for _ in range(4)] == [True, True, True, False]
+    # Once no hits are left in the previous window, the full limit is back
+    clock.now += 3600 * 2
+    assert sum(limiter.hit(item, 'client') for _ in range(10)) == 5
+
+    storage.clear_sliding_window('LIMITER/client/5/1/hour', 3600)
+    assert limiter.get_window_stats(item, 'client').remaining == 5
+
+
+def _hit_many(worker: int, storage: SharedMemoryStorage, uri: str, attempts: int, results) -> None:
+    inherited_fd = storage._fd
+    # Half the processes use the table they inherited, half open it by URI
+    if worker % 2:
+        storage = storage_from_string(uri)
+    sliding = SlidingWindowCounterRateLimiter(storage)
+    fixed = FixedWindowRateLimiter(storage)
+    allowed = [0, 0]
+    for _ in range(attempts):
+        allowed[0] += sliding.hit(RateLimitItemPerHour(50), 'shared')
+        allowed[1] += fixed.hit(RateLimitItemPerHour(50), 'shared')
+    results.put((*allowed, storage._pid == os.getpid() and storage._fd != inherited_fd))
+
+
+def test_processes_sharing_the_file_stay_within_the_limit(tmp_path):
+    try:
+        context = multiprocessing.get_context('fork')
+    except ValueError:
+        pytest.skip('needs fork')
+    uri = f'shm://{tmp_path}/limits?slots=256'
+    storage = storage_from_string(uri)
+    storage.incr('warm', expiry=60)     # the parent has the file open and mapped before forking
+    results = context.Queue()
+    workers = [context.Process(target=_hit_many, args=(worker, storage, uri, 30, results)) for worker in range(6)]
+    for worker in workers:
+        worker.start()
+    outcomes = [results.get(timeout=60) for _ in workers]
+    for worker in workers:
+        worker.join(timeout=60)
+
+    # 180 attempts per strategy against a limit of 50
+    assert sum(sliding for sliding, _, _ in outcomes) == 50
+    assert sum(fixed for _, fixed, _ in outcomes) == 50
+    # Each process used a descriptor of its own, not the parent's
+    assert all(reopened for _, _, reopened in outcomes)
@@ -0,0 +1,70 @@
+from uuid import uuid4
+from src.auth.refresh_tokens import RevocationFilter
+
+
+def refresh(client, refresh_token):
+    return client.post('/auth/refresh', json={'refresh_token': refresh_token})
+
+
+def can_read(client, access_token) -> bool:
+    response = client.get('/todos/', headers={'Authorization': f'Bearer {access_token}'})
+    assert response.status_code in (200, 401), response.text
+    return response.status_code == 200
+
+
+def test_refresh_rotates_the_pair(client, user):
+    old = user['tokens']
+    response = refresh(client, old['refresh_token'])
+    assert response.status_code == 200, response.text
+    new = response.json()
+
+    assert new['refresh_token'] != old['refresh_token']
+    assert can_read(client, new['access_token'])
+    # The rotated token keeps working for the next renewal
+    assert refresh(client, new['refresh_token']).status_code == 200
+
+
+def test_reusing_a_rotated_token_revokes_the_family(client, user, make_user):
+    stolen = user['tokens']
+    current = refresh(client, stolen['refresh_token']).json()
+
+    assert refresh(client, stolen['refresh_token']).status_code == 401
+    # Everything issued to the family stops working, refresh and access tokens alike
+    assert refresh(client, current['refresh_token']).status_code == 401
+    assert not can_read(client, current['access_token'])
+    assert not can_read(client, stolen['access_token'])
+    # Other sessions, of the same user or anyone else, are not affected
+    again = client.post('/auth/token', data={'username': user['email'], 'password': user['password']}).json()
+    assert can_read(client, again['access_token'])
+    assert can_read(client, make_user()['tokens']['access_token'])
+
+
+def test_logout_revokes_the_session(client, user):
+    tokens = user['tokens']
+    assert client.post('/auth/logout', json={'refresh_token': tokens['refresh_token']}).status_code == 204
+    assert not can_read(client, tokens['access_token'])
+    assert refresh(client, tokens['refresh_token']).status_code == 401
+
+
+def test_forged_refresh_tokens_are_rejected(client, user):
+    token_id, _, signature = user['tokens']['refresh_token'].partition('.')
+    tampered = ('B' if signature[0] == 'A' else 'A') + signature[1:]
+    for forged in (f'{uuid4().hex}.{signature}', f'{token_id}.{tampered}', 'garbage'):
+        assert refresh(client, forged).status_code == 401
+
+
+def test_revocations_during_a_reload_survive_it():
+    revoked = RevocationFilter(bits=1 << 12)
+    before, during = uuid4(), uuid4()
+    revoked.add(before)
+
+    revoked.begin_reload()
+    snapshot = [before]       # read from the database before `during` was committed
+    revoked.add(during)
+    revoked.replace(snapshot)
+
+    assert revoked.might_contain(before) and revoked.might_contain(during)
+    # Once the reload is over, families that aged out of the snapshot are dropped
+    revoked.begin_reload()
+    revoked.replace([during])
+    assert not revoked.might_contain(before)
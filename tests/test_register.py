@@ -0,0 +1,32 @@
+import logging
+from uuid import uuid4
+from sqlalchemy import func, select
+from src.entities.user import User
+
+
+def users_named(db, email) -> int:
+    return db.scalar(select(func.count()).select_from(User).where(func.lower(User.email) == email.lower()))
+
+
+def test_taken_emails_are_rejected_without_an_integrity_error(register, db, caplog):
+    email = f'dup-{uuid4().hex[:12]}@example.com'
+    assert register(email).status_code == 201
+
+    with caplog.at_level(logging.WARNING):
+        for taken in (email, email.upper().replace('@EXAMPLE.COM', '@example.com')):
+            response = register(taken)
+            assert response.status_code == 400
+            assert response.json()['detail'] == 'Email already registered'
+    # ON CONFLICT DO NOTHING turned the duplicates away: no failed INSERT was logged
+    assert not [r for r in caplog.records if 'IntegrityError' in r.getMessage()]
+    assert users_named(db, email) == 1
+
+
+def test_login_ignores_the_case_of_the_email(client, register):
+    email = f'Mixed-{uuid4().hex[:12]}@example.com'
+    assert register(email).status_code == 201
+
+    for spelling in (email, email.lower(), email.upper().replace('@EXAMPLE.COM', '@example.com')):
+        response = client.post('/auth/token', data={'username': spelling, 'password': 'password123'})
+        assert response.status_code == 200, response.text
+    assert client.post('/auth/token', data={'username': email.lower(), 'password': 'wrong-password'}).status_code == 401
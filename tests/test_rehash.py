@@ -0,0 +1,46 @@
+import hashlib
+from uuid import UUID
+from sqlalchemy import select, update
+from src.auth.hashing import bcrypt_rounds, password_context
+from src.entities.user import User
+
+
+def stored_hash(db, user) -> str:
+    db.expire_all()
+    return db.scalar(select(User.password_hash).where(User.id == UUID(user['id'])))
+
+
+def seed_hash(db, user, password_hash: str) -> None:
+    db.execute(update(User).where(User.id == UUID(user['id'])).values(password_hash=password_hash))
+    db.commit()
+
+
+def login(client, user, password):
+    response = client.post('/auth/token', data={'username': user['email'], 'password': password})
+    assert response.status_code == 200, response.text
+
+
+def test_login_rehashes_a_hash_with_another_cost(client, user, db):
+    other_cost = bcrypt_rounds() + 1
+    seed_hash(db, user, password_context(other_cost).handler('bcrypt').hash(user['password']))
+
+    login(client, user, user['password'])
+    rehashed = stored_hash(db, user)
+    assert password_context().identify(rehashed) == 'bcrypt'
+    assert password_context().handler('bcrypt').from_string(rehashed).rounds == bcrypt_rounds()
+    # The rewritten hash still logs in, and is left alone from then on
+    login(client, user, user['password'])
+    assert stored_hash(db, user) == rehashed
+
+
+def test_login_moves_legacy_long_passwords_to_bcrypt_sha256(client, user, db):
+    password = 'long password ' * 8     # past bcrypt's 72 bytes
+    # How they used to be stored: a plain bcrypt hash of the SHA-256 hex digest
+    legacy = password_context().handler('bcrypt').using(rounds=bcrypt_rounds()).hash(hashlib.sha256(password.encode()).hexdigest())
+    seed_hash(db, user, legacy)
+
+    login(client, user, password)
+    rehashed = stored_hash(db, user)
+    assert password_context().identify(rehashed) == 'bcrypt_sha256'
+    login(client, user, password)
+    assert stored_hash(db, user) == rehashed
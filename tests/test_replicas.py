@@ -0,0 +1,71 @@
+import sqlite3
+import pytest
+from limits.storage import storage_from_string
+from src.database import replicas
+from src.database.core import DATABASE_ASYNC, _to_async_url, engine
+
+
+@pytest.fixture
+def use_replica(monkeypatch):
+    """Routes reads to the SQLite database at the given path, with a fresh read-your-writes window."""
+    if engine.dialect.name != 'sqlite':
+        pytest.skip('replicas are SQLite copies of the primary')
+    monkeypatch.setattr(replicas.read_your_writes, 'window', 60)
+    monkeypatch.setattr(replicas.read_your_writes, '_storage', storage_from_string('memory://'))
+
+    def use(path: str) -> replicas.Replica:
+        url = f'sqlite:///{path}'
+        replica = replicas.Replica(_to_async_url(url) if DATABASE_ASYNC else url, is_async=DATABASE_ASYNC)
+        monkeypatch.setattr(replicas.replica_set, 'replicas', [replica])
+        return replica
+    yield use
+    for replica in replicas.replica_set.replicas:
+        replica.sync_engine.dispose()
+
+
+def snapshot(path) -> None:
+    """Copy the primary to `path`: a replica that lags from here on."""
+    with sqlite3.connect(engine.url.database) as primary, sqlite3.connect(path) as copy:
+        primary.backup(copy)
+
+
+def descriptions(client, user) -> list[str]:
+    response = client.get('/todos/', headers=user['headers'])
+    assert response.status_code == 200, response.text
+    return sorted(t['description'] for t in response.json()['items'])
+
+
+def test_reads_go_to_the_replica_except_right_after_a_write(client, user, make_user, create, use_replica, tmp_path):
+    reader = make_user()
+    create(user, 'replicated')
+    create(reader, 'theirs')
+    replicas.read_your_writes._storage.reset()
+    snapshot(tmp_path / 'replica.db')
+    replica = use_replica(tmp_path / 'replica.db')
+
+    # A user who has not written since reads the replica
+    assert descriptions(client, reader) == ['theirs']
+    assert replica.reads == 1
+
+    # Right after a write the writer reads the primary, and sees it
+    create(user, 'not replicated yet')
+    assert descriptions(client, user) == ['not replicated yet', 'replicated']
+    assert replica.reads == 1
+    # Once the window is over, the lagging replica again
+    replicas.read_your_writes._storage.reset()
+    assert descriptions(client, user) == ['replicated']
+    assert replica.reads == 2
+
+
+def test_a_replica_that_cannot_connect_is_skipped(client, user, create, use_replica, tmp_path):
+    create(user, 'on the primary')
+    replicas.read_your_writes._storage.reset()
+    replica = use_replica(tmp_path / 'missing' / 'replica.db')
+
+    # The failed connect costs a fallback to the primary, not an error
+    assert descriptions(client, user) == ['on the primary']
+    assert replica.failures == 1
+    assert replicas.replica_set.stats()[0]['healthy'] is False
+    # Until the retry delay is over it is not even tried
+    assert descriptions(client, user) == ['on the primary']
+    assert (replica.reads, replica.failures) == (1, 1)
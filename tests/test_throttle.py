@@ -0,0 +1,77 @@
+import pytest
+from src.auth import throttle
+from src.auth.throttle import TokenBucketThrottle
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(throttle.time, 'monotonic', clock)
+    return clock
+
+
+@pytest.fixture
+def strict_throttle(monkeypatch):
+    """Turns the app's throttle on, with a burst of 3 that practically never refills."""
+    bucket = TokenBucketThrottle(rate=0.001, burst=3)
+    monkeypatch.setattr(throttle, 'user_throttle', bucket)
+    return bucket
+
+
+def test_bucket_allows_a_burst_then_refills(clock):
+    bucket = TokenBucketThrottle(rate=2, burst=3)
+    decisions = [bucket.acquire('user') for _ in range(4)]
+    assert [d.allowed for d in decisions] == [True, True, True, False]
+    assert [d.remaining for d in decisions] == [2, 1, 0, 0]
+    assert decisions[3].retry_after == 1
+    assert decisions[3].reset_seconds == 2    # 3 tokens at 2 per second
+
+    clock.now += 0.5                          # one token back
+    assert bucket.acquire('user').allowed
+    assert not bucket.acquire('user').allowed
+    # Other users have buckets of their own
+    assert bucket.acquire('someone else').remaining == 2
+    assert bucket.stats() == {'buckets': 2, 'allowed': 5, 'rejected': 2}
+
+
+def test_refilled_buckets_are_dropped(clock):
+    bucket = TokenBucketThrottle(rate=2, burst=3, max_users=2)
+    for key in ('a', 'b', 'c'):
+        bucket.acquire(key)
+    # Over max_users the least recently used bucket goes
+    assert list(bucket._buckets) == ['b', 'c']
+
+    clock.now += bucket.idle_seconds
+    bucket.acquire('d')
+    assert list(bucket._buckets) == ['d']
+
+
+def test_responses_carry_the_rate_limit_headers(client, user, strict_throttle):
+    listed = client.get('/todos/', headers=user['headers'])
+    assert listed.status_code == 200
+    assert (listed.headers['RateLimit-Limit'], listed.headers['RateLimit-Remaining']) == ('3', '2')
+    assert int(listed.headers['RateLimit-Reset']) > 0
+
+    # Streamed responses are returned directly, and keep them too
+    exported = client.get('/todos/export', headers=user['headers'])
+    assert exported.status_code == 200
+    assert exported.headers['RateLimit-Remaining'] == '1'
+
+
+def test_an_empty_bucket_gets_429_with_retry_after(client, user, make_user, strict_throttle):
+    for _ in range(3):
+        assert client.get('/todos/stats', headers=user['headers']).status_code == 200
+
+    refused = client.get('/todos/stats', headers=user['headers'])
+    assert refused.status_code == 429
+    assert int(refused.headers['Retry-After']) > 0
+    assert refused.headers['RateLimit-Remaining'] == '0'
+    assert client.get('/todos/stats', headers=make_user()['headers']).status_code == 200